@@ -0,0 +1,74 @@
+"""Add per-recipient notification digests.
+
+Revision ID: 20260301_add_notification_digests
+Revises: 20260210_add_integration_tracking
+Create Date: 2026-03-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.sql import func
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20260301_add_notification_digests"
+down_revision = "20260210_add_integration_tracking"
+branch_labels = None
+depends_on = None
+
+
+def _uuid_type(bind):
+    if bind.dialect.name == "postgresql":
+        return postgresql.UUID(as_uuid=True)
+    return sa.String(36)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if bind.dialect.name == "postgresql":
+        op.execute("ALTER TYPE notificationtype ADD VALUE IF NOT EXISTS 'TASK_DIGEST'")
+
+    if (
+        "notification_digest_items" not in tables
+        and "in_app_notifications" in tables
+        and "monitoring_tasks" in tables
+    ):
+        op.create_table(
+            "notification_digest_items",
+            sa.Column("digest_id", _uuid_type(bind), nullable=False),
+            sa.Column("task_id", _uuid_type(bind), nullable=False),
+            sa.Column(
+                "notification_type",
+                postgresql.ENUM(name="notificationtype", create_type=False)
+                if bind.dialect.name == "postgresql"
+                else sa.String(length=32),
+                nullable=False,
+            ),
+            sa.Column("dedupe_key", sa.String(length=128), nullable=False),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=func.now(), nullable=False
+            ),
+            sa.Column("id", _uuid_type(bind), primary_key=True),
+            sa.ForeignKeyConstraint(["digest_id"], ["in_app_notifications.id"]),
+            sa.ForeignKeyConstraint(["task_id"], ["monitoring_tasks.id"]),
+            sa.UniqueConstraint("dedupe_key", name="uq_notification_digest_items_dedupe_key"),
+        )
+        op.create_index(
+            "ix_notification_digest_items_digest_id",
+            "notification_digest_items",
+            ["digest_id"],
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "notification_digest_items" in tables:
+        op.drop_index("ix_notification_digest_items_digest_id", table_name="notification_digest_items")
+        op.drop_table("notification_digest_items")
@@ -0,0 +1,67 @@
+"""Add scheduler lease and job run tables.
+
+Revision ID: 20260305_add_scheduler_tables
+Revises: 20260301_add_notification_digests
+Create Date: 2026-03-05
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20260305_add_scheduler_tables"
+down_revision = "20260301_add_notification_digests"
+branch_labels = None
+depends_on = None
+
+
+def _uuid_type(bind):
+    if bind.dialect.name == "postgresql":
+        return postgresql.UUID(as_uuid=True)
+    return sa.String(36)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "scheduler_leases" not in tables:
+        op.create_table(
+            "scheduler_leases",
+            sa.Column("name", sa.String(length=64), nullable=False),
+            sa.Column("holder", sa.String(length=128), nullable=False),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("id", _uuid_type(bind), primary_key=True),
+            sa.UniqueConstraint("name", name="uq_scheduler_leases_name"),
+        )
+
+    if "scheduled_job_runs" not in tables:
+        op.create_table(
+            "scheduled_job_runs",
+            sa.Column("job_name", sa.String(length=64), nullable=False),
+            sa.Column("last_started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_duration_seconds", sa.Float(), nullable=True),
+            sa.Column("last_lag_seconds", sa.Float(), nullable=True),
+            sa.Column("last_status", sa.String(length=16), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("last_result", sa.JSON(), nullable=True),
+            sa.Column("last_holder", sa.String(length=128), nullable=True),
+            sa.Column("run_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("id", _uuid_type(bind), primary_key=True),
+            sa.UniqueConstraint("job_name", name="uq_scheduled_job_runs_job_name"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "scheduled_job_runs" in tables:
+        op.drop_table("scheduled_job_runs")
+    if "scheduler_leases" in tables:
+        op.drop_table("scheduler_leases")
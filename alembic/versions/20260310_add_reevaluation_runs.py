@@ -0,0 +1,73 @@
+"""Add threshold re-evaluation run and shard tables.
+
+Revision ID: 20260310_add_reevaluation_runs
+Revises: 20260305_add_scheduler_tables
+Create Date: 2026-03-10
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20260310_add_reevaluation_runs"
+down_revision = "20260305_add_scheduler_tables"
+branch_labels = None
+depends_on = None
+
+
+def _uuid_type(bind):
+    if bind.dialect.name == "postgresql":
+        return postgresql.UUID(as_uuid=True)
+    return sa.String(36)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "reevaluation_runs" not in tables:
+        op.create_table(
+            "reevaluation_runs",
+            sa.Column("monitoring_types", sa.JSON(), nullable=False),
+            sa.Column("status", sa.String(length=16), nullable=False, server_default="PENDING"),
+            sa.Column("shard_count", sa.Integer(), nullable=False),
+            sa.Column("requested_by", sa.String(length=64), nullable=True),
+            sa.Column("total_events", sa.Integer(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("id", _uuid_type(bind), primary_key=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+
+    if "reevaluation_shards" not in tables:
+        op.create_table(
+            "reevaluation_shards",
+            sa.Column("run_id", _uuid_type(bind), sa.ForeignKey("reevaluation_runs.id"), nullable=False),
+            sa.Column("shard_index", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(length=16), nullable=False, server_default="PENDING"),
+            sa.Column("holder", sa.String(length=128), nullable=True),
+            sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_event_id", sa.String(length=36), nullable=True),
+            sa.Column("scanned", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("changed", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("id", _uuid_type(bind), primary_key=True),
+            sa.UniqueConstraint("run_id", "shard_index", name="uq_reevaluation_shards_run_shard"),
+        )
+        op.create_index("ix_reevaluation_shards_run_id", "reevaluation_shards", ["run_id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "reevaluation_shards" in tables:
+        op.drop_index("ix_reevaluation_shards_run_id", table_name="reevaluation_shards")
+        op.drop_table("reevaluation_shards")
+    if "reevaluation_runs" in tables:
+        op.drop_table("reevaluation_runs")
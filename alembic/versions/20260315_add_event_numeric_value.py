@@ -0,0 +1,104 @@
+"""Store parsed numeric value and normalized unit on monitoring events.
+
+Revision ID: 20260315_add_event_numeric_value
+Revises: 20260310_add_reevaluation_runs
+Create Date: 2026-03-15
+"""
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20260315_add_event_numeric_value"
+down_revision = "20260310_add_reevaluation_runs"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+INDEX_NAME = "ix_monitoring_events_type_date_value"
+
+# Frozen copy of backend.models.measurements at the time of this revision.
+_NUMERIC_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*([a-zA-Z%µ/]+)?")
+
+
+def _parse_measurement(value, unit):
+    numeric = None
+    parsed_unit = None
+    if value:
+        match = _NUMERIC_RE.search(str(value))
+        if match:
+            numeric = float(match.group(1))
+            parsed_unit = match.group(2) or None
+    unit = unit or parsed_unit
+    return numeric, unit.strip().replace(" ", "") if unit else None
+
+
+def _backfill(bind) -> None:
+    events = sa.table(
+        "monitoring_events",
+        sa.column("id"),
+        sa.column("value", sa.String),
+        sa.column("unit", sa.String),
+        sa.column("numeric_value", sa.Float),
+        sa.column("unit_normalized", sa.String),
+    )
+    update = (
+        events.update()
+        .where(events.c.id == sa.bindparam("event_id"))
+        .values(numeric_value=sa.bindparam("parsed_value"), unit_normalized=sa.bindparam("parsed_unit"))
+    )
+    last_id = None
+    while True:
+        query = sa.select(events.c.id, events.c.value, events.c.unit)
+        if last_id is not None:
+            query = query.where(events.c.id > last_id)
+        rows = bind.execute(query.order_by(events.c.id).limit(BACKFILL_BATCH_SIZE)).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        params = []
+        for row in rows:
+            numeric, unit = _parse_measurement(row.value, row.unit)
+            if numeric is not None or unit is not None:
+                params.append({"event_id": row.id, "parsed_value": numeric, "parsed_unit": unit})
+        if params:
+            bind.execute(update, params)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "monitoring_events" not in inspector.get_table_names():
+        return
+
+    cols = {col["name"] for col in inspector.get_columns("monitoring_events")}
+    if "numeric_value" not in cols:
+        op.add_column("monitoring_events", sa.Column("numeric_value", sa.Float(), nullable=True))
+    if "unit_normalized" not in cols:
+        op.add_column("monitoring_events", sa.Column("unit_normalized", sa.String(length=128), nullable=True))
+
+    _backfill(bind)
+
+    indexes = {index["name"] for index in inspector.get_indexes("monitoring_events")}
+    if INDEX_NAME not in indexes:
+        op.create_index(
+            INDEX_NAME, "monitoring_events", ["test_type", "performed_date", "numeric_value"]
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "monitoring_events" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("monitoring_events")}
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name="monitoring_events")
+    cols = {col["name"] for col in inspector.get_columns("monitoring_events")}
+    if "unit_normalized" in cols:
+        op.drop_column("monitoring_events", "unit_normalized")
+    if "numeric_value" in cols:
+        op.drop_column("monitoring_events", "numeric_value")
@@ -0,0 +1,37 @@
+"""Index monitoring events by patient, test type and date.
+
+Revision ID: 20260320_add_event_series_index
+Revises: 20260315_add_event_numeric_value
+Create Date: 2026-03-20
+"""
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+revision = "20260320_add_event_series_index"
+down_revision = "20260315_add_event_numeric_value"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_monitoring_events_patient_type_date"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "monitoring_events" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("monitoring_events")}
+    if INDEX_NAME not in indexes:
+        op.create_index(INDEX_NAME, "monitoring_events", ["patient_id", "test_type", "performed_date"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "monitoring_events" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("monitoring_events")}
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name="monitoring_events")
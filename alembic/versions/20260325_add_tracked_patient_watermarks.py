@@ -0,0 +1,47 @@
+"""Add EPR sync watermarks to tracked patients.
+
+Revision ID: 20260325_add_tracked_patient_watermarks
+Revises: 20260320_add_event_series_index
+Create Date: 2026-03-25
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20260325_add_tracked_patient_watermarks"
+down_revision = "20260320_add_event_series_index"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_tracked_patients_patient_hash"
+COLUMNS = ("medications_synced_at", "observations_synced_at")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "tracked_patients" not in inspector.get_table_names():
+        return
+    cols = {col["name"] for col in inspector.get_columns("tracked_patients")}
+    for name in COLUMNS:
+        if name not in cols:
+            op.add_column("tracked_patients", sa.Column(name, sa.DateTime(timezone=True), nullable=True))
+    indexes = {index["name"] for index in inspector.get_indexes("tracked_patients")}
+    if INDEX_NAME not in indexes:
+        op.create_index(INDEX_NAME, "tracked_patients", ["patient_hash"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "tracked_patients" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("tracked_patients")}
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name="tracked_patients")
+    cols = {col["name"] for col in inspector.get_columns("tracked_patients")}
+    for name in COLUMNS:
+        if name in cols:
+            op.drop_column("tracked_patients", name)
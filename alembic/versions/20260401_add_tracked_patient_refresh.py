@@ -0,0 +1,45 @@
+"""Add background refresh state to tracked patients.
+
+Revision ID: 20260401_add_tracked_patient_refresh
+Revises: 20260325_add_tracked_patient_watermarks
+Create Date: 2026-04-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20260401_add_tracked_patient_refresh"
+down_revision = "20260325_add_tracked_patient_watermarks"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ("epr_patient_ref", sa.String(length=128)),
+    ("last_sync_attempt_at", sa.DateTime(timezone=True)),
+    ("last_sync_status", sa.String(length=16)),
+    ("last_sync_error", sa.String(length=255)),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "tracked_patients" not in inspector.get_table_names():
+        return
+    cols = {col["name"] for col in inspector.get_columns("tracked_patients")}
+    for name, type_ in COLUMNS:
+        if name not in cols:
+            op.add_column("tracked_patients", sa.Column(name, type_, nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "tracked_patients" not in inspector.get_table_names():
+        return
+    cols = {col["name"] for col in inspector.get_columns("tracked_patients")}
+    for name, _type in COLUMNS:
+        if name in cols:
+            op.drop_column("tracked_patients", name)
@@ -0,0 +1,67 @@
+"""Add change-time indexes and retention tombstones for incremental export.
+
+Revision ID: 20260410_add_export_cursors
+Revises: 20260401_add_tracked_patient_refresh
+Create Date: 2026-04-10
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20260410_add_export_cursors"
+down_revision = "20260401_add_tracked_patient_refresh"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("patients", "ix_patients_updated_at_id"),
+    ("medication_orders", "ix_medication_orders_updated_at_id"),
+    ("monitoring_events", "ix_monitoring_events_updated_at_id"),
+)
+
+
+def _uuid_type(bind):
+    if bind.dialect.name == "postgresql":
+        return postgresql.UUID(as_uuid=True)
+    return sa.String(36)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, name in INDEXES:
+        if table not in tables:
+            continue
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, ["updated_at", "id"])
+
+    if "export_tombstones" not in tables:
+        op.create_table(
+            "export_tombstones",
+            sa.Column("entity", sa.String(length=32), nullable=False),
+            sa.Column("entity_id", _uuid_type(bind), nullable=False),
+            sa.Column("patient_id", _uuid_type(bind), nullable=True),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("id", _uuid_type(bind), primary_key=True),
+        )
+        op.create_index("ix_export_tombstones_deleted_at_id", "export_tombstones", ["deleted_at", "id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "export_tombstones" in tables:
+        op.drop_index("ix_export_tombstones_deleted_at_id", table_name="export_tombstones")
+        op.drop_table("export_tombstones")
+    for table, name in INDEXES:
+        if table not in tables:
+            continue
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,60 @@
+"""Keep the schedule slots of DONE tasks purged by retention.
+
+Revision ID: 20260501_add_resolved_task_slots
+Revises: 20260410_add_export_cursors
+Create Date: 2026-05-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20260501_add_resolved_task_slots"
+down_revision = "20260410_add_export_cursors"
+branch_labels = None
+depends_on = None
+
+
+def _uuid_type(bind):
+    if bind.dialect.name == "postgresql":
+        return postgresql.UUID(as_uuid=True)
+    return sa.String(36)
+
+
+def _status_type(bind):
+    if bind.dialect.name == "postgresql":
+        # Reuse the enum created with monitoring_tasks.
+        return postgresql.ENUM("DUE", "OVERDUE", "DONE", "WAIVED", name="taskstatus", create_type=False)
+    return sa.String(7)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "resolved_task_slots" in set(inspector.get_table_names()):
+        return
+    op.create_table(
+        "resolved_task_slots",
+        sa.Column("patient_id", _uuid_type(bind), nullable=False),
+        sa.Column("medication_order_id", _uuid_type(bind), nullable=False),
+        sa.Column("test_type", sa.String(length=64), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("status", _status_type(bind), nullable=False),
+        sa.Column("resolved_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("id", _uuid_type(bind), primary_key=True),
+    )
+    op.create_index(
+        "ix_resolved_task_slots_order_test_due",
+        "resolved_task_slots",
+        ["medication_order_id", "test_type", "due_date"],
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "resolved_task_slots" in set(inspector.get_table_names()):
+        op.drop_index("ix_resolved_task_slots_order_test_due", table_name="resolved_task_slots")
+        op.drop_table("resolved_task_slots")
@@ -0,0 +1,38 @@
+"""Keep the FHIR logical id of bulk-imported patients.
+
+Revision ID: 20260515_add_patient_epr_ref
+Revises: 20260501_add_resolved_task_slots
+Create Date: 2026-05-15
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20260515_add_patient_epr_ref"
+down_revision = "20260501_add_resolved_task_slots"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "patients" not in inspector.get_table_names():
+        return
+    if "epr_patient_ref" not in {col["name"] for col in inspector.get_columns("patients")}:
+        op.add_column("patients", sa.Column("epr_patient_ref", sa.String(length=128), nullable=True))
+    if "ix_patients_epr_patient_ref" not in {index["name"] for index in inspector.get_indexes("patients")}:
+        op.create_index("ix_patients_epr_patient_ref", "patients", ["epr_patient_ref"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "patients" not in inspector.get_table_names():
+        return
+    if "ix_patients_epr_patient_ref" in {index["name"] for index in inspector.get_indexes("patients")}:
+        op.drop_index("ix_patients_epr_patient_ref", table_name="patients")
+    if "epr_patient_ref" in {col["name"] for col in inspector.get_columns("patients")}:
+        op.drop_column("patients", "epr_patient_ref")
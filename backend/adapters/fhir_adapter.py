@@ -1,24 +1,151 @@
+from __future__ import annotations
+
+from datetime import date
 from typing import Any
 
+from ..config import get_settings
+from ..services.epr_client import parse_date
+
+AGE_BANDS = ((18, 24), (25, 34), (35, 44), (45, 54), (55, 64), (65, 74))
+GENDER_CODES = {"male": "M", "female": "F", "other": "X", "unknown": "U"}
+
 
 class FHIRAdapter:
-    """FHIR R4 adapter interface stub.
+    """Maps FHIR R4 resources to the internal row dicts used by the importers.
 
-    Implement mapping from FHIR resources to internal models:
-    - MedicationRequest
-    - MedicationStatement
-    - Observation
-    - Patient
+    Supported resources: Patient, MedicationRequest, MedicationStatement and
+    Observation. Rows carry ``patient_ref``, the logical id of the referenced
+    Patient. Direct identifiers (NHS number, name, address, birth date) are
+    never copied; the birth date only yields an age band.
     """
 
+    def __init__(self, pseudonym_system: str | None = None, today: date | None = None) -> None:
+        settings = get_settings()
+        self.pseudonym_system = pseudonym_system if pseudonym_system is not None else settings.FHIR_PSEUDONYM_SYSTEM
+        self.today = today or date.today()
+
+    def map_resource(self, resource: dict[str, Any]) -> tuple[str, dict[str, Any]] | None:
+        """Return ``(kind, row)`` for a supported resource, ``None`` otherwise."""
+        resource_type = resource.get("resourceType")
+        if resource_type == "Patient":
+            return "patient", self.from_patient(resource)
+        if resource_type == "MedicationRequest":
+            return "medication", self.from_medication_request(resource)
+        if resource_type == "MedicationStatement":
+            return "medication", self.from_medication_statement(resource)
+        if resource_type == "Observation":
+            return "observation", self.from_observation(resource)
+        return None
+
     def from_medication_request(self, resource: dict[str, Any]) -> dict[str, Any]:
-        raise NotImplementedError
+        dosage = _first(resource.get("dosageInstruction"))
+        bounds = (((dosage or {}).get("timing") or {}).get("repeat") or {}).get("boundsPeriod") or {}
+        validity = (resource.get("dispenseRequest") or {}).get("validityPeriod") or {}
+        return {
+            "patient_ref": _reference_id(resource.get("subject")),
+            "drug_name": _medication_name(resource),
+            "start_date": parse_date(resource.get("authoredOn") or bounds.get("start")),
+            "stop_date": parse_date(bounds.get("end") or validity.get("end")),
+            **_dosage_fields(dosage),
+        }
 
     def from_medication_statement(self, resource: dict[str, Any]) -> dict[str, Any]:
-        raise NotImplementedError
+        period = resource.get("effectivePeriod") or {}
+        return {
+            "patient_ref": _reference_id(resource.get("subject")),
+            "drug_name": _medication_name(resource),
+            "start_date": parse_date(period.get("start") or resource.get("effectiveDateTime")),
+            "stop_date": parse_date(period.get("end")),
+            **_dosage_fields(_first(resource.get("dosage"))),
+        }
 
     def from_observation(self, resource: dict[str, Any]) -> dict[str, Any]:
-        raise NotImplementedError
+        quantity = resource.get("valueQuantity") or {}
+        value = quantity.get("value")
+        if value is None:
+            value = resource.get("valueString")
+        if value is None:
+            value = _concept_text(resource.get("valueCodeableConcept"))
+        period = resource.get("effectivePeriod") or {}
+        return {
+            "patient_ref": _reference_id(resource.get("subject")),
+            "test_type": _concept_text(resource.get("code")),
+            "performed_date": parse_date(
+                resource.get("effectiveDateTime") or period.get("start") or resource.get("issued")
+            ),
+            "value": None if value is None else str(value),
+            "unit": quantity.get("unit") or quantity.get("code"),
+            "interpretation": _concept_text(_first(resource.get("interpretation"))),
+        }
 
     def from_patient(self, resource: dict[str, Any]) -> dict[str, Any]:
-        raise NotImplementedError
+        return {
+            "patient_ref": resource.get("id"),
+            "pseudonym": self._pseudonym(resource),
+            "age_band": self._age_band(parse_date(resource.get("birthDate"))),
+            "sex": GENDER_CODES.get(str(resource.get("gender") or "").lower()),
+        }
+
+    def _pseudonym(self, resource: dict[str, Any]) -> str | None:
+        if self.pseudonym_system:
+            for identifier in resource.get("identifier") or []:
+                if isinstance(identifier, dict) and identifier.get("system") == self.pseudonym_system:
+                    return identifier.get("value")
+            return None
+        # Without a pseudonym identifier system the export's logical id is the pseudonym.
+        return resource.get("id")
+
+    def _age_band(self, birth_date: date | None) -> str | None:
+        if birth_date is None:
+            return None
+        age = self.today.year - birth_date.year - (
+            (self.today.month, self.today.day) < (birth_date.month, birth_date.day)
+        )
+        if age >= 75:
+            return "75+"
+        for low, high in AGE_BANDS:
+            if low <= age <= high:
+                return f"{low}-{high}"
+        return None
+
+
+def _first(items: Any) -> dict[str, Any] | None:
+    if isinstance(items, list) and items and isinstance(items[0], dict):
+        return items[0]
+    return None
+
+
+def _concept_text(concept: Any) -> str | None:
+    if not isinstance(concept, dict):
+        return None
+    if concept.get("text"):
+        return concept["text"]
+    coding = _first(concept.get("coding")) or {}
+    return coding.get("display") or coding.get("code")
+
+
+def _reference_id(reference: Any) -> str | None:
+    if not isinstance(reference, dict) or not reference.get("reference"):
+        return None
+    # "Patient/123", or an absolute URL ending in it.
+    return str(reference["reference"]).rstrip("/").rsplit("/", 1)[-1]
+
+
+def _medication_name(resource: dict[str, Any]) -> str | None:
+    name = _concept_text(resource.get("medicationCodeableConcept"))
+    if name is None:
+        name = (resource.get("medicationReference") or {}).get("display")
+    return name.strip() if isinstance(name, str) else None
+
+
+def _dosage_fields(dosage: dict[str, Any] | None) -> dict[str, Any]:
+    dosage = dosage or {}
+    repeat = (dosage.get("timing") or {}).get("repeat") or {}
+    frequency = None
+    if repeat.get("frequency") and repeat.get("period") and repeat.get("periodUnit"):
+        frequency = f"{repeat['frequency']}/{repeat['period']}{repeat['periodUnit']}"
+    return {
+        "dose": dosage.get("text"),
+        "route": _concept_text(dosage.get("route")),
+        "frequency": frequency or _concept_text((dosage.get("timing") or {}).get("code")),
+    }
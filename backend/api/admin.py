@@ -1,15 +1,23 @@
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
+from uuid import UUID
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, UploadFile, File
 from sqlalchemy.orm import Session
 import pandas as pd
 import io
 
 from ..auth import require_role
-from ..database import get_db
+from ..config import get_settings
+from ..database import get_db, get_sessionmaker
 from ..models.ruleset import RuleSetVersion
 from ..models.config import SystemConfig
+from ..models.jobs import ReevaluationRun, ReevaluationShard, ScheduledJobRun
 from ..models.thresholds import ReferenceThreshold, ComparatorType
+from ..services.abnormality import invalidate_threshold_index
 from ..services.audit_logger import create_audit_event
+from ..services.epr_client import connection_stats, get_circuit_breaker
+from ..services.fingerprints import DatasetFingerprints, etag_matches
+from ..services.integration_service import patient_fetches
+from ..services.reevaluation import ReevaluationService, run_progress
 from ..models.audit import AuditAction
 from .schemas import RuleSetUploadRequest, ConfigUpdateRequest, ThresholdPayload
 from ..rules.rule_loader import load_ruleset
@@ -92,6 +100,79 @@ def put_config(
     return {"status": "ok"}
 
 
+@router.get("/jobs")
+def list_jobs(db: Session = Depends(get_db), current_user=Depends(require_role("admin"))):
+    rows = db.query(ScheduledJobRun).order_by(ScheduledJobRun.job_name.asc()).all()
+    return [
+        {
+            "job_name": row.job_name,
+            "last_started_at": row.last_started_at.isoformat() if row.last_started_at else None,
+            "last_finished_at": row.last_finished_at.isoformat() if row.last_finished_at else None,
+            "last_duration_seconds": row.last_duration_seconds,
+            "last_lag_seconds": row.last_lag_seconds,
+            "last_status": row.last_status,
+            "last_error": row.last_error,
+            "last_result": row.last_result,
+            "last_holder": row.last_holder,
+            "run_count": row.run_count,
+        }
+        for row in rows
+    ]
+
+
+@router.get("/epr/connections")
+def epr_connections(current_user=Depends(require_role("admin"))):
+    return connection_stats()
+
+
+@router.get("/epr/circuit")
+def epr_circuit(current_user=Depends(require_role("admin"))):
+    return get_circuit_breaker().stats()
+
+
+@router.get("/epr/fetches")
+def epr_fetches(current_user=Depends(require_role("admin"))):
+    return patient_fetches.stats()
+
+
+@router.get("/reevaluations")
+def list_reevaluations(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("admin")),
+):
+    runs = db.query(ReevaluationRun).order_by(ReevaluationRun.created_at.desc()).limit(limit).all()
+    shards: dict = {run.id: [] for run in runs}
+    if shards:
+        for shard in db.query(ReevaluationShard).filter(ReevaluationShard.run_id.in_(shards.keys())):
+            shards[shard.run_id].append(shard)
+    return [run_progress(run, shards[run.id]) for run in runs]
+
+
+@router.post("/reevaluations/{run_id}/resume")
+def resume_reevaluation(
+    run_id: UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("admin")),
+):
+    run = db.get(ReevaluationRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Re-evaluation run not found")
+    resumed = ReevaluationService(db).resume(run.id)
+
+    create_audit_event(
+        db,
+        actor=getattr(current_user, "username", "SYSTEM"),
+        action=AuditAction.UPDATE,
+        entity_type="ReevaluationRun",
+        entity_id=str(run.id),
+        details={"resumed_shards": resumed},
+        request=request,
+    )
+    return {"status": "ok", "resumed_shards": resumed}
+
+
 @router.get("/thresholds")
 def list_thresholds(db: Session = Depends(get_db), current_user=Depends(require_role("admin"))):
     rows = db.query(ReferenceThreshold).order_by(ReferenceThreshold.monitoring_type.asc()).all()
@@ -122,6 +203,7 @@ def list_thresholds(db: Session = Depends(get_db), current_user=Depends(require_
 def create_threshold(
     payload: ThresholdPayload,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(require_role("admin")),
 ):
@@ -147,6 +229,8 @@ def create_threshold(
     )
     db.add(threshold)
     db.commit()
+    invalidate_threshold_index()
+    _queue_reevaluation(db, [threshold.monitoring_type], current_user, background_tasks)
 
     create_audit_event(
         db,
@@ -165,6 +249,7 @@ def update_threshold(
     threshold_id: str,
     payload: ThresholdPayload,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(require_role("admin")),
 ):
@@ -176,6 +261,7 @@ def update_threshold(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid comparator_type")
 
+    previous_type = threshold.monitoring_type
     threshold.monitoring_type = payload.monitoring_type
     threshold.unit = payload.unit
     threshold.comparator_type = comparator
@@ -193,6 +279,8 @@ def update_threshold(
 
     db.add(threshold)
     db.commit()
+    invalidate_threshold_index()
+    _queue_reevaluation(db, [previous_type, threshold.monitoring_type], current_user, background_tasks)
 
     create_audit_event(
         db,
@@ -210,14 +298,18 @@ def update_threshold(
 def delete_threshold(
     threshold_id: str,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(require_role("admin")),
 ):
     threshold = db.query(ReferenceThreshold).filter_by(id=threshold_id).first()
     if not threshold:
         raise HTTPException(status_code=404, detail="Threshold not found")
+    monitoring_type = threshold.monitoring_type
     db.delete(threshold)
     db.commit()
+    invalidate_threshold_index()
+    _queue_reevaluation(db, [monitoring_type], current_user, background_tasks)
 
     create_audit_event(
         db,
@@ -242,11 +334,23 @@ ECG,ms,coded,,,,"",,,,"CRITICAL;ABNORMAL",true,v1
 
 @router.get("/thresholds/export")
 def export_thresholds(
+    request: Request,
+    response: Response,
     format: str = "csv",
     db: Session = Depends(get_db),
     current_user=Depends(require_role("admin")),
 ):
-    rows = db.query(ReferenceThreshold).order_by(ReferenceThreshold.monitoring_type.asc()).all()
+    etag = DatasetFingerprints(db).thresholds(format.lower())
+    if etag is not None:
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    rows = (
+        db.query(ReferenceThreshold)
+        .order_by(ReferenceThreshold.monitoring_type.asc(), ReferenceThreshold.id.asc())
+        .all()
+    )
     payload = [
         {
             "monitoring_type": row.monitoring_type,
@@ -274,6 +378,7 @@ def export_thresholds(
 
 @router.post("/thresholds/import")
 def import_thresholds(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     request: Request = None,
     db: Session = Depends(get_db),
@@ -285,6 +390,7 @@ def import_thresholds(
     inserted = 0
     updated = 0
     errors: list[str] = []
+    changed_types: set[str] = set()
 
     for idx, row in df.iterrows():
         try:
@@ -337,10 +443,13 @@ def import_thresholds(
                 )
                 db.add(entry)
                 inserted += 1
+            changed_types.add(monitoring_type)
         except Exception as exc:
             errors.append(f"Row {idx}: {exc}")
 
     db.commit()
+    invalidate_threshold_index()
+    _queue_reevaluation(db, changed_types, current_user, background_tasks)
 
     create_audit_event(
         db,
@@ -355,6 +464,24 @@ def import_thresholds(
     return {"inserted": inserted, "updated": updated, "errors": errors[:10]}
 
 
+def _queue_reevaluation(db: Session, monitoring_types, current_user, background_tasks: BackgroundTasks) -> None:
+    run = ReevaluationService(db).enqueue(
+        monitoring_types, requested_by=getattr(current_user, "username", "SYSTEM")
+    )
+    if run is not None and get_settings().REEVALUATION_RUN_ON_CHANGE:
+        background_tasks.add_task(_run_reevaluation)
+
+
+def _run_reevaluation() -> None:
+    # Runs after the response is sent, so it owns its session. Shards are
+    # leased: the scheduler job or CLI workers can share the same run.
+    db = get_sessionmaker()()
+    try:
+        ReevaluationService(db).run_pending()
+    finally:
+        db.close()
+
+
 def _null_if_nan(value):
     if value is None:
         return None
@@ -1,8 +1,18 @@
 from fastapi import APIRouter
 
+from ..config import get_settings
+from ..services.epr_client import get_circuit_breaker
+
 router = APIRouter()
 
 
 @router.get("/health")
 def health_check():
-    return {"status": "ok"}
+    if get_settings().EPR_MODE == "OFF":
+        return {"status": "ok"}
+    circuit = get_circuit_breaker().stats()
+    # The API itself is up either way; an open breaker only degrades EPR fetches.
+    return {
+        "status": "ok" if circuit["state"] == "closed" else "degraded",
+        "epr": {"circuit": circuit["state"], "retry_after": circuit["retry_after"]},
+    }
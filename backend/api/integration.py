@@ -1,19 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
-import io
+import json
+import math
+from typing import Optional
 
 from ..auth_integration import require_api_key
-from ..database import get_db
-from ..services.export_service import ExportService
+from ..config import get_settings
+from ..database import get_db, get_sessionmaker
+from ..services.epr_client import EPRUnavailable
+from ..services.export_cache import ExportCache
+from ..services.export_service import ExportService, ExportWindow, parquet_supported
+from ..services.fingerprints import DatasetFingerprints, etag_matches
 from ..services.integration_service import IntegrationService
 from ..services.notification_engine import NotificationEngine
 from ..models.notifications import InAppNotification, InAppNotificationStatus
 from ..models.monitoring import MonitoringEvent, ReviewStatus
 from ..services.audit_logger import create_audit_event
 from ..models.audit import AuditAction
-from .schemas import IntegrationFetchRequest
+from .schemas import IntegrationBatchFetchRequest, IntegrationFetchRequest
 
 
 router = APIRouter(prefix="/integration", tags=["integration"])
@@ -28,13 +34,20 @@ def fetch_monitoring(
 ):
     try:
         service = IntegrationService(db)
-        result = service.fetch_and_import(
+        result = service.fetch_coalesced(
             nhs_number=payload.nhs_number,
             requested_by=payload.requested_by,
             source_system=payload.source_system,
+            full_refresh=payload.full_refresh,
         )
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
+    except EPRUnavailable as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        )
     except RuntimeError as exc:
         raise HTTPException(status_code=503, detail=str(exc))
 
@@ -51,19 +64,125 @@ def fetch_monitoring(
     return result
 
 
+@router.post("/fetch-monitoring/batch")
+def fetch_monitoring_batch(
+    payload: IntegrationBatchFetchRequest,
+    request: Request,
+    _integration=Depends(require_api_key),
+):
+    SessionLocal = get_sessionmaker()
+    db = SessionLocal()
+    try:
+        service = IntegrationService(db)
+    except RuntimeError as exc:
+        db.close()
+        raise HTTPException(status_code=503, detail=str(exc))
+
+    request_id = getattr(request.state, "request_id", "")
+    ip_address = getattr(request.client, "host", "") if request.client else ""
+
+    def _lines():
+        # The stream owns its session: request-scoped dependencies are torn
+        # down before a StreamingResponse body is sent.
+        ok = failed = deferred = 0
+        try:
+            for summary in service.fetch_batch(
+                payload.nhs_numbers,
+                requested_by=payload.requested_by,
+                source_system=payload.source_system,
+                audit_actor="INTEGRATION_API_KEY",
+                request_id=request_id,
+                ip_address=ip_address,
+                full_refresh=payload.full_refresh,
+            ):
+                if summary["status"] == "ok":
+                    ok += 1
+                elif summary["status"] == "deferred":
+                    deferred += 1
+                else:
+                    failed += 1
+                yield json.dumps(summary) + "\n"
+            yield json.dumps({"status": "done", "ok": ok, "failed": failed, "deferred": deferred}) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/export/csv")
 def export_csv(
+    request: Request,
     tracked_only: bool = True,
-    db: Session = Depends(get_db),
+    incremental: bool = False,
+    since: Optional[str] = None,
     _integration=Depends(require_api_key),
 ):
-    exporter = ExportService(db)
-    data = exporter.build_export_zip(tracked_only=tracked_only)
-    return StreamingResponse(
-        io.BytesIO(data),
-        media_type="application/zip",
-        headers={"Content-Disposition": "attachment; filename=monitoring_export.zip"},
-    )
+    return _export_response(request, "csv", tracked_only, incremental, since)
+
+
+@router.get("/export/parquet")
+def export_parquet(
+    request: Request,
+    tracked_only: bool = True,
+    incremental: bool = False,
+    since: Optional[str] = None,
+    _integration=Depends(require_api_key),
+):
+    if not parquet_supported():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    return _export_response(request, "parquet", tracked_only, incremental, since)
+
+
+def _export_response(request: Request, fmt: str, tracked_only: bool, incremental: bool, since: Optional[str]):
+    window = None
+    if incremental or since:
+        # Pass the previous response's X-Export-Cursor as `since` to get only later changes.
+        try:
+            window = ExportWindow.after(since, get_settings().EXPORT_CURSOR_LAG_SECONDS)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid export cursor")
+
+    SessionLocal = get_sessionmaker()
+    filename = "monitoring_export_parquet.zip" if fmt == "parquet" else "monitoring_export.zip"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    etag = None
+    cache = None
+    if window is not None:
+        headers["X-Export-Cursor"] = window.cursor
+    else:
+        # Full exports of unchanged data are answered without the export queries.
+        with SessionLocal() as db:
+            etag = DatasetFingerprints(db).export(tracked_only, *_export_settings(fmt))
+        if etag is not None:
+            headers["ETag"] = etag
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers={"ETag": etag})
+            cache = ExportCache.from_settings()
+            cached = cache.open(etag) if cache is not None else None
+            if cached is not None:
+                return StreamingResponse(cache.read(cached), media_type="application/zip", headers=headers)
+
+    db = SessionLocal()
+
+    def _chunks():
+        # Like the batch fetch stream, the export owns its session.
+        try:
+            exporter = ExportService(db)
+            build = exporter.iter_parquet_zip if fmt == "parquet" else exporter.iter_export_zip
+            yield from build(tracked_only=tracked_only, window=window)
+        finally:
+            db.close()
+
+    chunks = _chunks() if cache is None else cache.store(etag, _chunks())
+    return StreamingResponse(chunks, media_type="application/zip", headers=headers)
+
+
+def _export_settings(fmt: str) -> tuple:
+    """Settings that change the archive bytes, and so belong in its ETag."""
+    settings = get_settings()
+    if fmt == "parquet":
+        return fmt, settings.EXPORT_PARQUET_COMPRESSION, settings.EXPORT_PARQUET_ROW_GROUP_ROWS
+    return fmt, settings.EXPORT_COMPRESSION_LEVEL
 
 
 @router.get("/notifications")
@@ -12,6 +12,7 @@ from ..models.monitoring import MonitoringEvent, ReviewStatus
 from ..models.notifications import (
     InAppNotification,
     InAppNotificationStatus,
+    NotificationDigestItem,
     NotificationPriority,
     NotificationType,
     RecipientType,
@@ -98,6 +99,37 @@ def list_notifications(
     return {"count": len(items), "items": items}
 
 
+@router.get("/{notification_id}/tasks")
+def list_digest_tasks(
+    notification_id: UUID,
+    limit: int = 500,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("clinician")),
+):
+    settings = get_settings()
+    team_ids = {settings.TEAM_INBOX_ID, settings.TEAM_LEAD_INBOX_ID}
+
+    notification = db.query(InAppNotification).filter_by(id=notification_id).first()
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    if not _user_can_access(notification, current_user.username, team_ids):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    rows = (
+        db.query(NotificationDigestItem.task_id, NotificationDigestItem.notification_type)
+        .filter(NotificationDigestItem.digest_id == notification.id)
+        .order_by(NotificationDigestItem.created_at.asc(), NotificationDigestItem.id.asc())
+        .offset(offset)
+        .limit(min(limit, 5000))
+        .all()
+    )
+    return {
+        "count": len(rows),
+        "items": [{"task_id": str(task_id), "type": kind.value} for task_id, kind in rows],
+    }
+
+
 @router.post("/{notification_id}/read")
 def mark_notification_read(
     notification_id: UUID,
@@ -1,6 +1,6 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from ..auth import require_role
@@ -11,6 +11,7 @@ from ..models.patient import Patient
 from ..services.scheduling import SchedulingEngine
 from ..services.task_generator import TaskGenerator
 from ..services.audit_logger import create_audit_event
+from ..services.fingerprints import DatasetFingerprints, etag_matches
 from ..models.audit import AuditAction
 
 router = APIRouter(tags=["scheduling"])
@@ -58,6 +59,7 @@ def recalculate_schedule(
 def patient_monitoring_timeline(
     patient_id: UUID,
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user=Depends(require_role("clinician")),
 ):
@@ -65,10 +67,29 @@ def patient_monitoring_timeline(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    meds = db.query(MedicationOrder).filter_by(patient_id=patient_id).all()
-    tasks = db.query(MonitoringTask).filter_by(patient_id=patient_id).all()
-    events = db.query(MonitoringEvent).filter_by(patient_id=patient_id).all()
+    etag = DatasetFingerprints(db).patient_timeline(patient_id)
+    not_modified = etag_matches(request.headers.get("if-none-match"), etag)
+    if not not_modified:
+        meds = (
+            db.query(MedicationOrder)
+            .filter_by(patient_id=patient_id)
+            .order_by(MedicationOrder.start_date, MedicationOrder.id)
+            .all()
+        )
+        tasks = (
+            db.query(MonitoringTask)
+            .filter_by(patient_id=patient_id)
+            .order_by(MonitoringTask.due_date, MonitoringTask.id)
+            .all()
+        )
+        events = (
+            db.query(MonitoringEvent)
+            .filter_by(patient_id=patient_id)
+            .order_by(MonitoringEvent.performed_date, MonitoringEvent.id)
+            .all()
+        )
 
+    # A revalidated view is still a view of the record.
     create_audit_event(
         db,
         actor=getattr(current_user, "username", "SYSTEM"),
@@ -81,6 +102,10 @@ def patient_monitoring_timeline(
     )
     db.commit()
 
+    if not_modified:
+        return Response(status_code=304, headers={"ETag": etag})
+    if etag is not None:
+        response.headers["ETag"] = etag
     return {
         "patient": {"id": str(patient.id), "pseudonym": patient.pseudonym},
         "medications": [
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from datetime import date, datetime
 from typing import Optional
 from ..config import get_settings
@@ -115,3 +115,15 @@ class IntegrationFetchRequest(BaseModel):
     nhs_number: str
     requested_by: Optional[str] = None
     source_system: Optional[str] = None
+    # Ignore sync watermarks and re-read the patient's whole EPR history.
+    full_refresh: bool = False
+
+
+class IntegrationBatchFetchRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # As above: NHS numbers are used for the EPR lookup only and never stored.
+    nhs_numbers: list[str] = Field(min_length=1, max_length=1000)
+    requested_by: Optional[str] = None
+    source_system: Optional[str] = None
+    full_refresh: bool = False
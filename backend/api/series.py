@@ -0,0 +1,60 @@
+from datetime import date
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from ..auth import require_role
+from ..database import get_db
+from ..models.audit import AuditAction
+from ..models.patient import Patient
+from ..services.audit_logger import create_audit_event
+from ..services.series import SeriesService
+
+router = APIRouter(tags=["series"])
+
+
+@router.get("/patients/{patient_id}/series")
+def patient_series(
+    patient_id: UUID,
+    request: Request,
+    test_type: str,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    max_points: int = Query(500, ge=3, le=5000),
+    unit: str | None = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("clinician")),
+):
+    patient = db.query(Patient).filter_by(id=patient_id).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    series = SeriesService(db).patient_series(
+        patient_id, test_type, date_from, date_to, max_points, unit=unit
+    )
+
+    create_audit_event(
+        db,
+        actor=getattr(current_user, "username", "SYSTEM"),
+        action=AuditAction.VIEW,
+        entity_type="Patient",
+        entity_id=str(patient_id),
+        details={"pseudonym": patient.pseudonym, "series": test_type},
+        request=request,
+        commit=False,
+    )
+    db.commit()
+    return series
+
+
+@router.get("/series/population")
+def population_series(
+    test_type: str,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    unit: str | None = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("clinician")),
+):
+    return SeriesService(db).population_percentiles(test_type, date_from, date_to, unit=unit)
@@ -7,6 +7,7 @@ from ..auth import require_role
 from ..database import get_db
 from ..models.monitoring import MonitoringTask, MonitoringEvent
 from ..services.task_generator import TaskGenerator
+from ..services.notification_engine import invalidate_recipient_cache
 from ..services.audit_logger import create_audit_event
 from ..models.audit import AuditAction
 from .schemas import AcknowledgeTaskRequest, CompleteTaskRequest, WaiveTaskRequest
@@ -25,9 +26,13 @@ def acknowledge_task(
     task = db.query(MonitoringTask).filter_by(id=task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    task.assigned_to = payload.assigned_to or getattr(current_user, "username", None)
+    assigned_to = payload.assigned_to or getattr(current_user, "username", None)
+    changed = task.assigned_to != assigned_to
+    task.assigned_to = assigned_to
     db.add(task)
     db.commit()
+    if changed:
+        invalidate_recipient_cache()
 
     create_audit_event(
         db,
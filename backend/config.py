@@ -41,6 +41,39 @@ class Settings(BaseSettings):
     EPR_API_KEY: str = ""
     EPR_TIMEOUT_SECONDS: int = 20
     EPR_HASH_SALT: str = ""
+    EPR_POOL_CONNECTIONS: int = 4
+    EPR_POOL_MAXSIZE: int = 10
+    EPR_RETRY_TOTAL: int = 2
+    EPR_RETRY_BACKOFF_SECONDS: float = 0.5
+    EPR_BATCH_CONCURRENCY: int = 8
+    EPR_BATCH_GROUP_SIZE: int = 50
+    EPR_PAGE_SIZE: int = 100  # _count hint per search page; 0 leaves it to the server
+    EPR_MAX_PAGES: int = 1000
+    EPR_SYNC_OVERLAP_SECONDS: int = 300
+    EPR_FETCH_LOCK_SECONDS: int = 120  # cross-worker per-patient fetch lease; longer than a slow fetch
+    EPR_FETCH_WAIT_SECONDS: int = 60
+    EPR_REFRESH_STALE_SECONDS: int = 3600
+    EPR_REFRESH_FRESH_SECONDS: int = 0  # if set, on-demand fetches within this of a sync are served locally
+    EPR_REFRESH_MAX_SECONDS: int = 60  # no refresh fetch starts after this; keep below SCHEDULER_LEASE_SECONDS
+    EPR_REFRESH_BATCH_SIZE: int = 200
+    EPR_REFRESH_CONCURRENCY: int = 4
+    EPR_REFRESH_REQUESTS_PER_MINUTE: int = 120
+    EPR_REQUEST_DEADLINE_SECONDS: float = 30.0  # overall EPR time per patient fetch; 0 disables
+    EPR_BREAKER_WINDOW: int = 20  # recent EPR calls considered by the circuit breaker
+    EPR_BREAKER_MIN_CALLS: int = 10
+    EPR_BREAKER_FAILURE_RATE: float = 0.5  # share of failed or slow calls that opens the breaker
+    EPR_BREAKER_SLOW_SECONDS: float = 5.0
+    EPR_BREAKER_OPEN_SECONDS: float = 30.0
+    EPR_STUB_SEED: int = 0  # EPR_MODE=STUB without EPR_BASE_URL serves a synthetic in-process EPR
+    EPR_STUB_LATENCY_MS: float = 50.0
+    EPR_STUB_JITTER_MS: float = 0.0
+    EPR_STUB_ERROR_RATE: float = 0.0
+    EPR_STUB_PAGE_SIZE: int = 50
+    EPR_STUB_OBSERVATIONS: int = 40
+    EPR_STUB_MEDICATIONS: int = 3
+    FHIR_PSEUDONYM_SYSTEM: str = ""  # identifier system holding the pseudonym; empty uses Patient.id
+    FHIR_IMPORT_BATCH_SIZE: int = 1000
+    FHIR_IMPORT_LOG_SECONDS: float = 10.0
 
     # Notifications
     IN_APP_NOTIFICATIONS_ENABLED: bool = True
@@ -51,17 +84,48 @@ class Settings(BaseSettings):
     TEAMS_WEBHOOK_URL: str = ""
     TEAM_INBOX_ID: str = "TEAM_INBOX"
     TEAM_LEAD_INBOX_ID: str = "TEAM_LEAD_INBOX"
+    NOTIFICATION_DIGEST_ENABLED: bool = False
 
     # Monitoring
     TASK_WINDOW_DAYS: int = 14
     ESCALATION_THRESHOLD_DAYS: int = 30
     RETENTION_DAYS: int = 90
+    RETENTION_BATCH_SIZE: int = 1000
+    RETENTION_BATCH_SLEEP_SECONDS: float = 0.1
+    RETENTION_ARCHIVE_PATH: str | None = None
+    # Monitoring events are clinical history; 0 keeps them, N purges those performed over N days ago.
+    RETENTION_EVENT_DAYS: int = 0
     SCHEDULING_HORIZON_YEARS: int = 5
+    THRESHOLD_INDEX_TTL_SECONDS: int = 300
+    REEVALUATION_SHARDS: int = 4
+    REEVALUATION_BATCH_SIZE: int = 1000
+    REEVALUATION_LEASE_SECONDS: int = 300
+    REEVALUATION_RUN_ON_CHANGE: bool = True  # process a queued run in the API worker after the response
+
+    # In-process periodic jobs (leader-elected across replicas)
+    SCHEDULER_ENABLED: bool = False
+    SCHEDULER_TICK_SECONDS: int = 30
+    SCHEDULER_LEASE_SECONDS: int = 120
+    JOB_STATUS_UPDATE_INTERVAL_SECONDS: int = 3600
+    JOB_WAIVER_REACTIVATION_INTERVAL_SECONDS: int = 3600
+    JOB_NOTIFICATIONS_INTERVAL_SECONDS: int = 900
+    JOB_RETENTION_INTERVAL_SECONDS: int = 86400
+    JOB_REEVALUATION_INTERVAL_SECONDS: int = 60
+    JOB_EPR_REFRESH_INTERVAL_SECONDS: int = 300
 
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_JSON: bool = True
     AUDIT_EXPORT_PATH: str | None = None
+    EXPORT_CHUNK_ROWS: int = 1000  # rows per database fetch and ZIP write in CSV exports
+    EXPORT_COMPRESSION_LEVEL: int = 6
+    # Incremental exports stop this far behind now, so rows from transactions
+    # still committing (stamped with their start time) land in the next window.
+    EXPORT_CURSOR_LAG_SECONDS: int = 60
+    EXPORT_PARQUET_ROW_GROUP_ROWS: int = 50000
+    EXPORT_PARQUET_COMPRESSION: str = "zstd"
+    EXPORT_CACHE_DIR: str = ""  # local directory for cached full exports; empty disables the cache
+    EXPORT_CACHE_MAX_BYTES: int = 1073741824
 
     # Environment
     ENVIRONMENT: str = "dev"
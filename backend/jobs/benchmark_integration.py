@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Sequence
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def synthetic_nhs_numbers(count: int, seed: int = 0) -> list[str]:
+    """Checksum-valid, made-up NHS numbers; the EPR stub resolves any identifier."""
+    rng = random.Random(seed)
+    numbers: list[str] = []
+    while len(numbers) < count:
+        digits = [rng.randrange(10) for _ in range(9)]
+        check = 11 - sum(digit * (10 - index) for index, digit in enumerate(digits)) % 11
+        if check == 10:
+            continue
+        numbers.append("".join(map(str, digits)) + str(0 if check == 11 else check))
+    return numbers
+
+
+def run_benchmark(
+    send: Callable[[str], int],
+    nhs_numbers: Sequence[str],
+    total: int,
+    concurrency: int,
+) -> dict:
+    """Issue ``total`` calls of ``send`` across ``concurrency`` threads.
+
+    ``send`` performs one fetch and returns its HTTP status; patients are
+    reused round-robin, so ``total`` above ``len(nhs_numbers)`` exercises
+    the cached and coalesced paths.
+    """
+
+    def _timed(index: int) -> tuple[float, str]:
+        started = time.perf_counter()
+        try:
+            status = str(send(nhs_numbers[index % len(nhs_numbers)]))
+        except Exception as exc:
+            status = type(exc).__name__
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(_timed, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([seconds for seconds, _ in results], dtype=float) * 1000
+    percentiles = np.percentile(latencies, [50, 95, 99]) if total else [0.0, 0.0, 0.0]
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "patients": len(nhs_numbers),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(float(percentiles[0]), 2),
+            "p95": round(float(percentiles[1]), 2),
+            "p99": round(float(percentiles[2]), 2),
+            "max": round(float(latencies.max()), 2) if total else 0.0,
+        },
+        "status": dict(Counter(status for _, status in results)),
+    }
+
+
+def http_sender(
+    base_url: str,
+    api_key: str,
+    concurrency: int,
+    full_refresh: bool = False,
+    timeout: float = 60,
+) -> Callable[[str], int]:
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+    url = f"{base_url.rstrip('/')}/integration/fetch-monitoring"
+    headers = {"X-API-Key": api_key}
+
+    def send(nhs_number: str) -> int:
+        response = session.post(
+            url,
+            json={"nhs_number": nhs_number, "source_system": "BENCHMARK", "full_refresh": full_refresh},
+            headers=headers,
+            timeout=timeout,
+        )
+        return response.status_code
+
+    return send
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test /integration/fetch-monitoring and report latency")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/v1", help="API base URL")
+    parser.add_argument("--api-key", default=os.getenv("INTEGRATION_API_KEY", ""), help="Plain integration API key")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--patients", type=int, default=50, help="Distinct synthetic patients to cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-refresh", action="store_true", help="Bypass sync watermarks and the fresh cache")
+    args = parser.parse_args(argv)
+    send = http_sender(args.url, args.api_key, args.concurrency, full_refresh=args.full_refresh)
+    report = run_benchmark(send, synthetic_nhs_numbers(args.patients, args.seed), args.requests, args.concurrency)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
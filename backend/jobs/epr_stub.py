@@ -0,0 +1,41 @@
+import argparse
+import json
+
+from ..services.epr_stub import StubConfig, StubEPRServer
+
+
+def main(argv: list[str] | None = None) -> None:
+    defaults = StubConfig.from_settings()
+    parser = argparse.ArgumentParser(description="Serve a synthetic FHIR-ish EPR for local load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of requests answered 503")
+    parser.add_argument("--page-size", type=int, default=defaults.page_size, help="Entries per page without _count")
+    parser.add_argument("--observations", type=int, default=defaults.observations, help="Observations per patient")
+    parser.add_argument("--medications", type=int, default=defaults.medications, help="Medications per patient")
+    args = parser.parse_args(argv)
+    config = StubConfig(
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        page_size=args.page_size,
+        observations=args.observations,
+        medications=args.medications,
+    )
+    server = StubEPRServer(config, host=args.host, port=args.port)
+    # Point the API at it with EPR_MODE=STUB and EPR_BASE_URL=<url>.
+    print(json.dumps({"url": server.url, **vars(config)}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
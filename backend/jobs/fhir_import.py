@@ -0,0 +1,37 @@
+import argparse
+import json
+import logging
+
+from ..config import get_settings
+from ..database import get_sessionmaker
+from ..logging_config import configure_logging
+from ..services.fhir_bulk_import import FHIRBulkImporter
+
+logger = logging.getLogger(__name__)
+
+
+def run_fhir_import(paths: list[str], batch_size: int | None = None) -> dict:
+    SessionLocal = get_sessionmaker()
+    db = SessionLocal()
+    try:
+        return FHIRBulkImporter(db, batch_size=batch_size).import_paths(paths)
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Import FHIR Bulk Data NDJSON exports")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="NDJSON files (optionally .gz) or directories of them; Patient files are read first",
+    )
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per upsert batch")
+    args = parser.parse_args(argv)
+    # Progress (rows/s) is logged to stderr; the summary goes to stdout.
+    configure_logging(get_settings())
+    print(json.dumps(run_fhir_import(args.paths, args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
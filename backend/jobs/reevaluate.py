@@ -0,0 +1,46 @@
+import argparse
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from ..database import get_sessionmaker
+from ..services.reevaluation import ReevaluationService
+
+logger = logging.getLogger(__name__)
+
+
+def run_reevaluation(max_shards: int | None = None) -> dict[str, int]:
+    """Work through queued re-evaluation shards in this process."""
+    SessionLocal = get_sessionmaker()
+    db = SessionLocal()
+    try:
+        return ReevaluationService(db).run_pending(max_shards=max_shards)
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-evaluate stored events after threshold changes")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Worker processes; each claims its own shards through a lease",
+    )
+    parser.add_argument("--max-shards", type=int, default=None, help="Stop after this many shards per process")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        totals = run_reevaluation(args.max_shards)
+    else:
+        # Spawned workers build their own engine instead of inheriting pooled connections.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.processes, mp_context=context) as pool:
+            results = list(pool.map(run_reevaluation, [args.max_shards] * args.processes))
+        totals = {key: sum(result[key] for result in results) for key in results[0]}
+    print(json.dumps(totals, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import json
+import logging
+
+from ..database import get_sessionmaker
+from ..services.retention import RetentionEngine
+
+logger = logging.getLogger(__name__)
+
+
+def run_retention(dry_run: bool = False) -> dict[str, int]:
+    SessionLocal = get_sessionmaker()
+    db = SessionLocal()
+    try:
+        engine = RetentionEngine(db)
+        if dry_run:
+            report = engine.report()
+            logger.info("Retention dry run (%s days): %s", engine.retention_days, report)
+            return report
+        return engine.purge()
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Purge rows older than RETENTION_DAYS")
+    parser.add_argument("--dry-run", action="store_true", help="Only report row counts")
+    args = parser.parse_args(argv)
+    print(json.dumps(run_retention(dry_run=args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator
+
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_sessionmaker
+from ..models.jobs import ScheduledJobRun
+from ..services.integration_service import IntegrationService
+from ..services.leases import LeaseLock
+from ..services.leases import node_id as make_node_id
+from ..services.notification_engine import NotificationEngine
+from ..services.reevaluation import ReevaluationService
+from ..services.retention import RetentionEngine
+from ..services.task_generator import TaskGenerator
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "periodic_jobs"
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval_seconds: int
+    func: Callable[[Session], Any]
+
+
+def _status_update(db: Session) -> dict[str, int]:
+    return {"overdue": len(TaskGenerator(db).mark_overdue())}
+
+
+def _waiver_reactivation(db: Session) -> dict[str, int]:
+    return {"reactivated": len(TaskGenerator(db).reactivate_waivers())}
+
+
+def _notifications(db: Session) -> dict[str, int]:
+    engine = NotificationEngine(db)
+    pending = engine.pending_overdue_task_ids()
+    created = engine.process_overdue_tasks(task_ids=pending) if pending else 0
+    return {"notifications": created}
+
+
+def _retention(db: Session) -> dict[str, int]:
+    return RetentionEngine(db).purge()
+
+
+def _reevaluation(db: Session) -> dict[str, int]:
+    return ReevaluationService(db).run_pending()
+
+
+def _epr_refresh(db: Session) -> dict[str, int]:
+    return IntegrationService(db).refresh_due()
+
+
+def default_jobs() -> list[PeriodicJob]:
+    settings = get_settings()
+    jobs = [
+        PeriodicJob("status_update", settings.JOB_STATUS_UPDATE_INTERVAL_SECONDS, _status_update),
+        PeriodicJob(
+            "waiver_reactivation",
+            settings.JOB_WAIVER_REACTIVATION_INTERVAL_SECONDS,
+            _waiver_reactivation,
+        ),
+        PeriodicJob("notifications", settings.JOB_NOTIFICATIONS_INTERVAL_SECONDS, _notifications),
+        PeriodicJob("retention", settings.JOB_RETENTION_INTERVAL_SECONDS, _retention),
+        PeriodicJob("reevaluation", settings.JOB_REEVALUATION_INTERVAL_SECONDS, _reevaluation),
+    ]
+    if settings.EPR_MODE != "OFF":
+        jobs.append(PeriodicJob("epr_refresh", settings.JOB_EPR_REFRESH_INTERVAL_SECONDS, _epr_refresh))
+    return jobs
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class PeriodicScheduler:
+    """Runs periodic jobs in a background thread on exactly one replica.
+
+    Leadership is a lease row in ``scheduler_leases`` that the holder renews
+    before every job and, from a heartbeat thread, every third of
+    ``SCHEDULER_LEASE_SECONDS`` while a job runs, so a long job never lets
+    another replica take over mid-run. Any replica may take the lease once
+    it expires. Job cadence is read from ``scheduled_job_runs`` so a new
+    leader continues the schedule.
+    """
+
+    def __init__(self, jobs: list[PeriodicJob] | None = None, node_id: str | None = None) -> None:
+        settings = get_settings()
+        self.jobs = jobs if jobs is not None else default_jobs()
+        self.node_id = node_id or make_node_id()
+        self.tick_seconds = settings.SCHEDULER_TICK_SECONDS
+        self.lease_seconds = settings.SCHEDULER_LEASE_SECONDS
+        self._lease = LeaseLock(LEASE_NAME, self.lease_seconds, holder=self.node_id)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="periodic-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Periodic scheduler started (%s jobs)", len(self.jobs))
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.tick_seconds + 5)
+        self._thread = None
+        self.release()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Periodic scheduler tick failed")
+            self._stop.wait(self.tick_seconds)
+
+    def tick(self) -> int:
+        """Renew leadership and run every due job; returns the number run."""
+        ran = 0
+        for job in self.jobs:
+            if self._stop.is_set() or not self.acquire():
+                break
+            if self._run_if_due(job):
+                ran += 1
+        return ran
+
+    def acquire(self) -> bool:
+        return self._lease.acquire()
+
+    def release(self) -> None:
+        self._lease.release()
+
+    @contextmanager
+    def _heartbeat(self) -> Iterator[None]:
+        stop = threading.Event()
+
+        def _renew() -> None:
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    renewed = self.acquire()
+                except Exception:
+                    logger.exception("Scheduler lease renewal failed; retrying")
+                    continue
+                if not renewed:
+                    logger.error("Scheduler lease %s lost while a job was running", LEASE_NAME)
+                    return
+
+        thread = threading.Thread(target=_renew, name="scheduler-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def _run_if_due(self, job: PeriodicJob) -> bool:
+        SessionLocal = get_sessionmaker()
+        db = SessionLocal()
+        try:
+            run = db.query(ScheduledJobRun).filter_by(job_name=job.name).first()
+            now = datetime.now(timezone.utc)
+            last_started = _as_utc(run.last_started_at) if run else None
+            if last_started is not None:
+                due_at = last_started + timedelta(seconds=job.interval_seconds)
+                if now < due_at:
+                    return False
+                lag = (now - due_at).total_seconds()
+            else:
+                lag = 0.0
+            if run is None:
+                run = ScheduledJobRun(job_name=job.name, run_count=0)
+                db.add(run)
+            run.last_started_at = now
+            run.last_lag_seconds = lag
+            run.last_holder = self.node_id
+            db.commit()
+
+            started = time.perf_counter()
+            job_db = SessionLocal()
+            try:
+                with self._heartbeat():
+                    result = job.func(job_db)
+                run.last_status = "OK"
+                run.last_error = None
+                run.last_result = result
+            except Exception as exc:
+                job_db.rollback()
+                logger.exception("Periodic job %s failed", job.name)
+                run.last_status = "FAILED"
+                run.last_error = str(exc)[:2000]
+            finally:
+                job_db.close()
+            run.last_duration_seconds = round(time.perf_counter() - started, 3)
+            run.last_finished_at = datetime.now(timezone.utc)
+            run.run_count = (run.run_count or 0) + 1
+            db.commit()
+            logger.info(
+                "Periodic job %s %s in %.3fs (lag %.1fs)",
+                job.name,
+                run.last_status,
+                run.last_duration_seconds,
+                lag,
+            )
+            return True
+        finally:
+            db.close()
@@ -1,26 +1,74 @@
+import argparse
 import logging
+import time
+from contextlib import contextmanager
+from typing import Any
+
 from ..services.task_generator import TaskGenerator
 from ..services.notification_engine import NotificationEngine
+from ..services.sharding import Shard
 from ..database import get_sessionmaker
 
 logger = logging.getLogger(__name__)
 
 
-def daily_task_status_update() -> None:
-    logger.info("Starting daily task status update")
-    generator = TaskGenerator()
-    overdue_count = generator.update_task_statuses()
-    reactivated_count = generator.reactivate_expired_waivers()
+@contextmanager
+def _phase(timings: dict[str, float], name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 3)
+        logger.info("Phase %s finished in %.3fs", name, timings[name])
+
+
+def daily_task_status_update(shard: Shard | None = None) -> dict[str, Any]:
+    """Run the daily status pipeline in one session.
+
+    Status changes are set-based ``UPDATE ... RETURNING id`` statements; the
+    returned ids, plus any OVERDUE task still missing a notice, feed the
+    notification phase directly instead of re-reading every overdue task.
+    """
+    logger.info("Starting daily task status update (shard %s)", shard or "all")
+    timings: dict[str, float] = {}
     SessionLocal = get_sessionmaker()
     db = SessionLocal()
     try:
-        notification_count = NotificationEngine(db).process_overdue_tasks()
+        generator = TaskGenerator(db)
+        with _phase(timings, "mark_overdue"):
+            overdue_ids = generator.mark_overdue(shard)
+        with _phase(timings, "reactivate_waivers"):
+            reactivated_ids = generator.reactivate_waivers(shard)
+        with _phase(timings, "notify"):
+            engine = NotificationEngine(db)
+            pending = set(overdue_ids) | set(reactivated_ids)
+            pending.update(engine.pending_overdue_task_ids(shard))
+            notification_count = engine.process_overdue_tasks(task_ids=pending) if pending else 0
     finally:
         db.close()
-    logger.info("Updated %s tasks to OVERDUE", overdue_count)
-    logger.info("Reactivated %s expired waivers", reactivated_count)
+    logger.info("Updated %s tasks to OVERDUE", len(overdue_ids))
+    logger.info("Reactivated %s expired waivers", len(reactivated_ids))
     logger.info("Created %s overdue notifications", notification_count)
+    return {
+        "shard": str(shard) if shard else None,
+        "overdue": len(overdue_ids),
+        "reactivated": len(reactivated_ids),
+        "notifications": notification_count,
+        "timings": timings,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Daily monitoring task status update")
+    parser.add_argument(
+        "--shard",
+        type=Shard.parse,
+        default=None,
+        help="Process only shard k of n (0-based, e.g. 0/4) of the patient id space",
+    )
+    args = parser.parse_args(argv)
+    daily_task_status_update(args.shard)
 
 
 if __name__ == "__main__":
-    daily_task_status_update()
+    main()
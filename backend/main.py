@@ -14,6 +14,8 @@ from .api.audit import router as audit_router
 from .api.uploads import router as uploads_router
 from .api.notifications import router as notifications_router
 from .api.integration import router as integration_router
+from .api.series import router as series_router
+from .jobs.scheduler import PeriodicScheduler
 
 
 def create_app() -> FastAPI:
@@ -41,6 +43,15 @@ def create_app() -> FastAPI:
             ensure_default_admin(db)
         finally:
             db.close()
+        if settings.SCHEDULER_ENABLED:
+            app.state.scheduler = PeriodicScheduler()
+            app.state.scheduler.start()
+
+    @app.on_event("shutdown")
+    def shutdown() -> None:
+        scheduler = getattr(app.state, "scheduler", None)
+        if scheduler is not None:
+            scheduler.stop()
 
     app.include_router(health_router, prefix="/api/v1")
     app.include_router(auth_router, prefix="/api/v1")
@@ -53,6 +64,7 @@ def create_app() -> FastAPI:
     app.include_router(uploads_router, prefix="/api/v1")
     app.include_router(notifications_router, prefix="/api/v1")
     app.include_router(integration_router, prefix="/api/v1")
+    app.include_router(series_router, prefix="/api/v1")
 
     return app
 
@@ -1,7 +1,15 @@
 from .base import Base
 from .patient import Patient
 from .medication import MedicationOrder, DrugCategory
-from .monitoring import MonitoringEvent, MonitoringTask, PatientRiskFlags, TaskStatus, AbnormalFlag, ReviewStatus
+from .monitoring import (
+    MonitoringEvent,
+    MonitoringTask,
+    PatientRiskFlags,
+    ResolvedTaskSlot,
+    TaskStatus,
+    AbnormalFlag,
+    ReviewStatus,
+)
 from .audit import AuditEvent, NotificationLog
 from .notifications import (
     InAppNotification,
@@ -9,12 +17,14 @@ from .notifications import (
     NotificationType,
     RecipientType,
     InAppNotificationStatus,
+    NotificationDigestItem,
 )
 from .thresholds import ReferenceThreshold, ComparatorType
-from .integration import TrackedPatient
+from .integration import ExportTombstone, TrackedPatient
 from .user import User
 from .ruleset import RuleSetVersion
 from .config import SystemConfig
+from .jobs import SchedulerLease, ScheduledJobRun, ReevaluationRun, ReevaluationShard
 
 __all__ = [
     "Base",
@@ -24,6 +34,7 @@ __all__ = [
     "MonitoringEvent",
     "MonitoringTask",
     "PatientRiskFlags",
+    "ResolvedTaskSlot",
     "TaskStatus",
     "AbnormalFlag",
     "ReviewStatus",
@@ -34,10 +45,16 @@ __all__ = [
     "NotificationType",
     "RecipientType",
     "InAppNotificationStatus",
+    "NotificationDigestItem",
     "ReferenceThreshold",
     "ComparatorType",
     "TrackedPatient",
+    "ExportTombstone",
     "User",
     "RuleSetVersion",
     "SystemConfig",
+    "SchedulerLease",
+    "ScheduledJobRun",
+    "ReevaluationRun",
+    "ReevaluationShard",
 ]
@@ -1,10 +1,12 @@
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from .base import Base, UUIDMixin
 
 
 class TrackedPatient(Base, UUIDMixin):
     __tablename__ = "tracked_patients"
+    __table_args__ = (Index("ix_tracked_patients_patient_hash", "patient_hash"),)
 
     patient_id = mapped_column(ForeignKey("patients.id"), nullable=False, unique=True)
     patient_hash = mapped_column(String(128), nullable=True)
@@ -13,3 +15,24 @@ class TrackedPatient(Base, UUIDMixin):
     request_count = mapped_column(Integer, nullable=False, default=1)
     first_requested_at = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     last_requested_at = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Incremental sync watermarks: the next fetch asks only for resources updated after these.
+    medications_synced_at = mapped_column(DateTime(timezone=True), nullable=True)
+    observations_synced_at = mapped_column(DateTime(timezone=True), nullable=True)
+    # The EPR's logical patient id (never the NHS number), used by background refresh.
+    epr_patient_ref = mapped_column(String(128), nullable=True)
+    last_sync_attempt_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_sync_status = mapped_column(String(16), nullable=True)
+    last_sync_error = mapped_column(String(255), nullable=True)
+
+
+class ExportTombstone(Base, UUIDMixin):
+    """A row removed by retention, reported to incremental export consumers."""
+
+    __tablename__ = "export_tombstones"
+    __table_args__ = (Index("ix_export_tombstones_deleted_at_id", "deleted_at", "id"),)
+
+    entity = mapped_column(String(32), nullable=False)
+    entity_id = mapped_column(UUID(as_uuid=True), nullable=False)
+    # No foreign key: the tombstone outlives the row and must not block deletes.
+    patient_id = mapped_column(UUID(as_uuid=True), nullable=True)
+    deleted_at = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,53 @@
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, JSON, String, Text, UniqueConstraint
+from sqlalchemy.orm import mapped_column
+from .base import Base, UUIDMixin, TimestampMixin
+
+
+class SchedulerLease(Base, UUIDMixin):
+    __tablename__ = "scheduler_leases"
+
+    name = mapped_column(String(64), unique=True, nullable=False)
+    holder = mapped_column(String(128), nullable=False)
+    expires_at = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ScheduledJobRun(Base, UUIDMixin):
+    __tablename__ = "scheduled_job_runs"
+
+    job_name = mapped_column(String(64), unique=True, nullable=False)
+    last_started_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_finished_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_duration_seconds = mapped_column(Float, nullable=True)
+    last_lag_seconds = mapped_column(Float, nullable=True)
+    last_status = mapped_column(String(16), nullable=True)
+    last_error = mapped_column(Text, nullable=True)
+    last_result = mapped_column(JSON, nullable=True)
+    last_holder = mapped_column(String(128), nullable=True)
+    run_count = mapped_column(Integer, nullable=False, default=0)
+
+
+class ReevaluationRun(Base, UUIDMixin, TimestampMixin):
+    __tablename__ = "reevaluation_runs"
+
+    monitoring_types = mapped_column(JSON, nullable=False)
+    status = mapped_column(String(16), nullable=False, default="PENDING")
+    shard_count = mapped_column(Integer, nullable=False)
+    requested_by = mapped_column(String(64), nullable=True)
+    total_events = mapped_column(Integer, nullable=True)
+    finished_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ReevaluationShard(Base, UUIDMixin):
+    __tablename__ = "reevaluation_shards"
+    __table_args__ = (UniqueConstraint("run_id", "shard_index", name="uq_reevaluation_shards_run_shard"),)
+
+    run_id = mapped_column(ForeignKey("reevaluation_runs.id"), nullable=False, index=True)
+    shard_index = mapped_column(Integer, nullable=False)
+    status = mapped_column(String(16), nullable=False, default="PENDING")
+    holder = mapped_column(String(128), nullable=True)
+    lease_expires_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_event_id = mapped_column(String(36), nullable=True)
+    scanned = mapped_column(Integer, nullable=False, default=0)
+    changed = mapped_column(Integer, nullable=False, default=0)
+    error = mapped_column(Text, nullable=True)
+    updated_at = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,42 @@
+"""Parsing of result values, shared by the event model and threshold evaluation.
+
+Kept free of database and service imports so models can use it.
+"""
+
+from __future__ import annotations
+
+import re
+
+NUMERIC_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*([a-zA-Z%µ/]+)?")
+
+
+def parse_numeric_value(value: str | None) -> tuple[float | None, str | None]:
+    if not value:
+        return None, None
+    match = NUMERIC_RE.search(str(value))
+    if not match:
+        return None, None
+    try:
+        numeric = float(match.group(1))
+    except ValueError:
+        return None, None
+    unit = match.group(2) or None
+    return numeric, unit
+
+
+def normalize_unit(unit: str | None) -> str | None:
+    if not unit:
+        return None
+    return unit.strip().replace(" ", "")
+
+
+def parse_measurement(value: str | None, unit: str | None) -> tuple[float | None, str | None]:
+    """Numeric value and normalized unit of a result, as threshold evaluation reads them.
+
+    An explicit ``unit`` wins over one embedded in ``value`` (e.g. "7.5 %").
+    ``MonitoringEvent`` applies it when ``value`` or ``unit`` is assigned on
+    an instance; Core or bulk ``update()`` statements bypass that, so they
+    must set ``numeric_value`` and ``unit_normalized`` from it themselves.
+    """
+    numeric, parsed_unit = parse_numeric_value(value)
+    return numeric, normalize_unit(unit or parsed_unit)
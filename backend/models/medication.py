@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Date, String, Enum, JSON, ForeignKey
+from sqlalchemy import Date, String, Enum, JSON, ForeignKey, Index
 from sqlalchemy.orm import mapped_column, relationship
 from .base import Base, UUIDMixin, TimestampMixin
 
@@ -12,6 +12,7 @@ class DrugCategory(str, enum.Enum):
 
 class MedicationOrder(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "medication_orders"
+    __table_args__ = (Index("ix_medication_orders_updated_at_id", "updated_at", "id"),)
 
     patient_id = mapped_column(ForeignKey("patients.id"), nullable=False)
     drug_name = mapped_column(String(128), nullable=False)
@@ -1,7 +1,9 @@
 import enum
-from sqlalchemy import Boolean, Date, DateTime, Enum, ForeignKey, String, Text
-from sqlalchemy.orm import mapped_column, relationship
+from sqlalchemy import Boolean, Date, DateTime, Enum, Float, ForeignKey, Index, String, Text
+from sqlalchemy.orm import mapped_column, relationship, validates
+from sqlalchemy.dialects.postgresql import UUID
 from .base import Base, UUIDMixin, TimestampMixin
+from .measurements import parse_measurement
 
 
 class TaskStatus(str, enum.Enum):
@@ -26,6 +28,18 @@ class ReviewStatus(str, enum.Enum):
 
 class MonitoringEvent(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "monitoring_events"
+    # numeric_value trails the first key so range scans by type and date are
+    # index-only; the second serves per-patient series.
+    __table_args__ = (
+        Index(
+            "ix_monitoring_events_type_date_value", "test_type", "performed_date", "numeric_value"
+        ),
+        Index(
+            "ix_monitoring_events_patient_type_date", "patient_id", "test_type", "performed_date"
+        ),
+        # Incremental export scans by change time.
+        Index("ix_monitoring_events_updated_at_id", "updated_at", "id"),
+    )
 
     patient_id = mapped_column(ForeignKey("patients.id"), nullable=False)
     medication_order_id = mapped_column(ForeignKey("medication_orders.id"), nullable=True)
@@ -33,6 +47,8 @@ class MonitoringEvent(Base, UUIDMixin, TimestampMixin):
     performed_date = mapped_column(Date, nullable=False)
     value = mapped_column(String(128), nullable=True)
     unit = mapped_column(String(32), nullable=True)
+    numeric_value = mapped_column(Float, nullable=True)
+    unit_normalized = mapped_column(String(128), nullable=True)
     interpretation = mapped_column(String(32), nullable=True)
     attachment_url = mapped_column(String(512), nullable=True)
     source_system = mapped_column(String(64), nullable=False)
@@ -51,6 +67,14 @@ class MonitoringEvent(Base, UUIDMixin, TimestampMixin):
     patient = relationship("Patient")
     medication = relationship("MedicationOrder")
 
+    @validates("value", "unit")
+    def _sync_measurement(self, key, value):
+        # ORM assignments only: Core/bulk update() must set both derived columns itself.
+        raw_value = value if key == "value" else self.value
+        unit = value if key == "unit" else self.unit
+        self.numeric_value, self.unit_normalized = parse_measurement(raw_value, unit)
+        return value
+
 
 class MonitoringTask(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "monitoring_tasks"
@@ -69,6 +93,23 @@ class MonitoringTask(Base, UUIDMixin, TimestampMixin):
     medication = relationship("MedicationOrder", back_populates="tasks")
 
 
+class ResolvedTaskSlot(Base, UUIDMixin):
+    """A DONE task purged by retention, kept so the schedule slot is not recreated."""
+
+    __tablename__ = "resolved_task_slots"
+    __table_args__ = (
+        Index("ix_resolved_task_slots_order_test_due", "medication_order_id", "test_type", "due_date"),
+    )
+
+    # No foreign keys, like export tombstones: the slot outlives the task.
+    patient_id = mapped_column(UUID(as_uuid=True), nullable=False)
+    medication_order_id = mapped_column(UUID(as_uuid=True), nullable=False)
+    test_type = mapped_column(String(64), nullable=False)
+    due_date = mapped_column(Date, nullable=False)
+    status = mapped_column(Enum(TaskStatus), nullable=False)
+    resolved_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
 class PatientRiskFlags(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "patient_risk_flags"
 
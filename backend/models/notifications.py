@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import DateTime, Enum, ForeignKey, JSON, String, Text
+from sqlalchemy import DateTime, Enum, ForeignKey, JSON, String, Text, func
 from sqlalchemy.orm import mapped_column
 from .base import Base, UUIDMixin, TimestampMixin
 
@@ -14,6 +14,7 @@ class NotificationType(str, enum.Enum):
     TASK_ESCALATED = "TASK_ESCALATED"
     EVENT_WARNING = "EVENT_WARNING"
     EVENT_CRITICAL = "EVENT_CRITICAL"
+    TASK_DIGEST = "TASK_DIGEST"
 
 
 class NotificationPriority(str, enum.Enum):
@@ -52,3 +53,13 @@ class InAppNotification(Base, UUIDMixin, TimestampMixin):
     dedupe_key = mapped_column(String(128), nullable=False, unique=True)
     viewed_at = mapped_column(DateTime(timezone=True), nullable=True)
     acked_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class NotificationDigestItem(Base, UUIDMixin):
+    __tablename__ = "notification_digest_items"
+
+    digest_id = mapped_column(ForeignKey("in_app_notifications.id"), nullable=False, index=True)
+    task_id = mapped_column(ForeignKey("monitoring_tasks.id"), nullable=False)
+    notification_type = mapped_column(Enum(NotificationType, name="notificationtype"), nullable=False)
+    dedupe_key = mapped_column(String(128), nullable=False, unique=True)
+    created_at = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import mapped_column, relationship, validates
 from .base import Base, UUIDMixin, TimestampMixin
 from .types import EncryptedString
@@ -8,6 +8,10 @@ from ..services.identifier_detection import find_identifier_matches
 
 class Patient(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index("ix_patients_updated_at_id", "updated_at", "id"),
+        Index("ix_patients_epr_patient_ref", "epr_patient_ref"),
+    )
 
     nhs_number = mapped_column(EncryptedString, nullable=True)
     mrn = mapped_column(EncryptedString, nullable=True)
@@ -16,6 +20,8 @@ class Patient(Base, UUIDMixin, TimestampMixin):
     sex = mapped_column(String(8), nullable=True)
     ethnicity = mapped_column(String(64), nullable=True)
     service = mapped_column(String(64), nullable=True)
+    # FHIR logical id of the source Patient, when it differs from the pseudonym.
+    epr_patient_ref = mapped_column(String(128), nullable=True)
 
     medications = relationship("MedicationOrder", back_populates="patient")
     risk_flags = relationship("PatientRiskFlags", back_populates="patient", uselist=False)
@@ -1,17 +1,52 @@
 from __future__ import annotations
 
-import re
+import threading
+import time
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Iterable
 
+import numpy as np
+import pandas as pd
 from sqlalchemy.orm import Session
 
+from ..config import get_settings
+from ..models.measurements import NUMERIC_RE, normalize_unit
 from ..models.monitoring import AbnormalFlag, MonitoringEvent, ReviewStatus
 from ..models.patient import Patient
 from ..models.thresholds import ComparatorType, ReferenceThreshold
 
 
-_NUMERIC_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*([a-zA-Z%µ/]+)?")
+BULK_COLUMNS = [
+    "test_type",
+    "value",
+    "unit",
+    "numeric_value",
+    "unit_normalized",
+    "interpretation",
+    "sex",
+    "age_band",
+    "source_system",
+]
+# Outcome codes of the vectorized comparison, in _compare_numeric check order.
+_NUMERIC_FLAGS = np.array(
+    [
+        AbnormalFlag.UNKNOWN,
+        AbnormalFlag.OUTSIDE_CRITICAL,
+        AbnormalFlag.OUTSIDE_WARNING,
+        AbnormalFlag.OUTSIDE_CRITICAL,
+        AbnormalFlag.OUTSIDE_WARNING,
+        AbnormalFlag.NORMAL,
+    ],
+    dtype=object,
+)
+_NUMERIC_REASONS = np.array(
+    ["NO_LIMITS", "LOW_CRITICAL", "LOW_WARNING", "HIGH_CRITICAL", "HIGH_WARNING", None],
+    dtype=object,
+)
+# Stands in for a missing unit in join keys so the merge never relies on NaN
+# matching. Printable: pandas drops a NUL fill value to "".
+_NO_UNIT = "<none>"
 
 
 @dataclass
@@ -23,24 +58,156 @@ class AbnormalEvaluation:
     unit: str | None
 
 
-def _parse_numeric_value(value: str | None) -> tuple[float | None, str | None]:
-    if not value:
-        return None, None
-    match = _NUMERIC_RE.search(str(value))
-    if not match:
-        return None, None
-    try:
-        numeric = float(match.group(1))
-    except ValueError:
-        return None, None
-    unit = match.group(2) or None
-    return numeric, unit
+@dataclass(frozen=True)
+class CompiledThreshold:
+    id: str
+    sex: str | None
+    age_band: str | None
+    source_system_scope: str | None
+    low_critical: float | None
+    low_warning: float | None
+    high_warning: float | None
+    high_critical: float | None
+    coded_values: frozenset[str]
 
 
-def _normalize_unit(unit: str | None) -> str | None:
-    if not unit:
-        return None
-    return unit.strip().replace(" ", "")
+@dataclass(frozen=True)
+class ThresholdIndex:
+    """Enabled thresholds compiled for query-free evaluation.
+
+    ``numeric`` is keyed by (monitoring_type, normalized unit) and each entry is
+    pre-sorted by specificity, so the first demographic match wins.
+    """
+
+    monitoring_types: frozenset[str]
+    coded: dict[str, tuple[CompiledThreshold, ...]]
+    numeric: dict[tuple[str, str | None], tuple[CompiledThreshold, ...]]
+
+    @cached_property
+    def coded_frame(self) -> pd.DataFrame:
+        records = [
+            (monitoring_type, code, rank, threshold.id)
+            for monitoring_type, thresholds in self.coded.items()
+            for rank, threshold in enumerate(thresholds)
+            for code in threshold.coded_values
+        ]
+        return pd.DataFrame.from_records(
+            records, columns=["test_type", "code", "rank", "threshold_id"]
+        ).drop_duplicates(["test_type", "code", "rank"])
+
+    @cached_property
+    def numeric_frame(self) -> pd.DataFrame:
+        records = [
+            (
+                monitoring_type,
+                _NO_UNIT if unit is None else unit,
+                rank,
+                threshold.id,
+                threshold.sex or None,
+                threshold.age_band or None,
+                threshold.source_system_scope or None,
+                np.nan if threshold.low_critical is None else threshold.low_critical,
+                np.nan if threshold.low_warning is None else threshold.low_warning,
+                np.nan if threshold.high_warning is None else threshold.high_warning,
+                np.nan if threshold.high_critical is None else threshold.high_critical,
+            )
+            for (monitoring_type, unit), thresholds in self.numeric.items()
+            for rank, threshold in enumerate(thresholds)
+        ]
+        return pd.DataFrame.from_records(
+            records,
+            columns=[
+                "test_type",
+                "unit_key",
+                "rank",
+                "threshold_id",
+                "th_sex",
+                "th_age_band",
+                "th_scope",
+                "low_critical",
+                "low_warning",
+                "high_warning",
+                "high_critical",
+            ],
+        )
+
+
+def _specificity(threshold: ReferenceThreshold) -> int:
+    score = 0
+    if threshold.sex:
+        score += 2
+    if threshold.age_band:
+        score += 1
+    if threshold.source_system_scope:
+        score += 2
+    return score
+
+
+def compile_thresholds(thresholds: Iterable[ReferenceThreshold]) -> ThresholdIndex:
+    monitoring_types: set[str] = set()
+    coded: dict[str, list[CompiledThreshold]] = {}
+    numeric: dict[tuple[str, str | None], list[tuple[int, CompiledThreshold]]] = {}
+    for threshold in thresholds:
+        monitoring_types.add(threshold.monitoring_type)
+        compiled = CompiledThreshold(
+            id=str(threshold.id),
+            sex=threshold.sex,
+            age_band=threshold.age_band,
+            source_system_scope=threshold.source_system_scope,
+            low_critical=threshold.low_critical,
+            low_warning=threshold.low_warning,
+            high_warning=threshold.high_warning,
+            high_critical=threshold.high_critical,
+            coded_values=frozenset(str(val).upper() for val in threshold.coded_abnormal_values or []),
+        )
+        if threshold.comparator_type == ComparatorType.CODED:
+            coded.setdefault(threshold.monitoring_type, []).append(compiled)
+        elif threshold.comparator_type == ComparatorType.NUMERIC:
+            key = (threshold.monitoring_type, normalize_unit(threshold.unit))
+            numeric.setdefault(key, []).append((_specificity(threshold), compiled))
+    return ThresholdIndex(
+        monitoring_types=frozenset(monitoring_types),
+        coded={key: tuple(items) for key, items in coded.items()},
+        numeric={
+            # sorted() is stable, so equally specific thresholds keep load order.
+            key: tuple(item for _score, item in sorted(items, key=lambda pair: -pair[0]))
+            for key, items in numeric.items()
+        },
+    )
+
+
+_index_lock = threading.Lock()
+_index_version = 0
+_index_cache: dict[str, tuple[int, float, ThresholdIndex]] = {}
+
+
+def invalidate_threshold_index() -> None:
+    """Call after any change to reference_thresholds in this process."""
+    global _index_version
+    with _index_lock:
+        _index_version += 1
+        _index_cache.clear()
+
+
+def get_threshold_index(db: Session) -> ThresholdIndex:
+    # Keyed per database so separate engines never share an index. Other
+    # workers pick up changes once THRESHOLD_INDEX_TTL_SECONDS elapses.
+    key = str(db.get_bind().url)
+    ttl = get_settings().THRESHOLD_INDEX_TTL_SECONDS
+    entry = _index_cache.get(key)
+    now = time.monotonic()
+    if entry is not None and entry[0] == _index_version and now - entry[1] < ttl:
+        return entry[2]
+    with _index_lock:
+        version = _index_version
+    thresholds = (
+        db.query(ReferenceThreshold).filter(ReferenceThreshold.enabled.is_(True)).all()
+    )
+    index = compile_thresholds(thresholds)
+    with _index_lock:
+        if version == _index_version:
+            _index_cache[key] = (version, now, index)
+    return index
 
 
 class ThresholdEvaluator:
@@ -48,8 +215,8 @@ class ThresholdEvaluator:
         self.db = db
 
     def evaluate_event(self, event: MonitoringEvent, patient: Patient) -> AbnormalEvaluation:
-        thresholds = self._get_thresholds(event)
-        if not thresholds:
+        index = get_threshold_index(self.db)
+        if event.test_type not in index.monitoring_types:
             return AbnormalEvaluation(
                 flag=AbnormalFlag.UNKNOWN,
                 reason="NO_THRESHOLDS",
@@ -58,23 +225,25 @@ class ThresholdEvaluator:
                 unit=None,
             )
 
-        coded_match = self._evaluate_coded(event, thresholds)
+        coded_match = self._evaluate_coded(event, index.coded.get(event.test_type, ()))
         if coded_match is not None:
             return coded_match
 
-        numeric_value, unit = _parse_numeric_value(event.value)
-        unit = event.unit or unit
+        # Parsed once when value/unit are assigned (see MonitoringEvent).
+        numeric_value = event.numeric_value
         if numeric_value is None:
             return AbnormalEvaluation(
                 flag=AbnormalFlag.UNKNOWN,
                 reason="NON_NUMERIC_VALUE",
                 threshold_id=None,
                 numeric_value=None,
-                unit=unit,
+                unit=event.unit or None,
             )
 
-        unit_norm = _normalize_unit(unit)
-        threshold = self._select_numeric_threshold(thresholds, patient, event, unit_norm)
+        unit_norm = event.unit_normalized
+        threshold = self._select_numeric_threshold(
+            index.numeric.get((event.test_type, unit_norm), ()), patient, event
+        )
         if not threshold:
             return AbnormalEvaluation(
                 flag=AbnormalFlag.UNKNOWN,
@@ -88,11 +257,160 @@ class ThresholdEvaluator:
         return AbnormalEvaluation(
             flag=flag,
             reason=reason,
-            threshold_id=str(threshold.id),
+            threshold_id=threshold.id,
             numeric_value=numeric_value,
             unit=unit_norm,
         )
 
+    def evaluate_event_batch(
+        self, pairs: Iterable[tuple[MonitoringEvent, Patient]]
+    ) -> list[AbnormalEvaluation]:
+        pairs = list(pairs)
+        columns = {
+            "test_type": [event.test_type for event, _ in pairs],
+            "value": [event.value for event, _ in pairs],
+            "unit": [event.unit for event, _ in pairs],
+            "numeric_value": [event.numeric_value for event, _ in pairs],
+            "unit_normalized": [event.unit_normalized for event, _ in pairs],
+            "interpretation": [event.interpretation for event, _ in pairs],
+            "sex": [patient.sex for _, patient in pairs],
+            "age_band": [patient.age_band for _, patient in pairs],
+            "source_system": [event.source_system for event, _ in pairs],
+        }
+        frame = pd.DataFrame({name: pd.Series(values, dtype=object) for name, values in columns.items()})
+        return self.evaluate_events_bulk(frame)
+
+    def evaluate_events_bulk(self, frame: pd.DataFrame) -> list[AbnormalEvaluation]:
+        """Vectorized equivalent of ``evaluate_event`` over a batch.
+
+        ``frame`` holds one row per event with the ``BULK_COLUMNS`` columns;
+        results are returned in row order and match the scalar path exactly.
+        Without the stored ``numeric_value``/``unit_normalized`` columns the
+        raw ``value`` is parsed instead.
+        """
+        n = len(frame)
+        if n == 0:
+            return []
+        index = get_threshold_index(self.db)
+        frame = frame.reset_index(drop=True)
+
+        def _column(name: str) -> pd.Series:
+            if name in frame.columns:
+                return frame[name].astype(object)
+            return pd.Series([None] * n, dtype=object)
+
+        def _present(series: pd.Series) -> np.ndarray:
+            return (series.notna() & (series.astype(str) != "")).to_numpy()
+
+        test_type = _column("test_type")
+        # np.full would coerce the str-based enum through a unicode array.
+        flag = np.array([AbnormalFlag.UNKNOWN] * n, dtype=object)
+        reason = np.array(["NO_THRESHOLDS"] * n, dtype=object)
+        threshold_id = np.empty(n, dtype=object)
+        numeric_out = np.empty(n, dtype=object)
+        unit_out = np.empty(n, dtype=object)
+        pending = test_type.isin(index.monitoring_types).to_numpy()
+
+        # Coded interpretations take precedence over numeric values.
+        interpretation = _column("interpretation")
+        interpretation = interpretation.where(interpretation.notna(), "").astype(str).str.strip()
+        coded_rows = pending & (interpretation != "").to_numpy()
+        if coded_rows.any() and not index.coded_frame.empty:
+            probe = pd.DataFrame(
+                {
+                    "row": np.flatnonzero(coded_rows),
+                    "test_type": test_type[coded_rows].to_numpy(),
+                    "code": interpretation[coded_rows].str.upper().to_numpy(),
+                }
+            )
+            matched = (
+                probe.merge(index.coded_frame, on=["test_type", "code"])
+                .sort_values(["row", "rank"])
+                .drop_duplicates("row")
+            )
+            rows = matched["row"].to_numpy()
+            flag[rows] = AbnormalFlag.OUTSIDE_CRITICAL
+            reason[rows] = "CODED_ABNORMAL"
+            threshold_id[rows] = matched["threshold_id"].to_numpy()
+            pending[rows] = False
+
+        event_unit = _column("unit")
+        if "numeric_value" in frame.columns:
+            # Values parsed at ingestion and stored on the event.
+            numeric = pd.to_numeric(frame["numeric_value"], errors="coerce").to_numpy(dtype=float)
+            unit = event_unit.where(_present(event_unit), None)
+            unit_norm = _column("unit_normalized")
+            unit_norm = unit_norm.where(unit_norm.notna(), None)
+            unit_present = unit_norm.notna().to_numpy()
+        else:
+            # One vectorized regex pass replaces parse_numeric_value per event.
+            value = _column("value")
+            truthy = np.fromiter(
+                (v is not None and v is not pd.NA and bool(v) for v in value), dtype=bool, count=n
+            )
+            text = value.astype(str).where(truthy)
+            extracted = text.str.extract(NUMERIC_RE.pattern)
+            numeric = extracted[0].astype(float).to_numpy()
+            unit = event_unit.where(_present(event_unit), extracted[1])
+            unit = unit.where(unit.notna(), None)
+            unit_present = _present(unit)
+            unit_norm = unit.astype(str).str.strip().str.replace(" ", "", regex=False)
+            unit_norm = unit_norm.where(unit_present, None)
+
+        non_numeric = pending & np.isnan(numeric)
+        flag[non_numeric] = AbnormalFlag.UNKNOWN
+        reason[non_numeric] = "NON_NUMERIC_VALUE"
+        unit_out[non_numeric] = unit[non_numeric].to_numpy()
+        pending &= ~non_numeric
+        if not pending.any():
+            return _build_evaluations(flag, reason, threshold_id, numeric_out, unit_out)
+
+        numeric_out[pending] = numeric[pending]
+        unit_out[pending] = unit_norm[pending].to_numpy()
+        flag[pending] = AbnormalFlag.UNKNOWN
+        reason[pending] = "UNIT_MISMATCH"
+        if index.numeric_frame.empty:
+            return _build_evaluations(flag, reason, threshold_id, numeric_out, unit_out)
+
+        probe = pd.DataFrame(
+            {
+                "row": np.flatnonzero(pending),
+                "test_type": test_type[pending].to_numpy(),
+                "unit_key": unit_norm[pending].where(unit_present[pending], _NO_UNIT).to_numpy(),
+                "sex": _column("sex")[pending].to_numpy(),
+                "age_band": _column("age_band")[pending].to_numpy(),
+                "source_system": _column("source_system")[pending].to_numpy(),
+            }
+        )
+        joined = probe.merge(index.numeric_frame, on=["test_type", "unit_key"])
+        applicable = (
+            (joined["th_sex"].isna() | (joined["th_sex"] == joined["sex"]))
+            & (joined["th_age_band"].isna() | (joined["th_age_band"] == joined["age_band"]))
+            & (joined["th_scope"].isna() | (joined["th_scope"] == joined["source_system"]))
+        )
+        selected = joined[applicable].sort_values(["row", "rank"]).drop_duplicates("row")
+        if selected.empty:
+            return _build_evaluations(flag, reason, threshold_id, numeric_out, unit_out)
+
+        rows = selected["row"].to_numpy()
+        values = numeric[rows]
+        low_critical = selected["low_critical"].to_numpy(dtype=float)
+        low_warning = selected["low_warning"].to_numpy(dtype=float)
+        high_warning = selected["high_warning"].to_numpy(dtype=float)
+        high_critical = selected["high_critical"].to_numpy(dtype=float)
+        conditions = [
+            np.isnan(low_critical) & np.isnan(low_warning) & np.isnan(high_warning) & np.isnan(high_critical),
+            values < low_critical,
+            values < low_warning,
+            values > high_critical,
+            values > high_warning,
+        ]
+        outcome = np.select(conditions, [0, 1, 2, 3, 4], default=5)
+        flag[rows] = _NUMERIC_FLAGS[outcome]
+        reason[rows] = _NUMERIC_REASONS[outcome]
+        threshold_id[rows] = selected["threshold_id"].to_numpy()
+        return _build_evaluations(flag, reason, threshold_id, numeric_out, unit_out)
+
     def apply_evaluation(self, event: MonitoringEvent, evaluation: AbnormalEvaluation) -> None:
         event.abnormal_flag = evaluation.flag
         event.abnormal_reason_code = evaluation.reason
@@ -105,33 +423,19 @@ class ThresholdEvaluator:
             event.reviewed_by = None
             event.reviewed_at = None
 
-    def _get_thresholds(self, event: MonitoringEvent) -> list[ReferenceThreshold]:
-        return (
-            self.db.query(ReferenceThreshold)
-            .filter(
-                ReferenceThreshold.monitoring_type == event.test_type,
-                ReferenceThreshold.enabled.is_(True),
-            )
-            .all()
-        )
-
     def _evaluate_coded(
-        self, event: MonitoringEvent, thresholds: Iterable[ReferenceThreshold]
+        self, event: MonitoringEvent, thresholds: Iterable[CompiledThreshold]
     ) -> AbnormalEvaluation | None:
         interpretation = (event.interpretation or "").strip()
         if not interpretation:
             return None
         interpretation_upper = interpretation.upper()
         for threshold in thresholds:
-            if threshold.comparator_type != ComparatorType.CODED:
-                continue
-            coded_values = threshold.coded_abnormal_values or []
-            coded_values_upper = {str(val).upper() for val in coded_values}
-            if interpretation_upper in coded_values_upper:
+            if interpretation_upper in threshold.coded_values:
                 return AbnormalEvaluation(
                     flag=AbnormalFlag.OUTSIDE_CRITICAL,
                     reason="CODED_ABNORMAL",
-                    threshold_id=str(threshold.id),
+                    threshold_id=threshold.id,
                     numeric_value=None,
                     unit=None,
                 )
@@ -139,43 +443,22 @@ class ThresholdEvaluator:
 
     def _select_numeric_threshold(
         self,
-        thresholds: Iterable[ReferenceThreshold],
+        candidates: Iterable[CompiledThreshold],
         patient: Patient,
         event: MonitoringEvent,
-        unit: str | None,
-    ) -> ReferenceThreshold | None:
-        candidates: list[ReferenceThreshold] = []
-        for threshold in thresholds:
-            if threshold.comparator_type != ComparatorType.NUMERIC:
-                continue
-            if _normalize_unit(threshold.unit) != unit:
-                continue
+    ) -> CompiledThreshold | None:
+        for threshold in candidates:
             if threshold.sex and threshold.sex != patient.sex:
                 continue
             if threshold.age_band and threshold.age_band != patient.age_band:
                 continue
             if threshold.source_system_scope and threshold.source_system_scope != event.source_system:
                 continue
-            candidates.append(threshold)
-
-        if not candidates:
-            return None
-
-        def _score(threshold: ReferenceThreshold) -> int:
-            score = 0
-            if threshold.sex:
-                score += 2
-            if threshold.age_band:
-                score += 1
-            if threshold.source_system_scope:
-                score += 2
-            return score
-
-        candidates.sort(key=_score, reverse=True)
-        return candidates[0]
+            return threshold
+        return None
 
     @staticmethod
-    def _compare_numeric(threshold: ReferenceThreshold, value: float) -> tuple[AbnormalFlag, str | None]:
+    def _compare_numeric(threshold: CompiledThreshold, value: float) -> tuple[AbnormalFlag, str | None]:
         if (
             threshold.low_critical is None
             and threshold.low_warning is None
@@ -192,3 +475,16 @@ class ThresholdEvaluator:
         if threshold.high_warning is not None and value > threshold.high_warning:
             return AbnormalFlag.OUTSIDE_WARNING, "HIGH_WARNING"
         return AbnormalFlag.NORMAL, None
+
+
+def _build_evaluations(flag, reason, threshold_id, numeric_value, unit) -> list[AbnormalEvaluation]:
+    return [
+        AbnormalEvaluation(
+            flag=flag[i],
+            reason=reason[i],
+            threshold_id=threshold_id[i],
+            numeric_value=None if numeric_value[i] is None else float(numeric_value[i]),
+            unit=unit[i],
+        )
+        for i in range(len(flag))
+    ]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(RuntimeError):
+    """The breaker is rejecting calls; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Trips when too many recent calls to a dependency fail or are slow.
+
+    Outcomes of the last ``window`` calls are kept; once at least
+    ``min_calls`` are recorded and the share that failed or took longer than
+    ``slow_seconds`` reaches ``failure_rate``, the breaker opens and rejects
+    calls for ``open_seconds``. It then lets a single probe through: success
+    closes it with a clean window, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_seconds: float = 5.0,
+        open_seconds: float = 30.0,
+    ) -> None:
+        self.min_calls = max(min_calls, 1)
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=max(window, 1))
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._counts: Counter[str] = Counter()
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpen`` unless a call may go ahead now."""
+        with self._lock:
+            if self.state == OPEN:
+                if self._retry_after() > 0:
+                    self._counts["rejected"] += 1
+                    raise CircuitOpen("EPR circuit breaker is open", self._retry_after())
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    self._counts["rejected"] += 1
+                    raise CircuitOpen("EPR circuit breaker is probing", self.open_seconds)
+                self._probing = True
+
+    def record(self, success: bool, elapsed: float) -> None:
+        bad = not success or elapsed >= self.slow_seconds
+        with self._lock:
+            self._counts["failures" if not success else "slow" if bad else "successes"] += 1
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if bad:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            if self.state == OPEN:
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and (
+                sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return self._retry_after()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_bad": sum(self._outcomes),
+                "retry_after": round(self._retry_after(), 1),
+                **{name: self._counts[name] for name in ("successes", "failures", "slow", "rejected", "opened")},
+            }
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._counts["opened"] += 1
+
+    def _retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
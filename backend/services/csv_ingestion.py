@@ -456,6 +456,14 @@ class CSVIngestionService:
             }
 
         try:
+            pseudonyms = {str(value).strip() for value in df[patient_col].dropna()}
+            if pseudonyms:
+                notifier.prefetch_recipients(
+                    row[0]
+                    for row in db.query(Patient.id).filter(Patient.pseudonym.in_(pseudonyms)).all()
+                )
+
+            staged: list[tuple[object, MonitoringEvent, Patient, bool]] = []
             for idx, row in df.iterrows():
                 try:
                     patient = (
@@ -511,8 +519,22 @@ class CSVIngestionService:
                         db.add(event)
                         db.flush()
                         inserted += 1
+                    staged.append((idx, event, patient, existing is None))
 
-                        evaluation = evaluator.evaluate_event(event, patient)
+                except Exception as exc:
+                    errors.append(f"Row {idx}: {exc}")
+                    skipped += 1
+
+            # Only newly inserted events are evaluated, in one vectorized batch.
+            evaluations = iter(
+                evaluator.evaluate_event_batch(
+                    (event, patient) for _idx, event, patient, is_new in staged if is_new
+                )
+            )
+            for idx, event, patient, is_new in staged:
+                try:
+                    if is_new:
+                        evaluation = next(evaluations)
                         evaluator.apply_evaluation(event, evaluation)
                         abnormal_summary[evaluation.flag.value] += 1
 
@@ -531,7 +553,8 @@ class CSVIngestionService:
                                 reason=evaluation.reason,
                             )
 
-                    task_gen.auto_complete_tasks_for_event(event, actor="SYSTEM")
+                    if task_gen.auto_complete_tasks_for_event(event, actor="SYSTEM"):
+                        notifier.invalidate_recipient(patient.id)
 
                 except Exception as exc:
                     errors.append(f"Row {idx}: {exc}")
@@ -1,22 +1,181 @@
 from __future__ import annotations
 
+import copy
+import threading
+import time
+from contextlib import contextmanager
 from datetime import date, datetime
-from typing import Any
+from typing import Any, Iterator
+from urllib.parse import urljoin, urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, TimeoutError as Urllib3Timeout
+from urllib3.util.retry import Retry
 
 from ..config import get_settings
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_refresh_budget: RequestBudget | None = None
+_breaker: CircuitBreaker | None = None
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide keep-alive session shared by every ``EPRClient``.
+
+    Connections are pooled per host (at most ``EPR_POOL_MAXSIZE`` each, callers
+    block for a free one rather than opening extras) and idempotent GETs are
+    retried with backoff on connection errors and 429/5xx gateway responses.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                settings = get_settings()
+                retry = Retry(
+                    total=settings.EPR_RETRY_TOTAL,
+                    backoff_factor=settings.EPR_RETRY_BACKOFF_SECONDS,
+                    status_forcelist=(429, 502, 503, 504),
+                    allowed_methods=frozenset({"GET"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=settings.EPR_POOL_CONNECTIONS,
+                    pool_maxsize=settings.EPR_POOL_MAXSIZE,
+                    max_retries=retry,
+                    pool_block=True,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def reset_http_session() -> None:
+    global _session, _refresh_budget, _breaker
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _refresh_budget = None
+        _breaker = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker shared by every ``EPRClient`` (see ``EPR_BREAKER_*``)."""
+    global _breaker
+    if _breaker is None:
+        with _session_lock:
+            if _breaker is None:
+                settings = get_settings()
+                _breaker = CircuitBreaker(
+                    window=settings.EPR_BREAKER_WINDOW,
+                    min_calls=settings.EPR_BREAKER_MIN_CALLS,
+                    failure_rate=settings.EPR_BREAKER_FAILURE_RATE,
+                    slow_seconds=settings.EPR_BREAKER_SLOW_SECONDS,
+                    open_seconds=settings.EPR_BREAKER_OPEN_SECONDS,
+                )
+    return _breaker
+
+
+def connection_stats() -> dict[str, Any]:
+    """Per-host connection reuse of the shared session's pools."""
+    hosts: dict[str, dict[str, int]] = {}
+    session = _session
+    if session is not None:
+        adapter = session.get_adapter("https://")
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            served = pool.num_requests
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": opened,
+                "requests": served,
+                "reused": max(served - opened, 0),
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            }
+    return {"pooled": session is not None, "hosts": hosts}
+
+
+class BudgetExhausted(RuntimeError):
+    """No request token became available within the client timeout."""
+
+
+class EPRUnavailable(RuntimeError):
+    """The EPR is failing fast: the breaker is open or the request deadline ran out."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestBudget:
+    """Token bucket shared by threads: at most ``per_minute`` EPR requests a minute."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = max(per_minute, 1)
+        self.rate = self.capacity / 60.0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Take one request token, waiting up to ``timeout`` seconds for a refill."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+def get_refresh_budget() -> RequestBudget:
+    """Process-wide budget for background refresh (``EPR_REFRESH_REQUESTS_PER_MINUTE``)."""
+    global _refresh_budget
+    if _refresh_budget is None:
+        with _session_lock:
+            if _refresh_budget is None:
+                _refresh_budget = RequestBudget(get_settings().EPR_REFRESH_REQUESTS_PER_MINUTE)
+    return _refresh_budget
 
 
 class EPRClient:
-    def __init__(self) -> None:
+    def __init__(self, budget: RequestBudget | None = None) -> None:
         settings = get_settings()
         if settings.EPR_MODE == "OFF":
             raise RuntimeError("EPR integration is disabled")
-        if not settings.EPR_BASE_URL:
+        base_url = settings.EPR_BASE_URL
+        if not base_url and settings.EPR_MODE == "STUB":
+            from .epr_stub import ensure_stub_server
+
+            base_url = ensure_stub_server().url
+        if not base_url:
             raise RuntimeError("EPR_BASE_URL is not configured")
-        self.base_url = settings.EPR_BASE_URL.rstrip("/")
+        self.base_url = base_url.rstrip("/")
         self.timeout = settings.EPR_TIMEOUT_SECONDS
+        self.page_size = settings.EPR_PAGE_SIZE
+        self.max_pages = settings.EPR_MAX_PAGES
+        self.session = get_http_session()
+        self.budget = budget
+        self.breaker = get_circuit_breaker()
+        self.attempts = settings.EPR_RETRY_TOTAL + 1
+        self._deadline: float | None = None
         self.headers: dict[str, str] = {}
         if settings.EPR_API_KEY:
             if settings.EPR_API_KEY.startswith("Bearer "):
@@ -25,37 +184,131 @@ class EPRClient:
                 self.headers["X-API-Key"] = settings.EPR_API_KEY
 
     def fetch_patient(self, nhs_number: str) -> dict[str, Any] | None:
-        response = requests.get(
-            f"{self.base_url}/Patient",
-            params={"identifier": nhs_number},
-            headers=self.headers,
-            timeout=self.timeout,
-        )
+        response = self._get(f"{self.base_url}/Patient", {"identifier": nhs_number})
         if response.status_code == 404:
             return None
         response.raise_for_status()
         data = response.json()
         return _unwrap_single_resource(data)
 
-    def fetch_observations(self, patient_id: str) -> list[dict[str, Any]]:
-        response = requests.get(
-            f"{self.base_url}/Observation",
-            params={"patient": patient_id},
-            headers=self.headers,
-            timeout=self.timeout,
-        )
-        response.raise_for_status()
-        return _unwrap_list(data=response.json())
-
-    def fetch_medications(self, patient_id: str) -> list[dict[str, Any]]:
-        response = requests.get(
-            f"{self.base_url}/MedicationRequest",
-            params={"patient": patient_id},
-            headers=self.headers,
-            timeout=self.timeout,
-        )
-        response.raise_for_status()
-        return _unwrap_list(data=response.json())
+    def fetch_observations(self, patient_id: str, since: datetime | None = None) -> Iterator[dict[str, Any]]:
+        return self._iter_resources("Observation", _search_params(patient_id, since))
+
+    def fetch_medications(self, patient_id: str, since: datetime | None = None) -> Iterator[dict[str, Any]]:
+        return self._iter_resources("MedicationRequest", _search_params(patient_id, since))
+
+    def iter_pages(self, resource_type: str, params: dict[str, Any]) -> Iterator[list[dict[str, Any]]]:
+        """Yield search result pages, following ``Bundle.link[rel=next]`` lazily.
+
+        A page is only requested once the previous one has been consumed, so a
+        long history is held in memory one page at a time. ``_count`` asks the
+        server for ``EPR_PAGE_SIZE`` entries per page; servers may ignore it.
+        """
+        url: str | None = f"{self.base_url}/{resource_type}"
+        query: dict[str, Any] | None = dict(params)
+        if self.page_size:
+            query["_count"] = self.page_size
+        pages = 0
+        while url is not None:
+            if pages >= self.max_pages:
+                raise RuntimeError(f"EPR {resource_type} search exceeded {self.max_pages} pages")
+            response = self._get(url, query)
+            response.raise_for_status()
+            data = response.json()
+            pages += 1
+            yield _unwrap_list(data)
+            # The next link already carries the search parameters.
+            url, query = self._next_link(data), None
+
+    @contextmanager
+    def deadline(self, seconds: float | None) -> Iterator[None]:
+        """Bound every request made inside the block by one overall deadline.
+
+        Each request, including its retries, gets at most the time left;
+        once it has run out requests fail with ``EPRUnavailable``.
+        """
+        previous = self._deadline
+        self._deadline = time.monotonic() + seconds if seconds else None
+        try:
+            yield
+        finally:
+            self._deadline = previous
+
+    def bounded(self, seconds: float | None) -> EPRClient:
+        """A copy of this client whose requests share one overall deadline.
+
+        Unlike ``deadline`` it leaves this client alone, so fetches running
+        concurrently on one client can each have their own.
+        """
+        client = copy.copy(self)
+        client._deadline = time.monotonic() + seconds if seconds else None
+        return client
+
+    def _get(self, url: str, params: dict[str, Any] | None) -> requests.Response:
+        timeout = self._request_timeout()
+        if self.budget is not None and not self.budget.acquire(timeout=timeout):
+            raise BudgetExhausted("EPR request budget exhausted")
+        try:
+            self.breaker.before_call()
+        except CircuitOpen as exc:
+            raise EPRUnavailable(str(exc), exc.retry_after) from exc
+        started = time.monotonic()
+        success = False
+        try:
+            response = self.session.get(url, params=params, headers=self.headers, timeout=timeout)
+            success = response.status_code < 500 and response.status_code != 429
+        except requests.RequestException as exc:
+            if self._deadline is not None and _timed_out(exc):
+                # The exception quotes the URL, which carries the NHS number.
+                raise EPRUnavailable("EPR request deadline exceeded", self._retry_after()) from None
+            raise
+        finally:
+            # Always recorded, or a half-open probe that raised would hold the probe slot forever.
+            self.breaker.record(success, time.monotonic() - started)
+        return response
+
+    def _request_timeout(self) -> float:
+        if self._deadline is None:
+            return self.timeout
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise EPRUnavailable("EPR request deadline exceeded", self._retry_after())
+        # urllib3 applies the timeout to each retry attempt: split what is left.
+        return min(self.timeout, remaining / self.attempts)
+
+    def _retry_after(self) -> float:
+        return max(self.breaker.retry_after(), 1.0)
+
+    def _iter_resources(self, resource_type: str, params: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        for page in self.iter_pages(resource_type, params):
+            yield from page
+
+    def _next_link(self, data: Any) -> str | None:
+        if not isinstance(data, dict):
+            return None
+        for link in data.get("link") or []:
+            if isinstance(link, dict) and link.get("relation") == "next" and link.get("url"):
+                url = urljoin(f"{self.base_url}/", link["url"])
+                # Credentials are sent with every page: never follow a link off the EPR host.
+                if urlsplit(url)[:2] != urlsplit(self.base_url)[:2]:
+                    raise ValueError("EPR next link points outside EPR_BASE_URL")
+                return url
+        return None
+
+
+def _timed_out(exc: requests.RequestException) -> bool:
+    # Once retries are exhausted a read timeout surfaces as a ConnectionError.
+    if isinstance(exc, requests.Timeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    return isinstance(reason, MaxRetryError) and isinstance(reason.reason, Urllib3Timeout)
+
+
+def _search_params(patient_id: str, since: datetime | None) -> dict[str, Any]:
+    params: dict[str, Any] = {"patient": patient_id}
+    if since is not None:
+        params["_lastUpdated"] = f"gt{since.isoformat(timespec='seconds')}"
+    return params
 
 
 def _unwrap_single_resource(data: Any) -> dict[str, Any] | None:
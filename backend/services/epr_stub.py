@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from ..config import get_settings
+
+TEST_TYPES = (
+    ("HbA1c", "mmol/mol", 36.0, 60.0),
+    ("Lipids", "mmol/L", 3.0, 7.5),
+    ("Prolactin", "mIU/L", 80.0, 900.0),
+    ("Fasting glucose", "mmol/L", 4.0, 8.0),
+    ("Weight/BMI", "kg/m2", 18.0, 38.0),
+    ("Pulse", "bpm", 55.0, 110.0),
+)
+DRUGS = ("Clozapine", "Olanzapine", "Aripiprazole", "Risperidone", "Quetiapine")
+SEXES = ("M", "F")
+AGE_BANDS = ("18-24", "25-34", "35-44", "45-54", "55-64", "65-74", "75+")
+BASE_DATE = date(2025, 1, 1)
+LAST_UPDATED = "2025-01-01T00:00:00+00:00"
+
+_stub_server: StubEPRServer | None = None
+_stub_lock = threading.Lock()
+
+
+@dataclass
+class StubConfig:
+    seed: int = 0
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    page_size: int = 50
+    observations: int = 40
+    medications: int = 3
+    # Off: only seeded records exist and unknown identifiers answer 404.
+    synthetic: bool = True
+
+    @classmethod
+    def from_settings(cls) -> StubConfig:
+        settings = get_settings()
+        return cls(
+            seed=settings.EPR_STUB_SEED,
+            latency_ms=settings.EPR_STUB_LATENCY_MS,
+            jitter_ms=settings.EPR_STUB_JITTER_MS,
+            error_rate=settings.EPR_STUB_ERROR_RATE,
+            page_size=settings.EPR_STUB_PAGE_SIZE,
+            observations=settings.EPR_STUB_OBSERVATIONS,
+            medications=settings.EPR_STUB_MEDICATIONS,
+        )
+
+
+class StubEPRServer:
+    """FHIR-ish EPR serving deterministic synthetic patients for load tests.
+
+    Any identifier resolves to a patient derived from its hash, so the same
+    NHS number always yields the same pseudonym, medications and
+    observations. Searches honour ``_count``/``_offset`` paging with
+    ``Bundle.link[rel=next]`` and ``_lastUpdated=gt...``. Every request waits
+    ``latency_ms`` (plus up to ``jitter_ms``) and fails with 503 at
+    ``error_rate``.
+
+    Records seeded into ``patients`` (by identifier) and ``observations`` /
+    ``medications`` (by patient id) are served in place of synthetic ones,
+    and the server counts connections, concurrent requests and search
+    queries so tests can assert on client behaviour.
+    """
+
+    def __init__(self, config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or StubConfig()
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.page_requests: list[dict[str, str]] = []
+        self.patients: dict[str, dict[str, Any]] = {}
+        self.observations: dict[str, list[dict[str, Any]]] = {}
+        self.medications: dict[str, list[dict[str, Any]]] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> StubEPRServer:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.httpd.serve_forever, name="epr-stub", daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.httpd.serve_forever()
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> StubEPRServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors}
+
+    def _admit(self) -> bool:
+        """Count the request and decide whether it fails; returns False for a 503."""
+        with self._lock:
+            self.requests += 1
+            delay = self.config.latency_ms + self._random.uniform(0, self.config.jitter_ms)
+            failed = self._random.random() < self.config.error_rate
+            if failed:
+                self.errors += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if delay > 0:
+                time.sleep(delay / 1000)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return not failed
+
+    def find_patient(self, identifier: str) -> dict[str, Any] | None:
+        if identifier in self.patients:
+            return self.patients[identifier]
+        return self.synthetic_patient(identifier) if self.config.synthetic else None
+
+    def search(self, resource_type: str, patient_id: str) -> list[dict[str, Any]]:
+        seeded = self.observations if resource_type == "Observation" else self.medications
+        if patient_id in seeded or not self.config.synthetic:
+            return seeded.get(patient_id, [])
+        generate = self.synthetic_observations if resource_type == "Observation" else self.synthetic_medications
+        return generate(patient_id)
+
+    def synthetic_patient(self, identifier: str) -> dict[str, Any]:
+        digest = hashlib.sha256(f"{self.config.seed}:{identifier}".encode("utf-8")).hexdigest()
+        rng = random.Random(digest)
+        return {
+            "resourceType": "Patient",
+            "id": f"stub-{digest[:12]}",
+            "pseudonym": "PT-" + "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(6)),
+            "sex": rng.choice(SEXES),
+            "age_band": rng.choice(AGE_BANDS),
+        }
+
+    def synthetic_observations(self, patient_id: str) -> list[dict[str, Any]]:
+        rng = random.Random(f"{self.config.seed}:obs:{patient_id}")
+        resources = []
+        for index in range(self.config.observations):
+            test_type, unit, low, high = TEST_TYPES[index % len(TEST_TYPES)]
+            resources.append(
+                {
+                    "resourceType": "Observation",
+                    "id": f"{patient_id}-obs-{index}",
+                    "subject": {"reference": f"Patient/{patient_id}"},
+                    "test_type": test_type,
+                    "effectiveDateTime": (BASE_DATE - timedelta(days=7 * (index // len(TEST_TYPES)))).isoformat(),
+                    "value": str(round(rng.uniform(low, high), 1)),
+                    "unit": unit,
+                    "meta": {"lastUpdated": LAST_UPDATED},
+                }
+            )
+        return resources
+
+    def synthetic_medications(self, patient_id: str) -> list[dict[str, Any]]:
+        rng = random.Random(f"{self.config.seed}:med:{patient_id}")
+        drugs = rng.sample(DRUGS, min(self.config.medications, len(DRUGS)))
+        return [
+            {
+                "resourceType": "MedicationRequest",
+                "id": f"{patient_id}-med-{index}",
+                "subject": {"reference": f"Patient/{patient_id}"},
+                "drug_name": drug,
+                "authoredOn": (BASE_DATE - timedelta(days=90 * (index + 1))).isoformat(),
+                "dose": f"{rng.choice((5, 10, 20, 100))}mg",
+                "route": "oral",
+                "frequency": "daily",
+                "meta": {"lastUpdated": LAST_UPDATED},
+            }
+            for index, drug in enumerate(drugs)
+        ]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stub._lock:
+            self.server.stub.connections += 1
+
+    def do_GET(self):
+        stub: StubEPRServer = self.server.stub
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if not stub._admit():
+            self._send(503, {"resourceType": "OperationOutcome", "issue": [{"code": "transient"}]})
+            return
+        if url.path == "/Patient":
+            identifier = query.get("identifier")
+            patient = stub.find_patient(identifier) if identifier else None
+            if not patient:
+                self._send(404, {"resourceType": "OperationOutcome", "issue": [{"code": "not-found"}]})
+                return
+            self._send(200, {"resourceType": "Bundle", "entry": [{"resource": patient}]})
+            return
+        if url.path in {"/Observation", "/MedicationRequest"} and query.get("patient"):
+            with stub._lock:
+                stub.page_requests.append(query)
+            resources = stub.search(url.path.lstrip("/"), query["patient"])
+            self._send(200, _search_page(url.path, resources, query, stub.config.page_size))
+            return
+        self._send(404, {"resourceType": "OperationOutcome", "issue": [{"code": "not-found"}]})
+
+    def _send(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/fhir+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (timeouts and deadlines are expected under load).
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def _search_page(path: str, resources: list[dict[str, Any]], query: dict[str, str], page_size: int) -> dict:
+    since = query.get("_lastUpdated", "")
+    if since.startswith("gt"):
+        cutoff = datetime.fromisoformat(since[2:])
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=timezone.utc)
+        resources = [item for item in resources if datetime.fromisoformat(item["meta"]["lastUpdated"]) > cutoff]
+    count = max(int(query.get("_count") or page_size), 1)
+    offset = int(query.get("_offset") or 0)
+    bundle: dict[str, Any] = {
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "total": len(resources),
+        "entry": [{"resource": item} for item in resources[offset : offset + count]],
+    }
+    if offset + count < len(resources):
+        next_query = {key: value for key, value in query.items() if key != "_offset"}
+        next_query.update({"_count": count, "_offset": offset + count})
+        bundle["link"] = [{"relation": "next", "url": f"{path}?{urlencode(next_query)}"}]
+    return bundle
+
+
+def ensure_stub_server() -> StubEPRServer:
+    """In-process stub used when ``EPR_MODE=STUB`` and no ``EPR_BASE_URL`` is set."""
+    global _stub_server
+    if _stub_server is None:
+        with _stub_lock:
+            if _stub_server is None:
+                _stub_server = StubEPRServer(StubConfig.from_settings()).start()
+    return _stub_server
+
+
+def stop_stub_server() -> None:
+    global _stub_server
+    with _stub_lock:
+        if _stub_server is not None:
+            _stub_server.stop()
+        _stub_server = None
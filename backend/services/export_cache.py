@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from ..config import get_settings
+
+SUFFIX = ".zip"
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class ExportCache:
+    """Size-bounded LRU of finished export archives on local disk.
+
+    Archives are keyed by the export's ETag, so an unchanged dataset is
+    served from disk without touching the database. A hit refreshes the
+    file's mtime and eviction removes the least recently used files until
+    the directory fits in ``max_bytes``. Several workers may share the
+    directory: files are only ever renamed into place, and a file evicted
+    while being read stays readable through its open handle.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls) -> ExportCache | None:
+        settings = get_settings()
+        if not settings.EXPORT_CACHE_DIR:
+            return None
+        return cls(settings.EXPORT_CACHE_DIR, settings.EXPORT_CACHE_MAX_BYTES)
+
+    def open(self, etag: str) -> BinaryIO | None:
+        path = self._path(etag)
+        try:
+            handle = path.open("rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return handle
+
+    def read(self, handle: BinaryIO) -> Iterator[bytes]:
+        with handle:
+            while chunk := handle.read(READ_CHUNK_BYTES):
+                yield chunk
+
+    def store(self, etag: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass ``chunks`` through while writing them to the cache.
+
+        The archive is published only once the stream completes; a client
+        disconnect or error mid-stream discards the partial file.
+        """
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    tmp.write(chunk)
+                    yield chunk
+            os.replace(tmp_name, self._path(etag))
+        except BaseException:
+            # GeneratorExit included: the response was abandoned.
+            _unlink(Path(tmp_name))
+            raise
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used archives until under ``max_bytes``; returns files removed."""
+        entries = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            _unlink(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def _path(self, etag: str) -> Path:
+        # ETags are quoted hex digests; the digest alone names the file.
+        digest = etag.strip('"')
+        if not digest.isalnum():
+            raise ValueError(f"Unexpected export ETag {etag!r}")
+        return self.directory / f"{digest}{SUFFIX}"
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
@@ -3,141 +3,435 @@ from __future__ import annotations
 import csv
 import io
 import zipfile
-from typing import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator
 
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 
-from ..models.integration import TrackedPatient
+from ..config import get_settings
+from ..models.integration import ExportTombstone, TrackedPatient
 from ..models.medication import MedicationOrder
 from ..models.monitoring import MonitoringEvent
 from ..models.patient import Patient
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _HAS_PYARROW = True
+except ImportError:  # pragma: no cover
+    _HAS_PYARROW = False
+
+PATIENT_COLUMNS = ["pseudonymous_number", "age_band", "sex", "ethnicity", "service"]
+MEDICATION_COLUMNS = [
+    "pseudonymous_number",
+    "drug_name",
+    "start_date",
+    "stop_date",
+    "dose",
+    "route",
+    "frequency",
+    "is_hdat",
+]
+EVENT_COLUMNS = [
+    "pseudonymous_number",
+    "test_type",
+    "performed_date",
+    "value",
+    "unit",
+    "interpretation",
+    "attachment_url",
+    "abnormal_flag",
+    "reviewed_status",
+    "source_system",
+]
+TOMBSTONE_COLUMNS = ["entity", "id", "deleted_at"]
+# ZIP entries carry this instead of the write time (1980-01-01 is the earliest ZIP date).
+ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# Parquet column types other than string.
+ARROW_KINDS = {
+    "start_date": "date",
+    "stop_date": "date",
+    "performed_date": "date",
+    "is_hdat": "bool",
+    "updated_at": "timestamp",
+    "deleted_at": "timestamp",
+}
+# Low-cardinality text columns, dictionary-encoded in Parquet.
+DICTIONARY_COLUMNS = {
+    "age_band",
+    "sex",
+    "ethnicity",
+    "service",
+    "drug_name",
+    "route",
+    "frequency",
+    "test_type",
+    "unit",
+    "abnormal_flag",
+    "reviewed_status",
+    "source_system",
+    "entity",
+}
+
+
+@dataclass(frozen=True)
+class ExportWindow:
+    """Rows changed after ``since`` (exclusive) and up to ``until`` (inclusive).
+
+    ``until`` is fixed before the export starts and becomes the next cursor,
+    so rows sharing a change time are never split between two exports; within
+    a window rows are ordered by change time, then id.
+    """
+
+    since: datetime | None
+    until: datetime
+
+    @classmethod
+    def after(cls, cursor: str | None, lag_seconds: int = 0) -> ExportWindow:
+        """Window from ``cursor`` to now, less ``lag_seconds`` for rows still being committed."""
+        since = parse_cursor(cursor) if cursor else None
+        until = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+        if since is not None and since > until:
+            until = since
+        return cls(since=since, until=until)
+
+    @property
+    def cursor(self) -> str:
+        return format_cursor(self.until)
+
+    def apply(self, query, changed_column):
+        return query.where(self.contains(changed_column))
+
+    def contains(self, changed_column):
+        if self.since is None:
+            return changed_column <= self.until
+        return and_(changed_column > self.since, changed_column <= self.until)
+
 
 class ExportService:
     def __init__(self, db: Session):
         self.db = db
+        self.settings = get_settings()
 
-    def build_export_zip(self, tracked_only: bool = True) -> bytes:
-        patient_ids = self._tracked_patient_ids() if tracked_only else None
-
-        patients = self._fetch_patients(patient_ids)
-        medications = self._fetch_medications(patient_ids)
-        events = self._fetch_events(patient_ids)
-
-        patients_csv = _to_csv(
-            ["pseudonymous_number", "age_band", "sex", "ethnicity", "service"],
-            [
-                {
-                    "pseudonymous_number": p.pseudonym,
-                    "age_band": p.age_band,
-                    "sex": p.sex,
-                    "ethnicity": p.ethnicity,
-                    "service": p.service,
-                }
-                for p in patients
-            ],
-        )
+    def iter_export_zip(self, tracked_only: bool = True, window: ExportWindow | None = None) -> Iterator[bytes]:
+        """Yield a deflate-compressed ZIP of the export as it is written.
+
+        Rows are read with ``yield_per`` cursors of ``EXPORT_CHUNK_ROWS`` and
+        each chunk is written to its CSV entry and flushed, so memory stays
+        bounded by one chunk whatever the size of the export. Entry sizes are
+        unknown up front; they follow each entry in a data descriptor.
+
+        Each CSV comes from one query selecting only its columns (the
+        pseudonym via a join), so an export issues three queries in total.
+
+        With a ``window`` only rows changed inside it are exported (with
+        ``tracked_only``, also every row of a patient first tracked inside
+        it, which the consumer has never seen), each
+        prefixed by its ``id`` and followed by ``updated_at``, and a fourth
+        entry, ``deleted.csv``, lists rows purged by retention in the window.
+        """
+        sink = _ChunkSink()
+        with zipfile.ZipFile(
+            sink,
+            "w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=self.settings.EXPORT_COMPRESSION_LEVEL,
+        ) as zf:
+            for stem, columns, rows, to_row in self._tables(tracked_only, window):
+                if window is not None:
+                    to_row = _csv_stamped(to_row)
+                # force_zip64: the entry size is unknown and may pass 2 GiB.
+                with zf.open(_entry(zf, f"{stem}.csv"), "w", force_zip64=True) as entry:
+                    for chunk in _csv_chunks(columns, rows, to_row, self.settings.EXPORT_CHUNK_ROWS):
+                        entry.write(chunk)
+                        yield from sink.drain()
+        # Closing the archive writes the central directory.
+        yield from sink.drain()
+
+    def build_export_zip(self, tracked_only: bool = True, window: ExportWindow | None = None) -> bytes:
+        return b"".join(self.iter_export_zip(tracked_only=tracked_only, window=window))
 
-        medications_csv = _to_csv(
-            [
-                "pseudonymous_number",
-                "drug_name",
-                "start_date",
-                "stop_date",
-                "dose",
-                "route",
-                "frequency",
-                "is_hdat",
-            ],
-            [
-                {
-                    "pseudonymous_number": med.patient.pseudonym,
-                    "drug_name": med.drug_name,
-                    "start_date": med.start_date.isoformat(),
-                    "stop_date": med.stop_date.isoformat() if med.stop_date else "",
-                    "dose": med.dose,
-                    "route": med.route,
-                    "frequency": med.frequency,
-                    "is_hdat": bool(med.flags.get("is_hdat")) if med.flags else False,
-                }
-                for med in medications
-            ],
+    def iter_parquet_zip(self, tracked_only: bool = True, window: ExportWindow | None = None) -> Iterator[bytes]:
+        """Yield a ZIP of one Parquet file per table, written as it is read.
+
+        Same tables and rows as ``iter_export_zip``, with dates, booleans and
+        timestamps kept typed. Every ``EXPORT_PARQUET_ROW_GROUP_ROWS`` rows
+        become a row group and are flushed to the stream; repetitive text
+        columns are dictionary-encoded. Parquet compresses its own pages, so
+        the ZIP entries are stored.
+        """
+        if not _HAS_PYARROW:
+            raise RuntimeError("Parquet export requires pyarrow")
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+            for stem, columns, rows, to_row in self._tables(tracked_only, window):
+                schema = pa.schema([(column, _arrow_type(column)) for column in columns])
+                with zf.open(_entry(zf, f"{stem}.parquet"), "w", force_zip64=True) as entry:
+                    writer = pq.ParquetWriter(
+                        entry,
+                        schema,
+                        compression=self.settings.EXPORT_PARQUET_COMPRESSION,
+                        use_dictionary=[column for column in columns if column in DICTIONARY_COLUMNS],
+                    )
+                    try:
+                        for batch in _batches(rows, to_row, self.settings.EXPORT_PARQUET_ROW_GROUP_ROWS):
+                            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+                            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                            yield from sink.drain()
+                    finally:
+                        # Writes the footer; an empty table still gets a valid file.
+                        writer.close()
+        yield from sink.drain()
+
+    def _tables(self, tracked_only: bool, window: ExportWindow | None) -> list[tuple]:
+        """``(name, columns, rows, to_row)`` per exported table, queries not yet run."""
+        tables = [
+            ("patients", PATIENT_COLUMNS, self._fetch_patients(tracked_only, window), _patient_row),
+            ("medications", MEDICATION_COLUMNS, self._fetch_medications(tracked_only, window), _medication_row),
+            ("events", EVENT_COLUMNS, self._fetch_events(tracked_only, window), _event_row),
+        ]
+        if window is None:
+            return tables
+        tables = [
+            (name, ["id", *columns, "updated_at"], rows, _changed_row(to_row))
+            for name, columns, rows, to_row in tables
+        ]
+        tables.append(("deleted", TOMBSTONE_COLUMNS, self._fetch_tombstones(tracked_only, window), _tombstone_row))
+        return tables
+
+    def _fetch_patients(self, tracked_only: bool, window: ExportWindow | None) -> Iterator[tuple]:
+        query = select(Patient.pseudonym, Patient.age_band, Patient.sex, Patient.ethnicity, Patient.service)
+        query = _tracked(query, Patient.id, tracked_only)
+        return self._stream(_windowed(query, Patient, window, Patient.pseudonym.asc(), Patient.id, tracked_only))
+
+    def _fetch_medications(self, tracked_only: bool, window: ExportWindow | None) -> Iterator[tuple]:
+        query = select(
+            Patient.pseudonym,
+            MedicationOrder.drug_name,
+            MedicationOrder.start_date,
+            MedicationOrder.stop_date,
+            MedicationOrder.dose,
+            MedicationOrder.route,
+            MedicationOrder.frequency,
+            MedicationOrder.flags,
+        ).join(Patient, Patient.id == MedicationOrder.patient_id)
+        query = _tracked(query, MedicationOrder.patient_id, tracked_only)
+        return self._stream(
+            _windowed(
+                query,
+                MedicationOrder,
+                window,
+                MedicationOrder.start_date.asc(),
+                MedicationOrder.patient_id,
+                tracked_only,
+            )
         )
 
-        events_csv = _to_csv(
-            [
-                "pseudonymous_number",
-                "test_type",
-                "performed_date",
-                "value",
-                "unit",
-                "interpretation",
-                "attachment_url",
-                "abnormal_flag",
-                "reviewed_status",
-                "source_system",
-            ],
-            [
-                {
-                    "pseudonymous_number": event.patient.pseudonym,
-                    "test_type": event.test_type,
-                    "performed_date": event.performed_date.isoformat(),
-                    "value": event.value,
-                    "unit": event.unit,
-                    "interpretation": event.interpretation,
-                    "attachment_url": event.attachment_url,
-                    "abnormal_flag": event.abnormal_flag.value if event.abnormal_flag else "",
-                    "reviewed_status": event.reviewed_status.value if event.reviewed_status else "",
-                    "source_system": event.source_system,
-                }
-                for event in events
-            ],
+    def _fetch_events(self, tracked_only: bool, window: ExportWindow | None) -> Iterator[tuple]:
+        query = select(
+            Patient.pseudonym,
+            MonitoringEvent.test_type,
+            MonitoringEvent.performed_date,
+            MonitoringEvent.value,
+            MonitoringEvent.unit,
+            MonitoringEvent.interpretation,
+            MonitoringEvent.attachment_url,
+            MonitoringEvent.abnormal_flag,
+            MonitoringEvent.reviewed_status,
+            MonitoringEvent.source_system,
+        ).join(Patient, Patient.id == MonitoringEvent.patient_id)
+        query = _tracked(query, MonitoringEvent.patient_id, tracked_only)
+        return self._stream(
+            _windowed(
+                query,
+                MonitoringEvent,
+                window,
+                MonitoringEvent.performed_date.asc(),
+                MonitoringEvent.patient_id,
+                tracked_only,
+            )
         )
 
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zf:
-            zf.writestr("patients.csv", patients_csv)
-            zf.writestr("medications.csv", medications_csv)
-            zf.writestr("events.csv", events_csv)
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
-
-    def _tracked_patient_ids(self) -> list[str]:
-        rows = self.db.query(TrackedPatient.patient_id).all()
-        return [row[0] for row in rows]
-
-    def _fetch_patients(self, patient_ids: Iterable[str] | None) -> list[Patient]:
-        query = self.db.query(Patient)
-        if patient_ids is not None:
-            patient_ids = list(patient_ids)
-            if not patient_ids:
-                return []
-            query = query.filter(Patient.id.in_(patient_ids))
-        return query.order_by(Patient.pseudonym.asc()).all()
-
-    def _fetch_medications(self, patient_ids: Iterable[str] | None) -> list[MedicationOrder]:
-        query = self.db.query(MedicationOrder).join(Patient)
-        if patient_ids is not None:
-            patient_ids = list(patient_ids)
-            if not patient_ids:
-                return []
-            query = query.filter(MedicationOrder.patient_id.in_(patient_ids))
-        return query.order_by(MedicationOrder.start_date.asc()).all()
-
-    def _fetch_events(self, patient_ids: Iterable[str] | None) -> list[MonitoringEvent]:
-        query = self.db.query(MonitoringEvent).join(Patient)
-        if patient_ids is not None:
-            patient_ids = list(patient_ids)
-            if not patient_ids:
-                return []
-            query = query.filter(MonitoringEvent.patient_id.in_(patient_ids))
-        return query.order_by(MonitoringEvent.performed_date.asc()).all()
-
-
-def _to_csv(columns: list[str], rows: list[dict]) -> str:
+    def _fetch_tombstones(self, tracked_only: bool, window: ExportWindow) -> Iterator[tuple]:
+        query = select(ExportTombstone.entity, ExportTombstone.entity_id, ExportTombstone.deleted_at)
+        query = _tracked(query, ExportTombstone.patient_id, tracked_only)
+        query = window.apply(query, ExportTombstone.deleted_at)
+        return self._stream(query.order_by(ExportTombstone.deleted_at, ExportTombstone.id))
+
+    def _stream(self, query) -> Iterator[tuple]:
+        result = self.db.execute(query.execution_options(yield_per=self.settings.EXPORT_CHUNK_ROWS))
+        try:
+            for partition in result.partitions():
+                yield from partition
+        finally:
+            result.close()
+
+
+def parquet_supported() -> bool:
+    return _HAS_PYARROW
+
+
+def parse_cursor(cursor: str) -> datetime:
+    """Parse an export cursor; raises ``ValueError`` for anything else."""
+    value = datetime.fromisoformat(cursor)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def format_cursor(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _tracked(query, patient_id_column, tracked_only: bool):
+    if not tracked_only:
+        return query
+    # Semi-join: the database filters on tracked_patients, no id list round-trips.
+    return query.where(patient_id_column.in_(select(TrackedPatient.patient_id)))
+
+
+def _windowed(query, model, window: ExportWindow | None, order, patient_id_column, tracked_only: bool):
+    if window is None:
+        # The id tiebreak keeps the archive byte-identical between runs.
+        return query.order_by(order, model.id)
+    changed = window.contains(model.updated_at)
+    if tracked_only:
+        # A patient tracked inside the window is new to the consumer: send all of its rows.
+        newly_tracked = select(TrackedPatient.patient_id).where(window.contains(TrackedPatient.first_requested_at))
+        changed = or_(changed, patient_id_column.in_(newly_tracked))
+    query = query.add_columns(model.id, model.updated_at).where(changed)
+    # Matches the (updated_at, id) index.
+    return query.order_by(model.updated_at, model.id)
+
+
+def _entry(zf: zipfile.ZipFile, name: str) -> zipfile.ZipInfo:
+    """Entry header with a fixed timestamp, so unchanged data zips to the same bytes."""
+    info = zipfile.ZipInfo(name, date_time=ENTRY_DATE_TIME)
+    info.compress_type = zf.compression
+    info._compresslevel = zf.compresslevel
+    return info
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that collects ZIP output until drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def _csv_chunks(
+    columns: list[str],
+    rows: Iterable[Any],
+    to_row: Callable[[Any], list[Any]],
+    chunk_rows: int,
+) -> Iterator[bytes]:
     buffer = io.StringIO()
-    writer = csv.DictWriter(buffer, fieldnames=columns)
-    writer.writeheader()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(to_row(row))
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _changed_row(to_row: Callable[[Any], list[Any]]) -> Callable[[Any], list[Any]]:
+    # Windowed queries append id and updated_at to the exported columns.
+    return lambda row: [str(row[-2]), *to_row(row[:-2]), _as_utc(row[-1])]
+
+
+def _csv_stamped(to_row: Callable[[Any], list[Any]]) -> Callable[[Any], list[Any]]:
+    # In windowed tables the last column is the change or deletion time.
+    def _row(row) -> list[Any]:
+        values = to_row(row)
+        values[-1] = format_cursor(values[-1])
+        return values
+
+    return _row
+
+
+def _tombstone_row(row) -> list[Any]:
+    entity, entity_id, deleted_at = row
+    return [entity, str(entity_id), _as_utc(deleted_at)]
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive UTC timestamps.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _arrow_type(column: str):
+    kind = ARROW_KINDS.get(column, "string")
+    if kind == "date":
+        return pa.date32()
+    if kind == "bool":
+        return pa.bool_()
+    if kind == "timestamp":
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+
+def _batches(rows: Iterable[Any], to_row: Callable[[Any], list[Any]], size: int) -> Iterator[list[list[Any]]]:
+    batch = []
     for row in rows:
-        writer.writerow(row)
-    return buffer.getvalue()
+        batch.append(to_row(row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Values are typed (dates, booleans, None); the CSV writer renders them as text.
+def _patient_row(row) -> list[Any]:
+    return list(row)
+
+
+def _medication_row(row) -> list[Any]:
+    pseudonym, drug_name, start_date, stop_date, dose, route, frequency, flags = row
+    return [
+        pseudonym,
+        drug_name,
+        start_date,
+        stop_date,
+        dose,
+        route,
+        frequency,
+        bool(flags.get("is_hdat")) if flags else False,
+    ]
+
+
+def _event_row(row) -> list[Any]:
+    pseudonym, test_type, performed_date, *details, abnormal_flag, reviewed_status, source_system = row
+    return [
+        pseudonym,
+        test_type,
+        performed_date,
+        *details,
+        abnormal_flag.value if abnormal_flag else None,
+        reviewed_status.value if reviewed_status else None,
+        source_system,
+    ]
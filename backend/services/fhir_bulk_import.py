@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import IO, Any, Iterable
+
+from sqlalchemy.orm import Session
+
+from ..adapters.fhir_adapter import FHIRAdapter
+from ..config import get_settings
+from ..models.medication import DrugCategory, MedicationOrder
+from ..models.monitoring import AbnormalFlag, MonitoringEvent
+from ..models.notifications import NotificationPriority
+from ..models.patient import Patient
+from .abnormality import ThresholdEvaluator
+from .identifier_detection import redact_identifiers
+from .notification_engine import NotificationEngine
+from .scheduling import SchedulingEngine
+from .task_generator import TaskGenerator
+
+try:
+    import orjson  # type: ignore
+
+    _loads = orjson.loads
+except Exception:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("patient", "medication", "observation")
+SPECIAL_GROUP_DRUGS = {"chlorpromazine", "clozapine", "olanzapine"}
+
+
+class FHIRBulkImporter:
+    """Streams FHIR Bulk Data ``$export`` NDJSON files into the database.
+
+    Files are read one line at a time and mapped through ``FHIRAdapter``; rows
+    are buffered per kind and upserted in batches of ``FHIR_IMPORT_BATCH_SIZE``
+    with one lookup query per table and one commit per batch. A batch that
+    fails is retried row by row in savepoints, so only failing rows are
+    skipped and the counts stay exact. The session is cleared after every
+    batch, so memory stays flat however large the file.
+    Patients are flushed before any batch that may reference them.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        batch_size: int | None = None,
+        adapter: FHIRAdapter | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.db = db
+        self.settings = settings
+        self.batch_size = batch_size or settings.FHIR_IMPORT_BATCH_SIZE
+        self.adapter = adapter or FHIRAdapter()
+        self.scheduler = SchedulingEngine()
+        self.task_gen = TaskGenerator(db)
+        self.evaluator = ThresholdEvaluator(db)
+        self.notifier = NotificationEngine(db)
+        self.counts: dict[str, dict[str, int]] = {
+            kind: {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0} for kind in KINDS
+        }
+        self.abnormal_summary = {flag.value: 0 for flag in AbnormalFlag}
+        self.lines = 0
+        self.unsupported = 0
+        self.errors: list[str] = []
+        self._pending: dict[str, list[tuple[str, dict[str, Any]]]] = defaultdict(list)
+        self._started = time.perf_counter()
+        self._last_log = self._started
+
+    def import_paths(self, paths: Iterable[str | Path]) -> dict[str, Any]:
+        files = _expand(paths)
+        for path in files:
+            self.import_file(path)
+        return {"files": len(files), **self.summary()}
+
+    def import_file(self, path: str | Path) -> None:
+        path = Path(path)
+        with _open(path) as handle:
+            for line_no, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                self.lines += 1
+                source = f"{path.name}:{line_no}"
+                try:
+                    mapped = self.adapter.map_resource(_loads(line))
+                except (AttributeError, TypeError, ValueError) as exc:
+                    self._error(source, f"unreadable resource ({exc})")
+                    continue
+                if mapped is None:
+                    self.unsupported += 1
+                    continue
+                kind, row = mapped
+                batch = self._pending[kind]
+                batch.append((source, row))
+                if len(batch) >= self.batch_size:
+                    self._flush(kind)
+        for kind in KINDS:
+            self._flush(kind)
+        logger.info("FHIR import of %s finished: %s", path.name, self._rate())
+
+    def summary(self) -> dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        rows = sum(sum(counts.values()) for counts in self.counts.values())
+        return {
+            "lines": self.lines,
+            "rows": rows,
+            "unsupported": self.unsupported,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+            "patients": self.counts["patient"],
+            "medications": self.counts["medication"],
+            "observations": {**self.counts["observation"], "abnormal_summary": self.abnormal_summary},
+            "errors": self.errors[:10],
+        }
+
+    def _flush(self, kind: str) -> None:
+        batch = self._pending.pop(kind, None)
+        if not batch:
+            return
+        if kind != "patient":
+            self._flush("patient")
+        handler = {
+            "patient": self._upsert_patients,
+            "medication": self._upsert_medications,
+            "observation": self._upsert_observations,
+        }[kind]
+        snapshot = self._snapshot()
+        try:
+            handler(batch)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            self._restore(snapshot)
+            logger.exception("FHIR import batch of %s %s rows failed; retrying row by row", len(batch), kind)
+            self._retry_rows(kind, handler, batch)
+        finally:
+            self.db.expunge_all()
+        now = time.perf_counter()
+        if now - self._last_log >= self.settings.FHIR_IMPORT_LOG_SECONDS:
+            self._last_log = now
+            logger.info("FHIR import progress: %s", self._rate())
+
+    def _retry_rows(self, kind: str, handler, batch: list[tuple[str, dict[str, Any]]]) -> None:
+        """Import rows one savepoint at a time so only the rows that fail are skipped."""
+        before = self._snapshot()
+        for source, row in batch:
+            snapshot = self._snapshot()
+            try:
+                with self.db.begin_nested():
+                    handler([(source, row)])
+            except Exception as exc:
+                self._restore(snapshot)
+                self._skip(kind, source, f"{kind} row failed ({exc})")
+        try:
+            self.db.commit()
+        except Exception as exc:
+            self.db.rollback()
+            self._restore(before)
+            logger.exception("FHIR import retry of %s %s rows failed", len(batch), kind)
+            self.counts[kind]["skipped"] += len(batch)
+            self._error(batch[0][0], f"batch of {len(batch)} {kind} rows failed ({exc})")
+
+    def _snapshot(self) -> tuple:
+        counts = {kind: dict(counts) for kind, counts in self.counts.items()}
+        return counts, dict(self.abnormal_summary), len(self.errors)
+
+    def _restore(self, snapshot: tuple) -> None:
+        counts, abnormal_summary, errors = snapshot
+        self.counts = counts
+        self.abnormal_summary = abnormal_summary
+        del self.errors[errors:]
+
+    def _upsert_patients(self, batch: list[tuple[str, dict[str, Any]]]) -> None:
+        counts = self.counts["patient"]
+        pseudonyms = {row["pseudonym"] for _source, row in batch if row.get("pseudonym")}
+        existing = {
+            patient.pseudonym: patient
+            for patient in self.db.query(Patient).filter(Patient.pseudonym.in_(pseudonyms))
+        }
+        for source, row in batch:
+            pseudonym = row.get("pseudonym")
+            if not pseudonym or len(pseudonym) > 32:
+                self._skip("patient", source, "missing pseudonym or longer than 32 characters")
+                continue
+            # Kept so later runs carrying only referencing resources can resolve it.
+            epr_patient_ref = row.get("patient_ref") if self.adapter.pseudonym_system else None
+            try:
+                patient = existing.get(pseudonym)
+                if patient is None:
+                    patient = Patient(
+                        pseudonym=pseudonym,
+                        age_band=row["age_band"],
+                        sex=row["sex"],
+                        epr_patient_ref=epr_patient_ref,
+                    )
+                    self.db.add(patient)
+                    existing[pseudonym] = patient
+                    counts["inserted"] += 1
+                else:
+                    patient.age_band = row["age_band"] or patient.age_band
+                    patient.sex = row["sex"] or patient.sex
+                    patient.epr_patient_ref = epr_patient_ref or patient.epr_patient_ref
+                    counts["updated" if self.db.is_modified(patient) else "unchanged"] += 1
+            except ValueError as exc:
+                self._skip("patient", source, str(exc))
+                continue
+
+    def _upsert_medications(self, batch: list[tuple[str, dict[str, Any]]]) -> None:
+        counts = self.counts["medication"]
+        patients = self._patients(batch)
+        existing = {
+            (med.patient_id, med.drug_name, med.start_date): med
+            for med in self.db.query(MedicationOrder).filter(
+                MedicationOrder.patient_id.in_([patient.id for patient in patients.values()]),
+                MedicationOrder.drug_name.in_({row["drug_name"] for _source, row in batch if row["drug_name"]}),
+            )
+        }
+        for source, row in batch:
+            patient = patients.get(row.get("patient_ref"))
+            if patient is None:
+                self._skip("medication", source, "Patient not found")
+                continue
+            if not row["drug_name"] or not row["start_date"]:
+                self._skip("medication", source, "Missing drug_name or start_date")
+                continue
+            drug_name = row["drug_name"]
+            category = (
+                DrugCategory.SPECIAL_GROUP if drug_name.lower() in SPECIAL_GROUP_DRUGS else DrugCategory.STANDARD
+            )
+            key = (patient.id, drug_name, row["start_date"])
+            med = existing.get(key)
+            if med is None:
+                med = MedicationOrder(
+                    patient_id=patient.id,
+                    drug_name=drug_name,
+                    drug_category=category,
+                    start_date=row["start_date"],
+                    stop_date=row["stop_date"],
+                    dose=_clean(row["dose"]),
+                    route=_clean(row["route"]),
+                    frequency=_clean(row["frequency"]),
+                    flags={"is_hdat": False},
+                    source_system="FHIR_BULK",
+                )
+                self.db.add(med)
+                existing[key] = med
+                counts["inserted"] += 1
+            else:
+                med.stop_date = row["stop_date"]
+                med.dose = _clean(row["dose"])
+                med.route = _clean(row["route"])
+                med.frequency = _clean(row["frequency"])
+                if not self.db.is_modified(med):
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated"] += 1
+            self.db.flush()
+            tasks = self.scheduler.calculate_schedule(med, patient)
+            self.task_gen.create_or_update_tasks(tasks, actor="SYSTEM", commit=False)
+
+    def _upsert_observations(self, batch: list[tuple[str, dict[str, Any]]]) -> None:
+        counts = self.counts["observation"]
+        patients = self._patients(batch)
+        patient_ids = [patient.id for patient in patients.values()]
+        self.notifier.prefetch_recipients(patient_ids)
+        existing = {
+            (event.patient_id, event.test_type, event.performed_date): event
+            for event in self.db.query(MonitoringEvent).filter(
+                MonitoringEvent.patient_id.in_(patient_ids),
+                MonitoringEvent.performed_date.in_(
+                    {row["performed_date"] for _source, row in batch if row["performed_date"]}
+                ),
+            )
+        }
+        staged: list[tuple[str, MonitoringEvent, Patient]] = []
+        for source, row in batch:
+            patient = patients.get(row.get("patient_ref"))
+            if patient is None:
+                self._skip("observation", source, "Patient not found")
+                continue
+            if not row["test_type"] or not row["performed_date"]:
+                self._skip("observation", source, "Missing test_type or performed_date")
+                continue
+            key = (patient.id, row["test_type"], row["performed_date"])
+            event = existing.get(key)
+            if event is None:
+                event = MonitoringEvent(
+                    patient_id=patient.id,
+                    test_type=row["test_type"],
+                    performed_date=row["performed_date"],
+                    value=_clean(row["value"]),
+                    unit=row["unit"],
+                    interpretation=_clean(row["interpretation"]),
+                    source_system="FHIR_BULK",
+                )
+                self.db.add(event)
+                existing[key] = event
+                counts["inserted"] += 1
+            else:
+                for field in ("value", "unit", "interpretation"):
+                    if row[field] is not None:
+                        setattr(event, field, row[field] if field == "unit" else _clean(row[field]))
+                if event.abnormal_flag is not None and not self.db.is_modified(event):
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated"] += 1
+            staged.append((source, event, patient))
+        self.db.flush()
+
+        evaluations = self.evaluator.evaluate_event_batch((event, patient) for _source, event, patient in staged)
+        for (source, event, patient), evaluation in zip(staged, evaluations):
+            self.evaluator.apply_evaluation(event, evaluation)
+            self.abnormal_summary[evaluation.flag.value] += 1
+            if evaluation.flag in {AbnormalFlag.OUTSIDE_CRITICAL, AbnormalFlag.OUTSIDE_WARNING}:
+                priority = (
+                    NotificationPriority.CRITICAL
+                    if evaluation.flag == AbnormalFlag.OUTSIDE_CRITICAL
+                    else NotificationPriority.WARNING
+                )
+                self.notifier.notify_abnormal_event(event, patient, priority=priority, reason=evaluation.reason)
+            if self.task_gen.auto_complete_tasks_for_event(event, actor="SYSTEM", commit=False):
+                self.notifier.invalidate_recipient(patient.id)
+
+    def _patients(self, batch: list[tuple[str, dict[str, Any]]]) -> dict[str, Patient]:
+        """Patients referenced by a batch, keyed by FHIR logical id.
+
+        With ``FHIR_PSEUDONYM_SYSTEM`` set the logical id is not the pseudonym,
+        so references resolve through the ``epr_patient_ref`` stored when the
+        Patient resource was imported, in this run or an earlier one.
+        """
+        refs = {row["patient_ref"] for _source, row in batch if row.get("patient_ref")}
+        if self.adapter.pseudonym_system:
+            patients = self.db.query(Patient).filter(Patient.epr_patient_ref.in_(refs))
+            return {patient.epr_patient_ref: patient for patient in patients}
+        return {patient.pseudonym: patient for patient in self.db.query(Patient).filter(Patient.pseudonym.in_(refs))}
+
+    def _skip(self, kind: str, source: str, reason: str) -> None:
+        self.counts[kind]["skipped"] += 1
+        self._error(source, reason)
+
+    def _error(self, source: str, reason: str) -> None:
+        if len(self.errors) < 10:
+            self.errors.append(f"{source}: {reason}")
+
+    def _rate(self) -> str:
+        summary = self.summary()
+        return f"{summary['rows']} rows in {summary['seconds']:.1f}s ({summary['rows_per_second']:.0f} rows/s)"
+
+
+def _expand(paths: Iterable[str | Path]) -> list[Path]:
+    """NDJSON files under ``paths``, Patient exports first so references resolve."""
+    files: list[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.name.endswith((".ndjson", ".ndjson.gz"))))
+        else:
+            files.append(path)
+    return sorted(files, key=lambda p: not p.name.startswith("Patient"))
+
+
+def _open(path: Path) -> IO[bytes]:
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return path.open("rb")
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, str) and not get_settings().ALLOW_IDENTIFIERS:
+        return redact_identifiers(value)[0]
+    return value
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.integration import ExportTombstone, TrackedPatient
+from ..models.medication import MedicationOrder
+from ..models.monitoring import MonitoringEvent, MonitoringTask
+from ..models.patient import Patient
+from ..models.thresholds import ReferenceThreshold
+
+# Bump when a fingerprinted response changes shape, so old ETags stop matching.
+REPRESENTATION_VERSION = 1
+
+
+def strong_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in (REPRESENTATION_VERSION, *parts)).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """``If-None-Match`` semantics: any listed tag (weak or strong) or ``*`` matches."""
+    if not if_none_match or etag is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class DatasetFingerprints:
+    """Cheap change fingerprints for heavy read endpoints.
+
+    Each fingerprint is one aggregate query over ``updated_at`` (served by
+    the ``(updated_at, id)`` indexes) and, for small row sets, row counts
+    that catch deletions. Rows purged by retention leave tombstones, so the
+    export fingerprint needs no counts over the large tables.
+
+    Rows are stamped when their transaction starts, so one still committing
+    can land below the current maximum. As with incremental export cursors,
+    data changed within ``lag_seconds`` is treated as unsettled and gets no
+    fingerprint (``None``): the caller serves it fresh and uncached.
+    """
+
+    def __init__(self, db: Session, lag_seconds: float | None = None):
+        self.db = db
+        if lag_seconds is None:
+            lag_seconds = get_settings().EXPORT_CURSOR_LAG_SECONDS
+        self.lag = timedelta(seconds=lag_seconds)
+
+    def export(self, tracked_only: bool, *parts: Any) -> str | None:
+        marks = self.db.execute(
+            select(
+                _max(Patient.updated_at),
+                _max(MedicationOrder.updated_at),
+                _max(MonitoringEvent.updated_at),
+                _max(ExportTombstone.deleted_at),
+                select(func.count()).select_from(TrackedPatient).scalar_subquery(),
+            )
+        ).one()
+        return self._etag("export", tracked_only, *parts, *marks)
+
+    def thresholds(self, *parts: Any) -> str | None:
+        marks = self.db.execute(select(func.count(), func.max(ReferenceThreshold.updated_at))).one()
+        return self._etag("thresholds", *parts, *marks)
+
+    def patient_timeline(self, patient_id) -> str | None:
+        marks = []
+        for model in (MedicationOrder, MonitoringTask, MonitoringEvent):
+            marks.append(
+                select(func.count()).select_from(model).where(model.patient_id == patient_id).scalar_subquery()
+            )
+            marks.append(_max(model.updated_at, model.patient_id == patient_id))
+        row = self.db.execute(select(*marks, _max(Patient.updated_at, Patient.id == patient_id))).one()
+        return self._etag("timeline", patient_id, *row)
+
+    def _etag(self, *parts: Any) -> str | None:
+        settled_before = datetime.now(timezone.utc) - self.lag
+        for part in parts:
+            if isinstance(part, datetime):
+                # SQLite returns naive UTC.
+                stamp = part if part.tzinfo else part.replace(tzinfo=timezone.utc)
+                if stamp > settled_before:
+                    return None
+        return strong_etag(*parts)
+
+
+def _max(column, *criteria):
+    return select(func.max(column)).where(*criteria).scalar_subquery()
@@ -1,29 +1,73 @@
 from __future__ import annotations
 
 import hashlib
-from datetime import datetime, timezone
-from typing import Any
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator
 
+import requests
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
+from ..models.audit import AuditAction
 from ..models.integration import TrackedPatient
 from ..models.medication import DrugCategory, MedicationOrder
-from ..models.monitoring import AbnormalFlag, MonitoringEvent
+from ..models.monitoring import AbnormalFlag, MonitoringEvent, MonitoringTask, TaskStatus
 from ..models.notifications import NotificationPriority
 from ..models.patient import Patient
 from ..services.abnormality import ThresholdEvaluator
-from ..services.epr_client import EPRClient, get_field, parse_date
+from ..services.audit_logger import create_audit_event
+from ..services.epr_client import (
+    BudgetExhausted,
+    EPRClient,
+    EPRUnavailable,
+    get_field,
+    get_refresh_budget,
+    parse_date,
+)
 from ..services.notification_engine import NotificationEngine
+from ..services.leases import LeaseLock
 from ..services.scheduling import SchedulingEngine
+from ..services.single_flight import SingleFlight
 from ..services.task_generator import TaskGenerator
 
 
+_SUMMARY_FLAGS = (
+    AbnormalFlag.NORMAL,
+    AbnormalFlag.OUTSIDE_WARNING,
+    AbnormalFlag.OUTSIDE_CRITICAL,
+    AbnormalFlag.UNKNOWN,
+)
+
+_fetch_executor: ThreadPoolExecutor | None = None
+_fetch_executor_lock = threading.Lock()
+# Concurrent on-demand fetches of one patient within this process share a flight.
+patient_fetches = SingleFlight()
+
+
+def get_fetch_executor() -> ThreadPoolExecutor:
+    """Threads for EPR requests; sized to the HTTP pool so none wait on a socket."""
+    global _fetch_executor
+    if _fetch_executor is None:
+        with _fetch_executor_lock:
+            if _fetch_executor is None:
+                _fetch_executor = ThreadPoolExecutor(
+                    max_workers=get_settings().EPR_POOL_MAXSIZE, thread_name_prefix="epr-fetch"
+                )
+    return _fetch_executor
+
+
 class IntegrationService:
-    def __init__(self, db: Session) -> None:
+    def __init__(self, db: Session, epr_client: EPRClient | None = None) -> None:
         self.db = db
         self.settings = get_settings()
-        self.epr_client = EPRClient()
+        self.epr_client = epr_client or EPRClient()
         self.scheduler = SchedulingEngine()
         self.task_gen = TaskGenerator(db)
         self.evaluator = ThresholdEvaluator(db)
@@ -34,84 +78,585 @@ class IntegrationService:
         nhs_number: str,
         requested_by: str | None = None,
         source_system: str | None = None,
+        *,
+        full_refresh: bool = False,
     ) -> dict[str, Any]:
-        patient_payload = self.epr_client.fetch_patient(nhs_number)
-        if not patient_payload:
-            raise ValueError("Patient not found in EPR")
+        patient_hash = self._hash_patient(nhs_number)
+        if not full_refresh:
+            cached = self._recently_synced(patient_hash, requested_by, source_system)
+            if cached is not None:
+                return cached
 
-        pseudonym = get_field(patient_payload, "pseudonym", "pseudonymous_number")
-        if not pseudonym:
-            raise ValueError("EPR patient missing pseudonym")
+        # Lazily fetched pages are read while importing, so the deadline spans both.
+        with self.epr_client.deadline(self.settings.EPR_REQUEST_DEADLINE_SECONDS):
+            patient_payload = self.epr_client.fetch_patient(nhs_number)
+            if not patient_payload:
+                raise ValueError("Patient not found in EPR")
+
+            pseudonym = get_field(patient_payload, "pseudonym", "pseudonymous_number")
+            if not pseudonym:
+                raise ValueError("EPR patient missing pseudonym")
+
+            window = SyncWindow() if full_refresh else self._sync_windows([patient_hash]).get(patient_hash, SyncWindow())
+            started = datetime.now(timezone.utc)
+
+            # Medications and observations depend only on patient_ref: request the
+            # first page of both concurrently. Later pages are fetched lazily while
+            # importing; database writes stay on this thread and this session.
+            patient_ref = get_field(patient_payload, "id", "patient_id") or pseudonym
+            executor = get_fetch_executor()
+            meds_future = executor.submit(
+                _primed, self.epr_client.fetch_medications(patient_ref, since=window.medications)
+            )
+            obs_future = executor.submit(
+                _primed, self.epr_client.fetch_observations(patient_ref, since=window.observations)
+            )
+            try:
+                patient = self._upsert_patient(patient_payload, pseudonym)
+                tracked = self._track_patient(patient, patient_hash, requested_by, source_system or "EPR")
+                meds_payload = meds_future.result()
+                obs_payload = obs_future.result()
+            except BaseException:
+                meds_future.cancel()
+                obs_future.cancel()
+                raise
 
-        patient = self._upsert_patient(patient_payload, pseudonym)
+            with self.notifier.held_sends():
+                med_summary = self._import_medications(patient, meds_payload)
+                event_summary = self._import_events(patient, obs_payload)
+                _record_sync(tracked, started, patient_ref, med_summary, event_summary)
+                self.db.commit()
+            return {
+                "patient_id": str(patient.id),
+                "pseudonym": patient.pseudonym,
+                "cached": False,
+                "incremental": window.incremental,
+                "medications": med_summary,
+                "events": event_summary,
+            }
+
+    def fetch_coalesced(
+        self,
+        nhs_number: str,
+        requested_by: str | None = None,
+        source_system: str | None = None,
+        *,
+        full_refresh: bool = False,
+    ) -> dict[str, Any]:
+        """``fetch_and_import`` with concurrent requests for one patient sharing a fetch.
+
+        Within a process, callers for the same ``patient_hash`` wait for the
+        fetch already in flight and get its result. Across workers a lease row
+        serializes fetches; a worker that had to wait usually finds the patient
+        freshly synced and answers from the database.
+        """
         patient_hash = self._hash_patient(nhs_number)
-        self._track_patient(patient, patient_hash, requested_by, source_system or "EPR")
+        wait_seconds = self.settings.EPR_FETCH_WAIT_SECONDS
 
-        patient_ref = get_field(patient_payload, "id", "patient_id") or pseudonym
-        meds_payload = self.epr_client.fetch_medications(patient_ref)
-        med_summary = self._import_medications(patient, meds_payload)
+        def _fetch() -> dict[str, Any]:
+            lock = self._fetch_lock(patient_hash)
+            if not lock.acquire():
+                patient_fetches.count("lock_waits")
+                if not lock.wait(wait_seconds):
+                    patient_fetches.count("lock_timeouts")
+                    raise RuntimeError("Another worker is still fetching this patient")
+            try:
+                return self.fetch_and_import(
+                    nhs_number, requested_by, source_system, full_refresh=full_refresh
+                )
+            finally:
+                lock.release(delete=True)
+
+        try:
+            result, shared = patient_fetches.do((patient_hash, full_refresh), _fetch, timeout=wait_seconds)
+        except TimeoutError as exc:
+            raise RuntimeError(str(exc)) from exc
+        return {**result, "coalesced": shared}
+
+    def fetch_batch(
+        self,
+        nhs_numbers: list[str],
+        requested_by: str | None = None,
+        source_system: str | None = None,
+        *,
+        audit_actor: str = "SYSTEM",
+        request_id: str | None = None,
+        ip_address: str | None = None,
+        full_refresh: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        """Fetch and import many patients, yielding one summary per NHS number.
 
-        obs_payload = self.epr_client.fetch_observations(patient_ref)
-        event_summary = self._import_events(patient, obs_payload)
+        Up to ``EPR_BATCH_CONCURRENCY`` patients are fetched at once; results
+        are imported in groups of ``EPR_BATCH_GROUP_SIZE`` with one commit per
+        group and a savepoint per patient, so a failing patient is reported
+        without undoing the rest of its group. Each fetch gets its own
+        ``EPR_REQUEST_DEADLINE_SECONDS``, and notifications go out only once
+        their group commits. Each import holds the patient's ``epr-fetch:``
+        lease; a patient another worker is fetching is reported as
+        ``deferred``. Summaries follow input order.
+        """
+        context = BatchContext(requested_by, source_system or "EPR", audit_actor, request_id, ip_address)
+        windows = {} if full_refresh else self._sync_windows([self._hash_patient(n) for n in nhs_numbers])
+        group: list[tuple[int, RemoteRecord | Exception]] = []
+        fetch = lambda nhs_number: self._fetch_record(nhs_number, windows)  # noqa: E731
+        for index, fetched in self._fetch_records(nhs_numbers, fetch, self.settings.EPR_BATCH_CONCURRENCY):
+            group.append((index, fetched))
+            if len(group) >= self.settings.EPR_BATCH_GROUP_SIZE:
+                yield from self._import_group(group, context)
+                group = []
+        if group:
+            yield from self._import_group(group, context)
+
+    def refresh_due(self, limit: int | None = None) -> dict[str, int]:
+        """Re-fetch stale tracked patients in the background.
+
+        Fetches run on ``EPR_REFRESH_CONCURRENCY`` threads and every EPR request
+        draws on the process-wide ``EPR_REFRESH_REQUESTS_PER_MINUTE`` budget;
+        imports stay on this thread with one commit per patient, under the
+        patient's ``epr-fetch:`` lease. No fetch starts after
+        ``EPR_REFRESH_MAX_SECONDS``, keeping the job inside the scheduler lease.
+        Patients left over then, being fetched by another worker, or skipped
+        when the budget runs dry or the EPR circuit breaker opens, stay due for
+        the next run.
+        """
+        targets = self.due_for_refresh(limit)
+        totals = {"due": len(targets), "refreshed": 0, "failed": 0, "deferred": 0}
+        if not targets:
+            return totals
+        client = EPRClient(budget=get_refresh_budget())
+        stop_at = time.monotonic() + self.settings.EPR_REFRESH_MAX_SECONDS
+
+        def fetch(target: RefreshTarget) -> RemoteRecord:
+            if time.monotonic() >= stop_at:
+                raise BudgetExhausted("EPR refresh run reached EPR_REFRESH_MAX_SECONDS")
+            return self._fetch_target(client, target)
+
+        for index, fetched in self._fetch_records(targets, fetch, self.settings.EPR_REFRESH_CONCURRENCY):
+            target = targets[index]
+            if isinstance(fetched, (BudgetExhausted, EPRUnavailable)):
+                totals["deferred"] += 1
+                continue
+            lock = self._fetch_lock(target.patient_hash)
+            if not lock.acquire():
+                totals["deferred"] += 1
+                continue
+            try:
+                if isinstance(fetched, Exception):
+                    raise fetched
+                patient = self.db.get(Patient, target.patient_id)
+                with self.notifier.held_sends():
+                    _record_sync(
+                        self.db.get(TrackedPatient, target.tracked_id),
+                        fetched.started,
+                        target.patient_ref,
+                        self._import_medications(patient, fetched.medications),
+                        self._import_events(patient, fetched.observations),
+                    )
+                    self.db.commit()
+                totals["refreshed"] += 1
+            except Exception as exc:
+                self.db.rollback()
+                tracked = self.db.get(TrackedPatient, target.tracked_id)
+                tracked.last_sync_attempt_at = datetime.now(timezone.utc)
+                tracked.last_sync_status = "FAILED"
+                tracked.last_sync_error = _error_message(exc)[:255]
+                self.db.commit()
+                totals["failed"] += 1
+            finally:
+                lock.release(delete=True)
+        return totals
+
+    def due_for_refresh(self, limit: int | None = None) -> list[RefreshTarget]:
+        """Tracked patients not synced for ``EPR_REFRESH_STALE_SECONDS``.
+
+        Patients with open overdue tasks come first, then the longest unsynced.
+        """
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.settings.EPR_REFRESH_STALE_SECONDS)
+        overdue = (
+            select(MonitoringTask.patient_id, func.count().label("overdue"))
+            .where(MonitoringTask.status == TaskStatus.OVERDUE)
+            .group_by(MonitoringTask.patient_id)
+            .subquery()
+        )
+        rows = self.db.execute(
+            select(
+                TrackedPatient.id,
+                TrackedPatient.patient_id,
+                TrackedPatient.patient_hash,
+                TrackedPatient.epr_patient_ref,
+                TrackedPatient.medications_synced_at,
+                TrackedPatient.observations_synced_at,
+            )
+            .outerjoin(overdue, overdue.c.patient_id == TrackedPatient.patient_id)
+            .where(
+                TrackedPatient.epr_patient_ref.is_not(None),
+                or_(
+                    TrackedPatient.last_sync_attempt_at.is_(None),
+                    TrackedPatient.last_sync_attempt_at < stale_before,
+                ),
+            )
+            .order_by(
+                func.coalesce(overdue.c.overdue, 0).desc(),
+                TrackedPatient.observations_synced_at.asc().nulls_first(),
+            )
+            .limit(limit or self.settings.EPR_REFRESH_BATCH_SIZE)
+        ).all()
+        overlap = timedelta(seconds=self.settings.EPR_SYNC_OVERLAP_SECONDS)
+        return [
+            RefreshTarget(
+                tracked_id=row.id,
+                patient_id=row.patient_id,
+                patient_hash=row.patient_hash,
+                patient_ref=row.epr_patient_ref,
+                window=SyncWindow(
+                    medications=_rewind(row.medications_synced_at, overlap),
+                    observations=_rewind(row.observations_synced_at, overlap),
+                ),
+            )
+            for row in rows
+        ]
 
+    def _recently_synced(
+        self, patient_hash: str, requested_by: str | None, source_system: str | None
+    ) -> dict[str, Any] | None:
+        """Serve an on-demand fetch locally when the patient synced moments ago."""
+        fresh_seconds = self.settings.EPR_REFRESH_FRESH_SECONDS
+        if not fresh_seconds:
+            return None
+        tracked = self.db.query(TrackedPatient).filter(TrackedPatient.patient_hash == patient_hash).first()
+        synced_at = _as_utc(tracked.observations_synced_at) if tracked else None
+        now = datetime.now(timezone.utc)
+        if synced_at is None or tracked.last_sync_status != "OK" or synced_at < now - timedelta(seconds=fresh_seconds):
+            return None
+        patient = self.db.get(Patient, tracked.patient_id)
+        tracked.last_requested_at = now
+        tracked.request_count += 1
+        tracked.requested_by = requested_by or tracked.requested_by
+        tracked.source_system = source_system or tracked.source_system
         self.db.commit()
+        # Same shape as a fetch that found nothing new.
         return {
             "patient_id": str(patient.id),
             "pseudonym": patient.pseudonym,
-            "medications": med_summary,
-            "events": event_summary,
+            "cached": True,
+            "synced_at": synced_at.isoformat(),
+            "incremental": True,
+            "medications": {"inserted": 0, "updated": 0, "skipped": 0, "errors": []},
+            "events": {
+                "inserted": 0,
+                "updated": 0,
+                "unchanged": 0,
+                "skipped": 0,
+                "errors": [],
+                "abnormal_summary": {flag.value: 0 for flag in _SUMMARY_FLAGS},
+            },
         }
 
-    def _upsert_patient(self, payload: dict[str, Any], pseudonym: str) -> Patient:
-        patient = self.db.query(Patient).filter_by(pseudonym=pseudonym).first()
-        age_band = get_field(payload, "age_band", "ageBand")
-        sex = get_field(payload, "sex", "gender")
-        if patient:
-            patient.age_band = age_band
-            patient.sex = sex
-            return patient
-        patient = Patient(
+    def _fetch_records(
+        self, items: list, fetch: Callable[[Any], RemoteRecord], workers: int
+    ) -> Iterator[tuple[int, RemoteRecord | Exception]]:
+        """Run ``fetch`` over ``items`` on a bounded window of threads, yielding in input order."""
+        queue = iter(enumerate(items))
+        pending: deque = deque()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="epr-batch") as pool:
+            try:
+                for index, item in islice(queue, workers * 2):
+                    pending.append((index, pool.submit(fetch, item)))
+                while pending:
+                    index, future = pending.popleft()
+                    queued = next(queue, None)
+                    if queued is not None:
+                        pending.append((queued[0], pool.submit(fetch, queued[1])))
+                    try:
+                        yield index, future.result()
+                    except Exception as exc:
+                        yield index, exc
+            finally:
+                for _index, future in pending:
+                    future.cancel()
+
+    def _fetch_record(self, nhs_number: str, windows: dict[str, SyncWindow]) -> RemoteRecord:
+        # Runs on a batch thread: the deadline must not be shared with the other fetches.
+        client = self.epr_client.bounded(self.settings.EPR_REQUEST_DEADLINE_SECONDS)
+        patient_payload = client.fetch_patient(nhs_number)
+        if not patient_payload:
+            raise ValueError("Patient not found in EPR")
+        pseudonym = get_field(patient_payload, "pseudonym", "pseudonymous_number")
+        if not pseudonym:
+            raise ValueError("EPR patient missing pseudonym")
+        patient_ref = get_field(patient_payload, "id", "patient_id") or pseudonym
+        patient_hash = self._hash_patient(nhs_number)
+        window = windows.get(patient_hash, SyncWindow())
+        started = datetime.now(timezone.utc)
+        return RemoteRecord(
+            patient_hash=patient_hash,
             pseudonym=pseudonym,
-            age_band=age_band,
-            sex=sex,
+            patient=patient_payload,
+            patient_ref=patient_ref,
+            # Materialized: a group that fails is retried record by record.
+            medications=list(client.fetch_medications(patient_ref, since=window.medications)),
+            observations=list(client.fetch_observations(patient_ref, since=window.observations)),
+            started=started,
+            incremental=window.incremental,
         )
-        self.db.add(patient)
-        self.db.flush()
+
+    def _fetch_target(self, client: EPRClient, target: RefreshTarget) -> RemoteRecord:
+        client = client.bounded(self.settings.EPR_REQUEST_DEADLINE_SECONDS)
+        started = datetime.now(timezone.utc)
+        return RemoteRecord(
+            patient_hash=None,
+            pseudonym=None,
+            patient=None,
+            patient_ref=target.patient_ref,
+            medications=list(client.fetch_medications(target.patient_ref, since=target.window.medications)),
+            observations=list(client.fetch_observations(target.patient_ref, since=target.window.observations)),
+            started=started,
+            incremental=target.window.incremental,
+        )
+
+    def _import_group(
+        self,
+        group: list[tuple[int, RemoteRecord | Exception]],
+        context: BatchContext,
+    ) -> Iterator[dict[str, Any]]:
+        results: dict[int, dict[str, Any]] = {
+            index: _failed(index, fetched) for index, fetched in group if isinstance(fetched, Exception)
+        }
+        records = []
+        locks = []
+        for index, fetched in group:
+            if isinstance(fetched, Exception):
+                continue
+            lock = self._fetch_lock(fetched.patient_hash)
+            if lock.acquire():
+                locks.append(lock)
+                records.append((index, fetched))
+            else:
+                results[index] = _deferred(index)
+        try:
+            if records:
+                self._import_locked(records, context, results)
+        finally:
+            for lock in locks:
+                lock.release(delete=True)
+        for index in sorted(results):
+            yield results[index]
+
+    def _import_locked(
+        self,
+        records: list[tuple[int, RemoteRecord]],
+        context: BatchContext,
+        results: dict[int, dict[str, Any]],
+    ) -> None:
+        try:
+            results.update(self._import_records(records, context))
+        except Exception as exc:
+            self.db.rollback()
+            if len(records) == 1:
+                results[records[0][0]] = _failed(records[0][0], exc)
+            else:
+                # Retry one by one so only the patient that breaks the group fails.
+                for record in records:
+                    try:
+                        results.update(self._import_records([record], context))
+                    except Exception as retry_exc:
+                        self.db.rollback()
+                        results[record[0]] = _failed(record[0], retry_exc)
+
+    def _import_records(
+        self,
+        records: list[tuple[int, RemoteRecord]],
+        context: BatchContext,
+    ) -> dict[int, dict[str, Any]]:
+        results: dict[int, dict[str, Any]] = {}
+        patients = self._upsert_patients([(record.patient, record.pseudonym) for _index, record in records])
+        tracked = []
+        for (index, record), patient in zip(records, patients):
+            if isinstance(patient, Exception):
+                results[index] = _failed(index, patient)
+            else:
+                tracked.append((patient, record.patient_hash))
+        tracking = self._track_patients(tracked, context.requested_by, context.source_system)
+
+        patient_ids = [patient.id for patient, _hash in tracked]
+        existing_meds = self._existing_medications(patient_ids)
+        existing_events = self._existing_events(patient_ids)
+        # Sent only once the group commits, and never for a patient rolled back.
+        with self.notifier.held_sends() as outbox:
+            for (index, record), patient in zip(records, patients):
+                if isinstance(patient, Exception):
+                    continue
+                queued = len(outbox)
+                try:
+                    with self.db.begin_nested():
+                        med_summary = self._import_medications(patient, record.medications, existing_meds)
+                        event_summary = self._import_events(patient, record.observations, existing_events)
+                        create_audit_event(
+                            self.db,
+                            actor=context.audit_actor,
+                            action=AuditAction.UPDATE,
+                            entity_type="EPRFetch",
+                            entity_id=str(patient.id),
+                            details={"pseudonym": patient.pseudonym, "batch": True},
+                            request=None,
+                            request_id=context.request_id,
+                            ip_address=context.ip_address,
+                            commit=False,
+                        )
+                        _record_sync(
+                            tracking[patient.id], record.started, record.patient_ref, med_summary, event_summary
+                        )
+                except Exception as exc:
+                    del outbox[queued:]
+                    results[index] = _failed(index, exc)
+                    continue
+                results[index] = {
+                    "index": index,
+                    "status": "ok",
+                    "patient_id": str(patient.id),
+                    "pseudonym": patient.pseudonym,
+                    "incremental": record.incremental,
+                    "medications": med_summary,
+                    "events": event_summary,
+                }
+            self.db.commit()
+        return results
+
+    def _upsert_patient(self, payload: dict[str, Any], pseudonym: str) -> Patient:
+        (patient,) = self._upsert_patients([(payload, pseudonym)])
+        if isinstance(patient, Exception):
+            raise patient
         return patient
 
+    def _upsert_patients(self, items: list[tuple[dict[str, Any], str]]) -> list[Patient | Exception]:
+        """Upsert patients by pseudonym with one lookup query and one flush."""
+        pseudonyms = {pseudonym for _payload, pseudonym in items}
+        existing = {
+            patient.pseudonym: patient
+            for patient in self.db.query(Patient).filter(Patient.pseudonym.in_(pseudonyms))
+        }
+        patients: list[Patient | Exception] = []
+        for payload, pseudonym in items:
+            age_band = get_field(payload, "age_band", "ageBand")
+            sex = get_field(payload, "sex", "gender")
+            try:
+                patient = existing.get(pseudonym)
+                if patient:
+                    patient.age_band = age_band
+                    patient.sex = sex
+                else:
+                    patient = Patient(
+                        pseudonym=pseudonym,
+                        age_band=age_band,
+                        sex=sex,
+                    )
+                    self.db.add(patient)
+                    existing[pseudonym] = patient
+            except ValueError as exc:
+                patients.append(exc)
+                continue
+            patients.append(patient)
+        self.db.flush()
+        return patients
+
     def _track_patient(
         self,
         patient: Patient,
         patient_hash: str,
         requested_by: str | None,
         source_system: str,
-    ) -> None:
-        tracked = self.db.query(TrackedPatient).filter_by(patient_id=patient.id).first()
+    ) -> TrackedPatient:
+        return self._track_patients([(patient, patient_hash)], requested_by, source_system)[patient.id]
+
+    def _track_patients(
+        self,
+        items: list[tuple[Patient, str]],
+        requested_by: str | None,
+        source_system: str,
+    ) -> dict[Any, TrackedPatient]:
+        if not items:
+            return {}
+        existing = {
+            tracked.patient_id: tracked
+            for tracked in self.db.query(TrackedPatient).filter(
+                TrackedPatient.patient_id.in_([patient.id for patient, _hash in items])
+            )
+        }
         now = datetime.now(timezone.utc)
-        if tracked:
-            tracked.last_requested_at = now
-            tracked.request_count += 1
-            tracked.requested_by = requested_by or tracked.requested_by
-            tracked.source_system = source_system
-            return
-        tracked = TrackedPatient(
-            patient_id=patient.id,
-            patient_hash=patient_hash,
-            source_system=source_system,
-            requested_by=requested_by,
-            first_requested_at=now,
-            last_requested_at=now,
-            request_count=1,
-        )
-        self.db.add(tracked)
+        for patient, patient_hash in items:
+            tracked = existing.get(patient.id)
+            if tracked:
+                tracked.last_requested_at = now
+                tracked.request_count += 1
+                tracked.requested_by = requested_by or tracked.requested_by
+                tracked.source_system = source_system
+                continue
+            tracked = TrackedPatient(
+                patient_id=patient.id,
+                patient_hash=patient_hash,
+                source_system=source_system,
+                requested_by=requested_by,
+                first_requested_at=now,
+                last_requested_at=now,
+                request_count=1,
+            )
+            self.db.add(tracked)
+            existing[patient.id] = tracked
+        return existing
+
+    def _sync_windows(self, patient_hashes: list[str]) -> dict[str, SyncWindow]:
+        """Watermarks of already tracked patients, rewound by ``EPR_SYNC_OVERLAP_SECONDS``.
+
+        The overlap absorbs clock skew between this service and the EPR; resources
+        delivered twice are upserts and leave unchanged rows untouched.
+        """
+        if not patient_hashes:
+            return {}
+        overlap = timedelta(seconds=self.settings.EPR_SYNC_OVERLAP_SECONDS)
+        rows = self.db.query(
+            TrackedPatient.patient_hash,
+            TrackedPatient.medications_synced_at,
+            TrackedPatient.observations_synced_at,
+        ).filter(TrackedPatient.patient_hash.in_(set(patient_hashes)))
+        return {
+            row.patient_hash: SyncWindow(
+                medications=_rewind(row.medications_synced_at, overlap),
+                observations=_rewind(row.observations_synced_at, overlap),
+            )
+            for row in rows
+        }
+
+    def _existing_medications(self, patient_ids: list) -> dict[tuple, MedicationOrder]:
+        if not patient_ids:
+            return {}
+        return {
+            (med.patient_id, med.drug_name, med.start_date): med
+            for med in self.db.query(MedicationOrder).filter(MedicationOrder.patient_id.in_(patient_ids))
+        }
+
+    def _existing_events(self, patient_ids: list) -> dict[tuple, MonitoringEvent]:
+        if not patient_ids:
+            return {}
+        return {
+            (event.patient_id, event.test_type, event.performed_date): event
+            for event in self.db.query(MonitoringEvent).filter(MonitoringEvent.patient_id.in_(patient_ids))
+        }
 
-    def _import_medications(self, patient: Patient, meds_payload: list[dict[str, Any]]) -> dict[str, Any]:
+    def _import_medications(
+        self,
+        patient: Patient,
+        meds_payload: Iterable[dict[str, Any]],
+        existing: dict[tuple, MedicationOrder] | None = None,
+    ) -> dict[str, Any]:
         inserted = 0
         updated = 0
         skipped = 0
         errors: list[str] = []
+        scheduled: list[MonitoringTask] = []
 
         for idx, payload in enumerate(meds_payload):
+            if existing is None:
+                existing = self._existing_medications([patient.id])
             try:
                 drug_name = get_field(payload, "drug_name", "medication", "medicationText", "name")
                 if drug_name is None and isinstance(payload, dict):
@@ -138,15 +683,7 @@ class IntegrationService:
                 else:
                     category = DrugCategory.STANDARD
 
-                med = (
-                    self.db.query(MedicationOrder)
-                    .filter_by(
-                        patient_id=patient.id,
-                        drug_name=drug_name,
-                        start_date=start_date,
-                    )
-                    .first()
-                )
+                med = existing.get((patient.id, drug_name, start_date))
 
                 if med:
                     med.stop_date = stop_date
@@ -171,29 +708,43 @@ class IntegrationService:
                     )
                     self.db.add(med)
                     self.db.flush()
+                    existing[(patient.id, drug_name, start_date)] = med
                     inserted += 1
 
                 tasks = self.scheduler.calculate_schedule(med, patient)
-                self.task_gen.create_or_update_tasks(tasks, actor="SYSTEM")
+                scheduled.extend(self.task_gen.create_or_update_tasks(tasks, actor="SYSTEM", commit=False))
             except Exception as exc:
                 errors.append(f"Medication row {idx}: {exc}")
                 skipped += 1
 
+        self._complete_from_history(patient, scheduled)
         return {"inserted": inserted, "updated": updated, "skipped": skipped, "errors": errors[:10]}
 
-    def _import_events(self, patient: Patient, obs_payload: list[dict[str, Any]]) -> dict[str, Any]:
+    def _import_events(
+        self,
+        patient: Patient,
+        obs_payload: Iterable[dict[str, Any]],
+        existing_events: dict[tuple, MonitoringEvent] | None = None,
+    ) -> dict[str, Any]:
         inserted = 0
         updated = 0
+        unchanged = 0
         skipped = 0
         errors: list[str] = []
-        abnormal_summary = {
-            AbnormalFlag.NORMAL.value: 0,
-            AbnormalFlag.OUTSIDE_WARNING.value: 0,
-            AbnormalFlag.OUTSIDE_CRITICAL.value: 0,
-            AbnormalFlag.UNKNOWN.value: 0,
-        }
+        abnormal_summary = {flag.value: 0 for flag in _SUMMARY_FLAGS}
 
+        # Observations may arrive as a lazy stream of pages: evaluate them in
+        # page-sized chunks instead of holding the whole history.
+        page_size = self.settings.EPR_PAGE_SIZE or 100
+        staged: list[tuple[int, MonitoringEvent]] = []
+        prefetched = False
         for idx, payload in enumerate(obs_payload):
+            if not prefetched:
+                # Deferred to the first resource: an empty incremental sync reads nothing.
+                prefetched = True
+                if existing_events is None:
+                    existing_events = self._existing_events([patient.id])
+                self.notifier.prefetch_recipients([patient.id])
             try:
                 test_type = str(get_field(payload, "test_type", "type", "code")).strip()
                 performed_date = parse_date(
@@ -213,16 +764,11 @@ class IntegrationService:
                         value = value_quantity.get("value")
                     if unit is None:
                         unit = value_quantity.get("unit")
+                if value is not None:
+                    # The column is text: a numeric 7.5 must compare equal to the stored "7.5".
+                    value = str(value)
 
-                existing = (
-                    self.db.query(MonitoringEvent)
-                    .filter_by(
-                        patient_id=patient.id,
-                        test_type=test_type,
-                        performed_date=performed_date,
-                    )
-                    .first()
-                )
+                existing = existing_events.get((patient.id, test_type, performed_date))
                 if existing:
                     if value is not None:
                         existing.value = value
@@ -232,6 +778,10 @@ class IntegrationService:
                         existing.interpretation = interpretation
                     if attachment_url is not None:
                         existing.attachment_url = attachment_url
+                    if existing.abnormal_flag is not None and not self.db.is_modified(existing):
+                        # Delivered again without changes: its evaluation still stands.
+                        unchanged += 1
+                        continue
                     updated += 1
                     event = existing
                 else:
@@ -247,9 +797,40 @@ class IntegrationService:
                     )
                     self.db.add(event)
                     self.db.flush()
+                    existing_events[(patient.id, test_type, performed_date)] = event
                     inserted += 1
+                staged.append((idx, event))
+            except Exception as exc:
+                errors.append(f"Observation row {idx}: {exc}")
+                skipped += 1
+            if len(staged) >= page_size:
+                skipped += self._evaluate_staged(patient, staged, abnormal_summary, errors)
+                staged = []
+        skipped += self._evaluate_staged(patient, staged, abnormal_summary, errors)
 
-                evaluation = self.evaluator.evaluate_event(event, patient)
+        return {
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": unchanged,
+            "skipped": skipped,
+            "errors": errors[:10],
+            "abnormal_summary": abnormal_summary,
+        }
+
+    def _evaluate_staged(
+        self,
+        patient: Patient,
+        staged: list[tuple[int, MonitoringEvent]],
+        abnormal_summary: dict[str, int],
+        errors: list[str],
+    ) -> int:
+        """Evaluate, notify and complete tasks for one chunk; returns rows skipped."""
+        if not staged:
+            return 0
+        skipped = 0
+        evaluations = self.evaluator.evaluate_event_batch((event, patient) for _idx, event in staged)
+        for (idx, event), evaluation in zip(staged, evaluations):
+            try:
                 self.evaluator.apply_evaluation(event, evaluation)
                 abnormal_summary[evaluation.flag.value] += 1
 
@@ -268,20 +849,145 @@ class IntegrationService:
                         reason=evaluation.reason,
                     )
 
-                self.task_gen.auto_complete_tasks_for_event(event, actor="SYSTEM")
+                if self.task_gen.auto_complete_tasks_for_event(event, actor="SYSTEM", commit=False):
+                    self.notifier.invalidate_recipient(patient.id)
             except Exception as exc:
                 errors.append(f"Observation row {idx}: {exc}")
                 skipped += 1
 
-        return {
-            "inserted": inserted,
-            "updated": updated,
-            "skipped": skipped,
-            "errors": errors[:10],
-            "abnormal_summary": abnormal_summary,
-        }
+        return skipped
+
+    def _complete_from_history(self, patient: Patient, tasks: list[MonitoringTask]) -> None:
+        """Auto-complete newly scheduled tasks against events already stored.
+
+        Unchanged events are not re-processed on a later fetch, so a task added
+        by a new or changed medication is checked against history here.
+        """
+        open_tasks = [task for task in tasks if task.status in {TaskStatus.DUE, TaskStatus.OVERDUE}]
+        if not open_tasks:
+            return
+        window = timedelta(days=self.task_gen.window_days)
+        events = (
+            self.db.query(MonitoringEvent)
+            .filter(
+                MonitoringEvent.patient_id == patient.id,
+                MonitoringEvent.performed_date >= min(task.due_date for task in open_tasks) - window,
+                MonitoringEvent.performed_date <= max(task.due_date for task in open_tasks) + window,
+            )
+            .order_by(MonitoringEvent.performed_date.asc())
+        )
+        for event in events:
+            if self.task_gen.auto_complete_tasks_for_event(event, actor="SYSTEM", commit=False):
+                self.notifier.invalidate_recipient(patient.id)
+
+    def _fetch_lock(self, patient_hash: str) -> LeaseLock:
+        """Cross-worker lease serializing fetches and imports of one patient."""
+        return LeaseLock(f"epr-fetch:{patient_hash[:48]}", self.settings.EPR_FETCH_LOCK_SECONDS)
 
     def _hash_patient(self, nhs_number: str) -> str:
         salt = self.settings.EPR_HASH_SALT or self.settings.SECRET_KEY or ""
         payload = f"{nhs_number}{salt}".encode("utf-8")
         return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class SyncWindow:
+    """Lower bounds for an incremental fetch; ``None`` fetches everything."""
+
+    medications: datetime | None = None
+    observations: datetime | None = None
+
+    @property
+    def incremental(self) -> bool:
+        return self.medications is not None or self.observations is not None
+
+
+@dataclass
+class RefreshTarget:
+    tracked_id: Any
+    patient_id: Any
+    patient_hash: str
+    patient_ref: str
+    window: SyncWindow
+
+
+@dataclass
+class BatchContext:
+    requested_by: str | None
+    source_system: str
+    audit_actor: str
+    request_id: str | None
+    ip_address: str | None
+
+
+@dataclass
+class RemoteRecord:
+    patient_hash: str | None
+    pseudonym: str | None
+    patient: dict[str, Any] | None
+    patient_ref: str
+    medications: list[dict[str, Any]]
+    observations: list[dict[str, Any]]
+    started: datetime
+    incremental: bool
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _rewind(value: datetime | None, overlap: timedelta) -> datetime | None:
+    value = _as_utc(value)
+    return None if value is None else value - overlap
+
+
+def _record_sync(
+    tracked: TrackedPatient,
+    started: datetime,
+    patient_ref: str,
+    medications: dict[str, Any],
+    events: dict[str, Any],
+) -> None:
+    """Advance the watermarks of the resources imported without skipped rows.
+
+    Fetch start, not finish: anything updated while the fetch ran is re-read
+    next time. A resource with skipped rows keeps its watermark, so the next
+    incremental fetch delivers those rows again, and the sync is PARTIAL.
+    """
+    if not medications["skipped"]:
+        tracked.medications_synced_at = started
+    if not events["skipped"]:
+        tracked.observations_synced_at = started
+    tracked.epr_patient_ref = patient_ref
+    tracked.last_sync_attempt_at = started
+    if medications["skipped"] or events["skipped"]:
+        tracked.last_sync_status = "PARTIAL"
+        tracked.last_sync_error = (
+            f"{medications['skipped']} medication and {events['skipped']} observation rows skipped"
+        )
+    else:
+        tracked.last_sync_status = "OK"
+        tracked.last_sync_error = None
+
+
+def _primed(resources: Iterator[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    """Request the first page of a lazy resource stream now; later pages stay lazy."""
+    first = next(resources, None)
+    return iter(()) if first is None else chain([first], resources)
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, requests.RequestException):
+        # Request errors quote the URL, which carries the NHS number.
+        return f"EPR request failed ({type(exc).__name__})"
+    return str(exc)
+
+
+def _failed(index: int, exc: Exception) -> dict[str, Any]:
+    return {"index": index, "status": "error", "error": _error_message(exc)}
+
+
+def _deferred(index: int) -> dict[str, Any]:
+    return {"index": index, "status": "deferred", "error": "Another worker is still fetching this patient"}
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from ..database import get_sessionmaker
+from ..models.jobs import SchedulerLease
+
+
+def node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLock:
+    """Cross-process mutex on a ``scheduler_leases`` row.
+
+    The holder keeps the lease by acquiring again before ``lease_seconds``
+    pass; once it expires any other holder may take it over, so a crashed
+    holder never blocks the name for long. Each call uses its own short
+    session so the lease commits independently of the caller's transaction.
+    """
+
+    def __init__(self, name: str, lease_seconds: int, holder: str | None = None) -> None:
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = holder or node_id()
+
+    def acquire(self) -> bool:
+        SessionLocal = get_sessionmaker()
+        db = SessionLocal()
+        try:
+            now = datetime.now(timezone.utc)
+            expires_at = now + timedelta(seconds=self.lease_seconds)
+            updated = (
+                db.query(SchedulerLease)
+                .filter(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now),
+                )
+                .update(
+                    {"holder": self.holder, "expires_at": expires_at},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if updated:
+                return True
+            try:
+                db.add(SchedulerLease(name=self.name, holder=self.holder, expires_at=expires_at))
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+                return False
+        finally:
+            db.close()
+
+    def wait(self, timeout: float, poll_seconds: float = 0.2) -> bool:
+        """Acquire, polling until ``timeout`` seconds have passed."""
+        deadline = time.monotonic() + timeout
+        while not self.acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(poll_seconds, remaining))
+        return True
+
+    def release(self, delete: bool = False) -> None:
+        """Expire the lease now; ``delete`` drops the row for short-lived names."""
+        SessionLocal = get_sessionmaker()
+        db = SessionLocal()
+        try:
+            held = db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name, SchedulerLease.holder == self.holder
+            )
+            if delete:
+                held.delete(synchronize_session=False)
+            else:
+                held.update({"expires_at": datetime.now(timezone.utc)}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
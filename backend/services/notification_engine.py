@@ -1,8 +1,12 @@
 from __future__ import annotations
 
-from datetime import date, datetime, timezone
-from typing import Iterable
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Iterator
 
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
@@ -10,6 +14,7 @@ from ..models.monitoring import MonitoringTask, MonitoringEvent, TaskStatus
 from ..models.notifications import (
     InAppNotification,
     InAppNotificationStatus,
+    NotificationDigestItem,
     NotificationPriority,
     NotificationType,
     RecipientType,
@@ -18,28 +23,46 @@ from ..models.patient import Patient
 from ..services.audit_logger import create_audit_event
 from ..models.audit import AuditAction
 from ..services.notifications import send_notification
+from ..services.sharding import Shard
+
+_ID_CHUNK_SIZE = 500
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING.
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+# Bumped whenever a task assignment changes so that batch-scoped recipient
+# caches held by long-running imports drop stale entries.
+_recipient_generation = 0
+
+
+def invalidate_recipient_cache() -> None:
+    global _recipient_generation
+    _recipient_generation += 1
 
 
 class NotificationEngine:
     def __init__(self, db: Session):
         self.db = db
         self.settings = get_settings()
+        self._recipient_cache: dict = {}
+        self._recipient_generation = _recipient_generation
+        self._outbox: list[dict] | None = None
 
-    def process_overdue_tasks(self) -> int:
+    def process_overdue_tasks(self, task_ids: Iterable | None = None) -> int:
+        """Create overdue/escalation notifications.
+
+        ``task_ids`` limits the pass to the given tasks (e.g. the ids returned
+        by the daily job's status updates); by default every OVERDUE task is
+        considered.
+        """
         if not self.settings.IN_APP_NOTIFICATIONS_ENABLED:
             return 0
+        if self.settings.NOTIFICATION_DIGEST_ENABLED:
+            return self.process_overdue_digests(task_ids)
 
         today = date.today()
-        tasks = (
-            self.db.query(MonitoringTask)
-            .filter(MonitoringTask.status == TaskStatus.OVERDUE)
-            .all()
-        )
         created = 0
-        for task in tasks:
-            patient = self.db.query(Patient).filter_by(id=task.patient_id).first()
-            if not patient:
-                continue
+        for task, patient in self._overdue_rows(task_ids, MonitoringTask, Patient):
 
             overdue_key = f"TASK_OVERDUE:{task.id}"
             if self._create_notification_if_missing(
@@ -84,6 +107,100 @@ class NotificationEngine:
         self.db.commit()
         return created
 
+    def process_overdue_digests(self, task_ids: Iterable | None = None) -> int:
+        """Group overdue/escalation notices into one digest per recipient per day.
+
+        Dedupe stays per task: each notice is recorded as a digest item keyed by
+        the same dedupe key the per-task notification would have used.
+        """
+        today = date.today()
+        tasks = self._overdue_rows(
+            task_ids, MonitoringTask.id, MonitoringTask.due_date, MonitoringTask.assigned_to
+        )
+        team_lead = (RecipientType.TEAM, self.settings.TEAM_LEAD_INBOX_ID)
+
+        notices: dict[tuple[RecipientType, str], list[tuple[NotificationType, object, str]]] = {}
+        for start in range(0, len(tasks), _ID_CHUNK_SIZE):
+            chunk = tasks[start : start + _ID_CHUNK_SIZE]
+            candidates = []
+            for task_id, due_date, assigned_to in chunk:
+                if assigned_to:
+                    recipient = (RecipientType.USER, assigned_to)
+                else:
+                    recipient = (RecipientType.TEAM, self.settings.TEAM_INBOX_ID)
+                candidates.append((recipient, NotificationType.TASK_OVERDUE, task_id, f"TASK_OVERDUE:{task_id}"))
+                if (today - due_date).days >= self.settings.ESCALATION_THRESHOLD_DAYS:
+                    candidates.append(
+                        (team_lead, NotificationType.TASK_ESCALATED, task_id, f"TASK_ESCALATED:{task_id}")
+                    )
+            seen = self._existing_dedupe_keys([key for *_rest, key in candidates])
+            for recipient, notification_type, task_id, dedupe_key in candidates:
+                if dedupe_key not in seen:
+                    notices.setdefault(recipient, []).append((notification_type, task_id, dedupe_key))
+
+        created = 0
+        for recipient, items in notices.items():
+            overdue_count = sum(1 for item in items if item[0] == NotificationType.TASK_OVERDUE)
+            escalated_count = len(items) - overdue_count
+            digest = self._upsert_digest(recipient, today, overdue_count, escalated_count)
+            self.db.add_all(
+                NotificationDigestItem(
+                    digest_id=digest.id,
+                    task_id=task_id,
+                    notification_type=notification_type,
+                    dedupe_key=dedupe_key,
+                )
+                for notification_type, task_id, dedupe_key in items
+            )
+            created += len(items)
+        self.db.commit()
+        return created
+
+    def pending_overdue_task_ids(self, shard: Shard | None = None) -> list:
+        """Ids of OVERDUE tasks still missing an overdue or due escalation notice."""
+        if not self.settings.IN_APP_NOTIFICATIONS_ENABLED:
+            return []
+
+        def _noticed(notification_type: NotificationType):
+            return or_(
+                exists().where(
+                    InAppNotification.task_id == MonitoringTask.id,
+                    InAppNotification.notification_type == notification_type,
+                ),
+                exists().where(
+                    NotificationDigestItem.task_id == MonitoringTask.id,
+                    NotificationDigestItem.notification_type == notification_type,
+                ),
+            )
+
+        cutoff = date.today() - timedelta(days=self.settings.ESCALATION_THRESHOLD_DAYS)
+        query = self.db.query(MonitoringTask.id).filter(
+            MonitoringTask.status == TaskStatus.OVERDUE,
+            or_(
+                ~_noticed(NotificationType.TASK_OVERDUE),
+                and_(
+                    MonitoringTask.due_date <= cutoff,
+                    ~_noticed(NotificationType.TASK_ESCALATED),
+                ),
+            ),
+        )
+        if shard is not None:
+            query = query.filter(shard.clause(MonitoringTask.patient_id))
+        return [row[0] for row in query.all()]
+
+    def _overdue_rows(self, task_ids: Iterable | None, *entities) -> list:
+        query = self.db.query(*entities).filter(MonitoringTask.status == TaskStatus.OVERDUE)
+        if any(entity is Patient for entity in entities):
+            query = query.join(Patient, MonitoringTask.patient_id == Patient.id)
+        if task_ids is None:
+            return query.all()
+        ids = list(task_ids)
+        rows: list = []
+        for start in range(0, len(ids), _ID_CHUNK_SIZE):
+            chunk = ids[start : start + _ID_CHUNK_SIZE]
+            rows.extend(query.filter(MonitoringTask.id.in_(chunk)).all())
+        return rows
+
     def notify_abnormal_event(
         self,
         event: MonitoringEvent,
@@ -126,6 +243,28 @@ class NotificationEngine:
         )
         return created
 
+    @contextmanager
+    def held_sends(self) -> Iterator[list[dict]]:
+        """Queue outbound sends made inside the block until it exits cleanly.
+
+        For callers whose transaction can still roll back: the in-app rows go
+        with it, but a sent message cannot be recalled. Trim the yielded list
+        to drop sends whose rows a savepoint rolled back; nothing is sent if
+        the block raises.
+        """
+        previous = self._outbox
+        outbox: list[dict] = []
+        self._outbox = outbox
+        try:
+            yield outbox
+        finally:
+            self._outbox = previous
+        if previous is not None:
+            previous.extend(outbox)
+            return
+        for send in outbox:
+            send_notification(**send)
+
     def mark_notification_read(self, notification: InAppNotification, actor: str) -> None:
         if notification.status == InAppNotificationStatus.UNREAD:
             notification.status = InAppNotificationStatus.READ
@@ -160,7 +299,134 @@ class NotificationEngine:
             return RecipientType.USER, task.assigned_to
         return RecipientType.TEAM, self.settings.TEAM_INBOX_ID
 
+    def _existing_dedupe_keys(self, keys: list[str]) -> set[str]:
+        """Those of ``keys`` already used by a digest item or a notification."""
+        if not keys:
+            return set()
+        digest_keys = self.db.query(NotificationDigestItem.dedupe_key).filter(
+            NotificationDigestItem.dedupe_key.in_(keys)
+        )
+        notification_keys = self.db.query(InAppNotification.dedupe_key).filter(
+            InAppNotification.dedupe_key.in_(keys)
+        )
+        return {row[0] for row in digest_keys} | {row[0] for row in notification_keys}
+
+    def _upsert_digest(
+        self,
+        recipient: tuple[RecipientType, str],
+        day: date,
+        overdue_count: int,
+        escalated_count: int,
+    ) -> InAppNotification:
+        """Add counts to the recipient's digest for ``day``, creating it if missing.
+
+        Shards run in parallel and may hit the same recipient: the row is
+        created with an insert that ignores a conflicting ``dedupe_key`` and then
+        re-read under a row lock, so concurrent updates add up instead of
+        overwriting each other.
+        """
+        recipient_type, recipient_id = recipient
+        dedupe_key = f"TASK_DIGEST:{recipient_type.value}:{recipient_id}:{day.isoformat()}"
+        title = "Overdue monitoring digest"
+        created = self._insert_digest_if_missing(
+            dedupe_key=dedupe_key,
+            recipient_type=recipient_type,
+            recipient_id=recipient_id,
+            notification_type=NotificationType.TASK_DIGEST,
+            priority=NotificationPriority.WARNING,
+            title=title,
+            payload={},
+        )
+        digest = (
+            self.db.query(InAppNotification)
+            .filter(InAppNotification.dedupe_key == dedupe_key)
+            .populate_existing()
+            .with_for_update()
+            .one()
+        )
+        payload = dict(digest.payload or {})
+        overdue_count += payload.get("overdue_count", 0)
+        escalated_count += payload.get("escalated_count", 0)
+
+        total = overdue_count + escalated_count
+        priority = NotificationPriority.CRITICAL if escalated_count else NotificationPriority.WARNING
+        message = f"{overdue_count} overdue, {escalated_count} escalated monitoring tasks"
+        metadata = {
+            "digest_date": day.isoformat(),
+            "overdue_count": overdue_count,
+            "escalated_count": escalated_count,
+            "task_count": total,
+        }
+        digest.priority = priority
+        digest.message = message
+        digest.payload = metadata
+        if created:
+            self.db.flush()
+            self._announce(digest, NotificationType.TASK_DIGEST, priority, recipient_id, title, message, metadata)
+            return digest
+
+        # New notices re-surface a digest that was already read or acked today.
+        digest.status = InAppNotificationStatus.UNREAD
+        digest.viewed_at = None
+        digest.acked_at = None
+        return digest
+
+    def _insert_digest_if_missing(self, **values) -> bool:
+        """Insert an ``InAppNotification`` unless its ``dedupe_key`` exists; True if inserted."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect in _UPSERT_INSERTS:
+            statement = (
+                _UPSERT_INSERTS[dialect](InAppNotification)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=["dedupe_key"])
+            )
+            return bool(self.db.execute(statement).rowcount)
+        # No ON CONFLICT: insert in a savepoint and fall back to the row that won.
+        try:
+            with self.db.begin_nested():
+                self.db.add(InAppNotification(**values))
+        except IntegrityError:
+            return False
+        return True
+
+    def prefetch_recipients(self, patient_ids: Iterable) -> None:
+        """Resolve event recipients for a batch of patients with a single query."""
+        self._check_recipient_generation()
+        pending = {pid for pid in patient_ids if pid is not None} - set(self._recipient_cache)
+        if not pending:
+            return
+        rows = (
+            self.db.query(MonitoringTask.patient_id, MonitoringTask.assigned_to)
+            .filter(
+                MonitoringTask.patient_id.in_(pending),
+                MonitoringTask.status.in_([TaskStatus.DUE, TaskStatus.OVERDUE]),
+                MonitoringTask.assigned_to != None,
+            )
+            .order_by(MonitoringTask.due_date.asc())
+            .all()
+        )
+        for patient_id, assigned_to in rows:
+            if patient_id in self._recipient_cache or not assigned_to:
+                continue
+            self._recipient_cache[patient_id] = (RecipientType.USER, assigned_to)
+        for patient_id in pending:
+            self._recipient_cache.setdefault(
+                patient_id, (RecipientType.TEAM, self.settings.TEAM_INBOX_ID)
+            )
+
+    def invalidate_recipient(self, patient_id) -> None:
+        self._recipient_cache.pop(patient_id, None)
+
+    def _check_recipient_generation(self) -> None:
+        if self._recipient_generation != _recipient_generation:
+            self._recipient_cache.clear()
+            self._recipient_generation = _recipient_generation
+
     def _recipient_for_event(self, patient: Patient) -> tuple[RecipientType, str]:
+        self._check_recipient_generation()
+        cached = self._recipient_cache.get(patient.id)
+        if cached is not None:
+            return cached
         task = (
             self.db.query(MonitoringTask)
             .filter(
@@ -172,8 +438,11 @@ class NotificationEngine:
             .first()
         )
         if task and task.assigned_to:
-            return RecipientType.USER, task.assigned_to
-        return RecipientType.TEAM, self.settings.TEAM_INBOX_ID
+            recipient = (RecipientType.USER, task.assigned_to)
+        else:
+            recipient = (RecipientType.TEAM, self.settings.TEAM_INBOX_ID)
+        self._recipient_cache[patient.id] = recipient
+        return recipient
 
     def _create_notification_if_missing(
         self,
@@ -196,6 +465,14 @@ class NotificationEngine:
         )
         if existing:
             return None
+        if task is not None:
+            digested = (
+                self.db.query(NotificationDigestItem.id)
+                .filter(NotificationDigestItem.dedupe_key == dedupe_key)
+                .first()
+            )
+            if digested:
+                return None
 
         recipient_type, recipient_id = recipient
         notification = InAppNotification(
@@ -213,7 +490,20 @@ class NotificationEngine:
         )
         self.db.add(notification)
         self.db.flush()
+        self._announce(notification, notification_type, priority, recipient_id, title, message, metadata)
+        return notification
 
+    def _announce(
+        self,
+        notification: InAppNotification,
+        notification_type: NotificationType,
+        priority: NotificationPriority,
+        recipient_id: str,
+        title: str,
+        message: str,
+        metadata: dict | None,
+    ) -> None:
+        """Audit a newly created notification and send it out."""
         create_audit_event(
             self.db,
             actor="SYSTEM",
@@ -230,12 +520,14 @@ class NotificationEngine:
         )
 
         if self.settings.NOTIFICATIONS_ENABLED:
-            send_notification(
-                notification_type=notification_type.value,
-                recipient=recipient_id,
-                title=title,
-                message=message,
-                metadata=metadata or {},
-            )
-
-        return notification
+            send = {
+                "notification_type": notification_type.value,
+                "recipient": recipient_id,
+                "title": title,
+                "message": message,
+                "metadata": metadata or {},
+            }
+            if self._outbox is not None:
+                self._outbox.append(send)
+            else:
+                send_notification(**send)
@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+import pandas as pd
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.jobs import ReevaluationRun, ReevaluationShard
+from ..models.monitoring import AbnormalFlag, MonitoringEvent, ReviewStatus
+from ..models.notifications import NotificationPriority
+from ..models.patient import Patient
+from .abnormality import BULK_COLUMNS, AbnormalEvaluation, ThresholdEvaluator, invalidate_threshold_index
+from .notification_engine import NotificationEngine
+from .sharding import Shard
+
+logger = logging.getLogger(__name__)
+
+_ABNORMAL = {AbnormalFlag.OUTSIDE_WARNING, AbnormalFlag.OUTSIDE_CRITICAL}
+# Event-side evaluation inputs; sex and age_band come from the joined patient.
+_EVENT_COLUMNS = [name for name in BULK_COLUMNS if name not in {"sex", "age_band"}]
+
+
+class ReevaluationService:
+    """Re-applies reference thresholds to stored events after a threshold change.
+
+    A run covers the monitoring types whose thresholds changed and is split into
+    shards over the event id space. Workers in any process claim a shard through
+    a lease, walk it by event id in keyset chunks, evaluate each chunk in one
+    vectorized batch and write back only events whose flag changed. Events that
+    become abnormal are notified as at ingestion, in the chunk's transaction. The
+    cursor is committed with every chunk, so an interrupted shard resumes where it
+    stopped once its lease expires.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        node_id: str | None = None,
+        batch_size: int | None = None,
+        lease_seconds: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.db = db
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size or settings.REEVALUATION_BATCH_SIZE
+        self.lease_seconds = lease_seconds or settings.REEVALUATION_LEASE_SECONDS
+        self.shard_count = settings.REEVALUATION_SHARDS
+
+    def enqueue(
+        self, monitoring_types: Iterable[str], requested_by: str | None = None
+    ) -> ReevaluationRun | None:
+        """Queue a run for ``monitoring_types``, folding into a run not yet started."""
+        types = {str(value).strip() for value in monitoring_types if value and str(value).strip()}
+        if not types:
+            return None
+
+        pending = (
+            self.db.query(ReevaluationRun)
+            .filter(ReevaluationRun.status == "PENDING")
+            .order_by(ReevaluationRun.created_at.asc())
+            .first()
+        )
+        if pending is not None:
+            merged = sorted(set(pending.monitoring_types) | types)
+            folded = self.db.execute(
+                update(ReevaluationRun)
+                .where(ReevaluationRun.id == pending.id, ReevaluationRun.status == "PENDING")
+                .values(monitoring_types=merged, total_events=self._count_events(merged))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            self.db.commit()
+            if folded:
+                self.db.refresh(pending)
+                return pending
+
+        ordered = sorted(types)
+        run = ReevaluationRun(
+            monitoring_types=ordered,
+            status="PENDING",
+            shard_count=self.shard_count,
+            requested_by=requested_by,
+            total_events=self._count_events(ordered),
+        )
+        self.db.add(run)
+        self.db.flush()
+        for index in range(self.shard_count):
+            self.db.add(
+                ReevaluationShard(
+                    run_id=run.id, shard_index=index, status="PENDING", scanned=0, changed=0
+                )
+            )
+        self.db.commit()
+        logger.info("Queued threshold re-evaluation %s for %s", run.id, ", ".join(ordered))
+        return run
+
+    def resume(self, run_id) -> int:
+        """Return FAILED shards of a run to the queue; they restart from their cursor."""
+        reset = self.db.execute(
+            update(ReevaluationShard)
+            .where(ReevaluationShard.run_id == run_id, ReevaluationShard.status == "FAILED")
+            .values(status="PENDING", holder=None, lease_expires_at=None, error=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if reset:
+            self.db.execute(
+                update(ReevaluationRun)
+                .where(ReevaluationRun.id == run_id)
+                .values(status="RUNNING", finished_at=None)
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+        return reset
+
+    def run_pending(self, max_shards: int | None = None) -> dict[str, int]:
+        """Claim and process shards until none are left (or ``max_shards`` ran)."""
+        totals = {"shards": 0, "scanned": 0, "changed": 0}
+        while max_shards is None or totals["shards"] < max_shards:
+            shard = self.claim()
+            if shard is None:
+                break
+            scanned, changed = self.process(shard)
+            totals["shards"] += 1
+            totals["scanned"] += scanned
+            totals["changed"] += changed
+        return totals
+
+    def claim(self) -> ReevaluationShard | None:
+        now = datetime.now(timezone.utc)
+        claimable = or_(
+            ReevaluationShard.status == "PENDING",
+            (ReevaluationShard.status == "RUNNING") & (ReevaluationShard.lease_expires_at < now),
+        )
+        candidates = self.db.execute(
+            select(ReevaluationShard.id, ReevaluationShard.run_id)
+            .join(ReevaluationRun, ReevaluationRun.id == ReevaluationShard.run_id)
+            .where(claimable)
+            .order_by(ReevaluationRun.created_at.asc(), ReevaluationShard.shard_index.asc())
+            .limit(self.shard_count)
+        ).all()
+        for shard_id, run_id in candidates:
+            claimed = self.db.execute(
+                update(ReevaluationShard)
+                .where(ReevaluationShard.id == shard_id, claimable)
+                .values(
+                    status="RUNNING",
+                    holder=self.node_id,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                self.db.rollback()
+                continue
+            self.db.execute(
+                update(ReevaluationRun)
+                .where(ReevaluationRun.id == run_id, ReevaluationRun.status == "PENDING")
+                .values(status="RUNNING")
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            return self.db.get(ReevaluationShard, shard_id, populate_existing=True)
+        return None
+
+    def process(self, shard: ReevaluationShard) -> tuple[int, int]:
+        """Re-evaluate one claimed shard; returns (scanned, changed) for this pass."""
+        run = self.db.get(ReevaluationRun, shard.run_id)
+        window = Shard(shard.shard_index, run.shard_count)
+        types = list(run.monitoring_types)
+        # The cached index may predate the threshold change that queued this run
+        # when it was written by another process: compile it from the database.
+        invalidate_threshold_index()
+        evaluator = ThresholdEvaluator(self.db)
+        notifier = NotificationEngine(self.db)
+        cursor = shard.last_event_id
+        scanned = changed = 0
+        try:
+            while True:
+                query = (
+                    select(
+                        MonitoringEvent.id,
+                        MonitoringEvent.abnormal_flag,
+                        *(getattr(MonitoringEvent, name) for name in _EVENT_COLUMNS),
+                        Patient.sex,
+                        Patient.age_band,
+                    )
+                    .join(Patient, Patient.id == MonitoringEvent.patient_id)
+                    .where(MonitoringEvent.test_type.in_(types), window.clause(MonitoringEvent.id))
+                )
+                if cursor is not None:
+                    query = query.where(MonitoringEvent.id > uuid.UUID(cursor))
+                rows = self.db.execute(query.order_by(MonitoringEvent.id).limit(self.batch_size)).all()
+                if not rows:
+                    break
+
+                frame = pd.DataFrame(
+                    {name: pd.Series([getattr(row, name) for row in rows], dtype=object) for name in BULK_COLUMNS}
+                )
+                evaluations = evaluator.evaluate_events_bulk(frame)
+                changed_rows = [
+                    (row.id, evaluation)
+                    for row, evaluation in zip(rows, evaluations)
+                    if evaluation.flag != row.abnormal_flag
+                ]
+                changes = [_changed_values(event_id, evaluation) for event_id, evaluation in changed_rows]
+                if changes:
+                    self.db.execute(update(MonitoringEvent), changes)
+                    self._notify_abnormal(notifier, changed_rows)
+
+                cursor = str(rows[-1].id)
+                now = datetime.now(timezone.utc)
+                progressed = self.db.execute(
+                    update(ReevaluationShard)
+                    .where(ReevaluationShard.id == shard.id, ReevaluationShard.holder == self.node_id)
+                    .values(
+                        last_event_id=cursor,
+                        scanned=ReevaluationShard.scanned + len(rows),
+                        changed=ReevaluationShard.changed + len(changes),
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not progressed:
+                    self.db.rollback()
+                    logger.warning("Lost lease on re-evaluation shard %s/%s", run.id, shard.shard_index)
+                    return scanned, changed
+                self.db.commit()
+                scanned += len(rows)
+                changed += len(changes)
+                if len(rows) < self.batch_size:
+                    break
+        except Exception as exc:
+            self.db.rollback()
+            logger.exception("Re-evaluation shard %s/%s failed", run.id, shard.shard_index)
+            self._finish_shard(shard, "FAILED", error=str(exc)[:2000])
+            return scanned, changed
+
+        self._finish_shard(shard, "DONE")
+        logger.info(
+            "Re-evaluated shard %s/%s: %s scanned, %s changed",
+            run.id,
+            shard.shard_index,
+            scanned,
+            changed,
+        )
+        return scanned, changed
+
+    def _notify_abnormal(
+        self, notifier: NotificationEngine, changed_rows: list[tuple[object, AbnormalEvaluation]]
+    ) -> None:
+        """Notify events that became abnormal; dedupe keys make a resumed chunk safe."""
+        abnormal = {event_id: evaluation for event_id, evaluation in changed_rows if evaluation.flag in _ABNORMAL}
+        if not abnormal or not notifier.settings.IN_APP_NOTIFICATIONS_ENABLED:
+            return
+        events = self.db.query(MonitoringEvent).filter(MonitoringEvent.id.in_(list(abnormal))).all()
+        patient_ids = list({event.patient_id for event in events})
+        patients = {
+            patient.id: patient for patient in self.db.query(Patient).filter(Patient.id.in_(patient_ids))
+        }
+        notifier.prefetch_recipients(patient_ids)
+        for event in events:
+            evaluation = abnormal[event.id]
+            priority = (
+                NotificationPriority.CRITICAL
+                if evaluation.flag == AbnormalFlag.OUTSIDE_CRITICAL
+                else NotificationPriority.WARNING
+            )
+            notifier.notify_abnormal_event(
+                event, patients[event.patient_id], priority=priority, reason=evaluation.reason
+            )
+
+    def _finish_shard(self, shard: ReevaluationShard, status: str, error: str | None = None) -> None:
+        now = datetime.now(timezone.utc)
+        self.db.execute(
+            update(ReevaluationShard)
+            .where(ReevaluationShard.id == shard.id, ReevaluationShard.holder == self.node_id)
+            .values(status=status, error=error, lease_expires_at=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        open_shards = self.db.execute(
+            select(ReevaluationShard.status).where(
+                ReevaluationShard.run_id == shard.run_id,
+                ReevaluationShard.status.in_(["PENDING", "RUNNING"]),
+            )
+        ).first()
+        if open_shards is None:
+            failed = self.db.execute(
+                select(func.count())
+                .select_from(ReevaluationShard)
+                .where(ReevaluationShard.run_id == shard.run_id, ReevaluationShard.status == "FAILED")
+            ).scalar_one()
+            self.db.execute(
+                update(ReevaluationRun)
+                .where(ReevaluationRun.id == shard.run_id)
+                .values(status="FAILED" if failed else "DONE", finished_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+
+    def _count_events(self, monitoring_types: list[str]) -> int:
+        return self.db.execute(
+            select(func.count())
+            .select_from(MonitoringEvent)
+            .where(MonitoringEvent.test_type.in_(monitoring_types))
+        ).scalar_one()
+
+
+def _changed_values(event_id, evaluation: AbnormalEvaluation) -> dict:
+    """Row for a bulk UPDATE by primary key; a changed flag always needs a fresh review."""
+    abnormal = evaluation.flag in _ABNORMAL
+    return {
+        "id": event_id,
+        "abnormal_flag": evaluation.flag,
+        "abnormal_reason_code": evaluation.reason,
+        "reviewed_status": ReviewStatus.PENDING_REVIEW if abnormal else None,
+        "reviewed_by": None,
+        "reviewed_at": None,
+    }
+
+
+def run_progress(run: ReevaluationRun, shards: list[ReevaluationShard]) -> dict:
+    scanned = sum(shard.scanned or 0 for shard in shards)
+    total = run.total_events or 0
+    return {
+        "id": str(run.id),
+        "status": run.status,
+        "monitoring_types": run.monitoring_types,
+        "requested_by": run.requested_by,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "total_events": total,
+        "scanned": scanned,
+        "changed": sum(shard.changed or 0 for shard in shards),
+        "progress": round(min(scanned / total, 1.0), 4) if total else (1.0 if run.status == "DONE" else 0.0),
+        "shards": [
+            {
+                "index": shard.shard_index,
+                "status": shard.status,
+                "holder": shard.holder,
+                "scanned": shard.scanned,
+                "changed": shard.changed,
+                "error": shard.error,
+            }
+            for shard in sorted(shards, key=lambda shard: shard.shard_index)
+        ],
+    }
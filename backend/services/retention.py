@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.audit import AuditEvent, NotificationLog
+from ..models.integration import ExportTombstone
+from ..models.monitoring import MonitoringEvent, MonitoringTask, ResolvedTaskSlot, TaskStatus
+from ..models.notifications import InAppNotification, NotificationDigestItem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionTarget:
+    name: str
+    model: type
+    expired: Callable[[datetime], Any]
+    # Overrides the engine's ``retention_days`` for this target.
+    retention_days: int | None = None
+
+
+class RetentionEngine:
+    """Enforces ``RETENTION_DAYS`` by purging expired rows in bounded batches.
+
+    Each target is walked by primary key (keyset pagination) so every delete
+    holds locks on at most ``RETENTION_BATCH_SIZE`` rows. Rows that reference a
+    batch through a foreign key are removed first, and targets run in
+    dependency order: notifications before the tasks and events they point to.
+
+    Only DONE tasks are purged, and each leaves a ``ResolvedTaskSlot`` that the
+    task generator checks, so the next import does not recreate the slot as
+    overdue. Waived tasks are kept. Notifications and digests about a task
+    that is not DONE are kept too: their dedupe keys stop a long-overdue task
+    from being notified again. Monitoring events are long-term clinical
+    history and are purged only when ``RETENTION_EVENT_DAYS`` is set; purged
+    events leave export tombstones so incremental export consumers can delete
+    them too, and those tombstones expire like everything else.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        retention_days: int | None = None,
+        batch_size: int | None = None,
+        sleep_seconds: float | None = None,
+        archive_path: str | None = None,
+        event_retention_days: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.db = db
+        self.retention_days = retention_days if retention_days is not None else settings.RETENTION_DAYS
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.sleep_seconds = (
+            sleep_seconds if sleep_seconds is not None else settings.RETENTION_BATCH_SLEEP_SECONDS
+        )
+        self.archive_path = archive_path if archive_path is not None else settings.RETENTION_ARCHIVE_PATH
+        self.event_retention_days = (
+            event_retention_days if event_retention_days is not None else settings.RETENTION_EVENT_DAYS
+        )
+        self.targets = [
+            RetentionTarget(
+                "audit_events",
+                AuditEvent,
+                lambda cutoff: AuditEvent.timestamp < cutoff,
+            ),
+            RetentionTarget(
+                "in_app_notifications",
+                InAppNotification,
+                lambda cutoff: (InAppNotification.created_at < cutoff) & ~_notifies_open_task(),
+            ),
+            RetentionTarget(
+                "monitoring_tasks",
+                MonitoringTask,
+                lambda cutoff: (MonitoringTask.updated_at < cutoff) & (MonitoringTask.status == TaskStatus.DONE),
+            ),
+        ]
+        if self.event_retention_days:
+            self.targets.append(
+                RetentionTarget(
+                    "monitoring_events",
+                    MonitoringEvent,
+                    lambda cutoff: MonitoringEvent.performed_date < cutoff.date(),
+                    retention_days=self.event_retention_days,
+                )
+            )
+        self.targets.append(
+            RetentionTarget(
+                "export_tombstones",
+                ExportTombstone,
+                lambda cutoff: ExportTombstone.deleted_at < cutoff,
+            )
+        )
+
+    def cutoff(self, target: RetentionTarget | None = None) -> datetime:
+        days = self.retention_days
+        if target is not None and target.retention_days is not None:
+            days = target.retention_days
+        return datetime.now(timezone.utc) - timedelta(days=days)
+
+    def report(self) -> dict[str, int]:
+        """Dry run: count the rows each target would purge."""
+        return {
+            target.name: self.db.execute(
+                select(func.count()).select_from(target.model).where(target.expired(self.cutoff(target)))
+            ).scalar_one()
+            for target in self.targets
+        }
+
+    def purge(self) -> dict[str, int]:
+        purged: dict[str, int] = {}
+        for target in self.targets:
+            started = time.perf_counter()
+            purged[target.name] = self._purge_target(target, self.cutoff(target))
+            logger.info(
+                "Retention purged %s rows from %s in %.3fs",
+                purged[target.name],
+                target.name,
+                time.perf_counter() - started,
+            )
+        return purged
+
+    def _purge_target(self, target: RetentionTarget, cutoff: datetime) -> int:
+        pk = target.model.id
+        last_id = None
+        total = 0
+        while True:
+            query = select(pk).where(target.expired(cutoff))
+            if last_id is not None:
+                query = query.where(pk > last_id)
+            ids = list(self.db.execute(query.order_by(pk).limit(self.batch_size)).scalars())
+            if not ids:
+                return total
+            last_id = ids[-1]
+            self._delete_dependents(target.name, ids)
+            if self.archive_path:
+                self._archive(target, ids)
+            if target.name == "monitoring_events":
+                self._record_tombstones(ids)
+            elif target.name == "monitoring_tasks":
+                self._record_resolved_slots(ids)
+            self.db.execute(
+                delete(target.model).where(pk.in_(ids)).execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            total += len(ids)
+            if len(ids) < self.batch_size:
+                return total
+            if self.sleep_seconds:
+                time.sleep(self.sleep_seconds)
+
+    def _delete_dependents(self, name: str, ids: list) -> None:
+        if name == "in_app_notifications":
+            self._delete_where(NotificationDigestItem, NotificationDigestItem.digest_id.in_(ids))
+        elif name == "monitoring_tasks":
+            self._delete_where(NotificationDigestItem, NotificationDigestItem.task_id.in_(ids))
+            self._delete_notifications(InAppNotification.task_id.in_(ids))
+            self._delete_where(NotificationLog, NotificationLog.task_id.in_(ids))
+        elif name == "monitoring_events":
+            self._delete_notifications(InAppNotification.event_id.in_(ids))
+
+    def _record_tombstones(self, ids: list) -> None:
+        deleted_at = datetime.now(timezone.utc)
+        rows = self.db.execute(
+            select(MonitoringEvent.id, MonitoringEvent.patient_id).where(MonitoringEvent.id.in_(ids))
+        ).all()
+        self.db.execute(
+            insert(ExportTombstone),
+            [
+                {"entity": "event", "entity_id": row.id, "patient_id": row.patient_id, "deleted_at": deleted_at}
+                for row in rows
+            ],
+        )
+
+    def _record_resolved_slots(self, ids: list) -> None:
+        rows = self.db.execute(
+            select(
+                MonitoringTask.patient_id,
+                MonitoringTask.medication_order_id,
+                MonitoringTask.test_type,
+                MonitoringTask.due_date,
+                MonitoringTask.status,
+                MonitoringTask.completed_at,
+                MonitoringTask.updated_at,
+            ).where(MonitoringTask.id.in_(ids))
+        ).all()
+        self.db.execute(
+            insert(ResolvedTaskSlot),
+            [
+                {
+                    "patient_id": row.patient_id,
+                    "medication_order_id": row.medication_order_id,
+                    "test_type": row.test_type,
+                    "due_date": row.due_date,
+                    "status": row.status,
+                    "resolved_at": row.completed_at or row.updated_at,
+                }
+                for row in rows
+            ],
+        )
+
+    def _delete_notifications(self, clause) -> None:
+        notification_ids = select(InAppNotification.id).where(clause)
+        self._delete_where(
+            NotificationDigestItem, NotificationDigestItem.digest_id.in_(notification_ids)
+        )
+        self._delete_where(InAppNotification, clause)
+
+    def _delete_where(self, model: type, clause) -> None:
+        self.db.execute(delete(model).where(clause).execution_options(synchronize_session=False))
+
+    def _archive(self, target: RetentionTarget, ids: list) -> None:
+        table = target.model.__table__
+        rows = self.db.execute(select(table).where(table.c.id.in_(ids))).mappings()
+        path = Path(self.archive_path) / f"{target.name}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(row), default=_json_default) + "\n")
+
+
+def _notifies_open_task():
+    """Notification, or digest with an item, about a task that is not DONE."""
+    open_task = MonitoringTask.status != TaskStatus.DONE
+    return exists().where(MonitoringTask.id == InAppNotification.task_id, open_task) | exists().where(
+        NotificationDigestItem.digest_id == InAppNotification.id,
+        MonitoringTask.id == NotificationDigestItem.task_id,
+        open_task,
+    )
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return str(value)
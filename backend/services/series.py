@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.measurements import normalize_unit
+from ..models.monitoring import MonitoringEvent
+from ..models.patient import Patient
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the mean of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[bucket + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+class SeriesService:
+    """Numeric time series built from the stored ``numeric_value`` column.
+
+    Values in different units are never mixed: each call reads one
+    ``unit_normalized`` (by default the most frequent one in scope) and lists
+    the others under ``units`` so the caller can ask for them.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def patient_series(
+        self,
+        patient_id,
+        test_type: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        max_points: int | None = None,
+        unit: str | None = None,
+    ) -> dict:
+        scope = (
+            MonitoringEvent.patient_id == patient_id,
+            MonitoringEvent.test_type == test_type,
+            MonitoringEvent.numeric_value.is_not(None),
+        )
+        units, unit = self._units(scope, date_from, date_to, unit)
+        query = select(
+            MonitoringEvent.performed_date,
+            MonitoringEvent.numeric_value,
+            MonitoringEvent.abnormal_flag,
+            MonitoringEvent.unit_normalized,
+        ).where(*scope, _unit_is(unit))
+        query = _date_window(query, date_from, date_to)
+        rows = self.db.execute(
+            query.order_by(MonitoringEvent.performed_date.asc(), MonitoringEvent.id.asc())
+        ).all()
+
+        dates = np.array([row.performed_date.toordinal() for row in rows], dtype=float)
+        values = np.array([row.numeric_value for row in rows], dtype=float)
+        keep = lttb_indices(dates, values, max_points) if max_points else np.arange(len(rows))
+        return {
+            "patient_id": str(patient_id),
+            "test_type": test_type,
+            "unit": unit,
+            "units": units,
+            "count": len(rows),
+            "downsampled": len(keep) < len(rows),
+            "dates": [rows[i].performed_date.isoformat() for i in keep],
+            "values": values[keep].tolist(),
+            "flags": [rows[i].abnormal_flag.value if rows[i].abnormal_flag else None for i in keep],
+        }
+
+    def population_percentiles(
+        self,
+        test_type: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+        unit: str | None = None,
+    ) -> dict:
+        """Percentile bands of each patient's latest value in ``unit``, by age band and sex."""
+        scope = (MonitoringEvent.test_type == test_type, MonitoringEvent.numeric_value.is_not(None))
+        units, unit = self._units(scope, date_from, date_to, unit)
+        query = (
+            select(
+                MonitoringEvent.patient_id,
+                MonitoringEvent.performed_date,
+                MonitoringEvent.numeric_value,
+                Patient.age_band,
+                Patient.sex,
+            )
+            .join(Patient, Patient.id == MonitoringEvent.patient_id)
+            .where(*scope, _unit_is(unit))
+        )
+        query = _date_window(query, date_from, date_to)
+        frame = pd.DataFrame(
+            self.db.execute(query).all(),
+            columns=["patient_id", "performed_date", "value", "age_band", "sex"],
+        )
+        columns: dict[str, list] = {"age_band": [], "sex": [], "patients": []}
+        columns.update({f"p{p}": [] for p in percentiles})
+        if not frame.empty:
+            latest = frame.sort_values("performed_date").drop_duplicates("patient_id", keep="last")
+            latest = latest.fillna({"age_band": "UNKNOWN", "sex": "UNKNOWN"})
+            grouped = latest.groupby(["age_band", "sex"])["value"]
+            bands = grouped.quantile([p / 100 for p in percentiles]).unstack()
+            counts = grouped.size()
+            for (age_band, sex), row in bands.iterrows():
+                columns["age_band"].append(age_band)
+                columns["sex"].append(sex)
+                columns["patients"].append(int(counts[(age_band, sex)]))
+                for p, value in zip(percentiles, row.to_numpy()):
+                    columns[f"p{p}"].append(round(float(value), 4))
+        return {"test_type": test_type, "unit": unit, "units": units, "percentiles": list(percentiles), **columns}
+
+    def _units(self, scope, date_from: date | None, date_to: date | None, unit: str | None):
+        """Units recorded in scope, and the one to read: ``unit`` if given, else the most frequent."""
+        query = _date_window(
+            select(MonitoringEvent.unit_normalized, func.count()).where(*scope), date_from, date_to
+        )
+        counts = self.db.execute(query.group_by(MonitoringEvent.unit_normalized)).all()
+        units = sorted(row[0] for row in counts if row[0])
+        if unit is not None:
+            return units, normalize_unit(unit)
+        if not counts:
+            return units, None
+        # Most events first; ties go to the alphabetically first unit, unitless last.
+        dominant = min(counts, key=lambda row: (-row[1], row[0] is None, row[0] or ""))
+        return units, dominant[0]
+
+
+def _unit_is(unit: str | None):
+    if unit is None:
+        return MonitoringEvent.unit_normalized.is_(None)
+    return MonitoringEvent.unit_normalized == unit
+
+
+def _date_window(query, date_from: date | None, date_to: date | None):
+    if date_from is not None:
+        query = query.where(MonitoringEvent.performed_date >= date_from)
+    if date_to is not None:
+        query = query.where(MonitoringEvent.performed_date <= date_to)
+    return query
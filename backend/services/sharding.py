@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+
+_ID_SPACE = 1 << 128
+
+
+@dataclass(frozen=True)
+class Shard:
+    """A contiguous slice ``index`` of ``count`` over the patient id space.
+
+    Patient ids are random UUIDv4 values, so the id itself is a uniform hash;
+    slicing its range keeps shards balanced and lets the predicate use the
+    patient_id indexes on both PostgreSQL and SQLite.
+    """
+
+    index: int
+    count: int
+
+    def __post_init__(self) -> None:
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError("Shard must satisfy 0 <= k < n")
+
+    @classmethod
+    def parse(cls, text: str) -> "Shard":
+        try:
+            index, count = (int(part) for part in text.split("/", 1))
+        except ValueError:
+            raise ValueError(f"Invalid shard {text!r} (expected k/n)")
+        return cls(index, count)
+
+    @property
+    def lower(self) -> uuid.UUID:
+        return uuid.UUID(int=self.index * _ID_SPACE // self.count)
+
+    @property
+    def upper(self) -> uuid.UUID | None:
+        if self.index == self.count - 1:
+            return None
+        return uuid.UUID(int=(self.index + 1) * _ID_SPACE // self.count)
+
+    def clause(self, column):
+        upper = self.upper
+        if upper is None:
+            return column >= self.lower
+        return (column >= self.lower) & (column < upper)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result or exception.
+    Counters record leaders, coalesced callers and timeouts for the admin
+    metrics endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._counts: Counter[str] = Counter()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float | None = None) -> tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True for coalesced callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts["leaders"] += 1
+            else:
+                call.waiters += 1
+                self._counts["coalesced"] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                self.count("timeouts")
+                raise TimeoutError("Timed out waiting for an in-flight fetch")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "waiting": sum(call.waiters for call in self._calls.values()),
+                **{name: self._counts[name] for name in ("leaders", "coalesced", "timeouts", "lock_waits", "lock_timeouts")},
+            }
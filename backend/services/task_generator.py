@@ -4,14 +4,16 @@ from datetime import date, datetime, timezone, timedelta
 from typing import Iterable
 from uuid import UUID
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
 from ..database import get_sessionmaker
-from ..models.monitoring import MonitoringTask, MonitoringEvent, TaskStatus
+from ..models.monitoring import MonitoringTask, MonitoringEvent, ResolvedTaskSlot, TaskStatus
 from ..services.audit_logger import create_audit_event
 from ..models.audit import AuditAction
 from ..services.scheduling import _matches_test_type
+from ..services.sharding import Shard
 
 
 class TaskGenerator:
@@ -30,6 +32,8 @@ class TaskGenerator:
         self,
         calculated_tasks: Iterable[MonitoringTask],
         actor: str = "SYSTEM",
+        *,
+        commit: bool = True,
     ) -> list[MonitoringTask]:
         db = self._get_db()
         created: list[MonitoringTask] = []
@@ -66,6 +70,14 @@ class TaskGenerator:
                             request=None,
                             commit=False,
                         )
+                elif self._slot_resolved(
+                    db,
+                    medication_order_id=calc_task.medication_order_id,
+                    test_type=calc_task.test_type,
+                    due_date=calc_task.due_date,
+                ):
+                    # Completed and purged by retention; do not bring it back as overdue.
+                    continue
                 else:
                     db.add(calc_task)
                     db.flush()
@@ -81,25 +93,40 @@ class TaskGenerator:
                         commit=False,
                     )
 
-            db.commit()
+            if commit:
+                db.commit()
             return created + updated
         finally:
             if self._external_db is None:
                 db.close()
 
     def update_task_statuses(self) -> int:
+        return len(self.mark_overdue())
+
+    def mark_overdue(self, shard: Shard | None = None) -> list[UUID]:
+        """Flip DUE tasks past their due date to OVERDUE; returns the changed ids."""
+        stmt = (
+            update(MonitoringTask)
+            .where(
+                MonitoringTask.status == TaskStatus.DUE,
+                MonitoringTask.due_date < date.today(),
+            )
+            .values(status=TaskStatus.OVERDUE)
+        )
+        return self._update_returning_ids(stmt, shard)
+
+    def _update_returning_ids(self, stmt, shard: Shard | None) -> list[UUID]:
+        if shard is not None:
+            stmt = stmt.where(shard.clause(MonitoringTask.patient_id))
         db = self._get_db()
         try:
-            updated = (
-                db.query(MonitoringTask)
-                .filter(
-                    MonitoringTask.status == TaskStatus.DUE,
-                    MonitoringTask.due_date < date.today(),
-                )
-                .update({"status": TaskStatus.OVERDUE}, synchronize_session=False)
+            result = db.execute(
+                stmt.returning(MonitoringTask.id),
+                execution_options={"synchronize_session": False},
             )
+            ids = [row[0] for row in result]
             db.commit()
-            return updated
+            return ids
         finally:
             if self._external_db is None:
                 db.close()
@@ -173,32 +200,27 @@ class TaskGenerator:
                 db.close()
 
     def reactivate_expired_waivers(self) -> int:
-        db = self._get_db()
-        try:
-            today = date.today()
-            tasks = (
-                db.query(MonitoringTask)
-                .filter(
-                    MonitoringTask.status == TaskStatus.WAIVED,
-                    MonitoringTask.waived_until != None,
-                    MonitoringTask.waived_until < today,
-                )
-                .all()
+        return len(self.reactivate_waivers())
+
+    def reactivate_waivers(self, shard: Shard | None = None) -> list[UUID]:
+        """Return expired WAIVED tasks to OVERDUE; returns the changed ids."""
+        stmt = (
+            update(MonitoringTask)
+            .where(
+                MonitoringTask.status == TaskStatus.WAIVED,
+                MonitoringTask.waived_until != None,
+                MonitoringTask.waived_until < date.today(),
             )
-            for task in tasks:
-                task.status = TaskStatus.OVERDUE
-                task.waived_reason = None
-                task.waived_until = None
-            db.commit()
-            return len(tasks)
-        finally:
-            if self._external_db is None:
-                db.close()
+            .values(status=TaskStatus.OVERDUE, waived_reason=None, waived_until=None)
+        )
+        return self._update_returning_ids(stmt, shard)
 
     def auto_complete_tasks_for_event(
         self,
         event: MonitoringEvent,
         actor: str = "SYSTEM",
+        *,
+        commit: bool = True,
     ) -> list[MonitoringTask]:
         db = self._get_db()
         completed: list[MonitoringTask] = []
@@ -233,7 +255,7 @@ class TaskGenerator:
                     request=None,
                     commit=False,
                 )
-            if completed:
+            if completed and commit:
                 db.commit()
             return completed
         finally:
@@ -261,3 +283,18 @@ class TaskGenerator:
             )
             .first()
         )
+
+    def _slot_resolved(self, db: Session, medication_order_id, test_type: str, due_date: date) -> bool:
+        window_start = due_date - timedelta(days=self.window_days)
+        window_end = due_date + timedelta(days=self.window_days)
+        return (
+            db.query(ResolvedTaskSlot.id)
+            .filter(
+                ResolvedTaskSlot.medication_order_id == medication_order_id,
+                ResolvedTaskSlot.test_type == test_type,
+                ResolvedTaskSlot.due_date >= window_start,
+                ResolvedTaskSlot.due_date <= window_end,
+            )
+            .first()
+            is not None
+        )
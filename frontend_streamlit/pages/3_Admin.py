@@ -48,6 +48,27 @@ if thresholds_resp.status_code == 200:
 else:
     st.warning("Unable to load thresholds")
 
+st.markdown("**Re-evaluation of stored events**")
+reevaluations_resp = get("/admin/reevaluations", token=token)
+if reevaluations_resp.status_code == 200:
+    runs = reevaluations_resp.json()
+    if not runs:
+        st.caption("No threshold re-evaluations queued")
+    for run in runs[:5]:
+        label = (
+            f"{run['status']} · {', '.join(run['monitoring_types'])} · "
+            f"{run['scanned']}/{run['total_events']} scanned, {run['changed']} changed"
+        )
+        st.progress(run["progress"], text=label)
+        if run["status"] == "FAILED" and st.button("Resume", key=f"resume_{run['id']}"):
+            resp = post(f"/admin/reevaluations/{run['id']}/resume", {}, token=token)
+            if resp.status_code == 200:
+                st.success("Re-evaluation resumed")
+            else:
+                st.error("Resume failed")
+else:
+    st.warning("Unable to load re-evaluation progress")
+
 st.markdown("**Import thresholds (CSV)**")
 upload_file = st.file_uploader("Upload thresholds CSV", type=["csv"])
 if upload_file is not None and st.button("Import Thresholds"):
@@ -31,3 +31,23 @@ def db_session(tmp_path, monkeypatch):
         yield db
     finally:
         db.close()
+
+
+@pytest.fixture
+def stub_epr(monkeypatch):
+    from backend.config import get_settings
+    from backend.services.epr_client import reset_http_session
+    from backend.services.epr_stub import StubConfig, StubEPRServer
+
+    stub = StubEPRServer(StubConfig(latency_ms=0, synthetic=False)).start()
+    stub.patients["9999999999"] = {"id": "epr-1", "pseudonym": "PT-EPR-1"}
+    monkeypatch.setenv("EPR_MODE", "FHIR_ISH")
+    monkeypatch.setenv("EPR_BASE_URL", stub.url)
+    get_settings.cache_clear()
+    reset_http_session()
+    try:
+        yield stub
+    finally:
+        reset_http_session()
+        stub.stop()
+        get_settings.cache_clear()
@@ -1,10 +1,13 @@
 from datetime import date
 from uuid import uuid4
 
+import pandas as pd
+from sqlalchemy import event as sa_event
+
 from backend.models.patient import Patient
 from backend.models.monitoring import MonitoringEvent, AbnormalFlag
 from backend.models.thresholds import ReferenceThreshold, ComparatorType
-from backend.services.abnormality import ThresholdEvaluator
+from backend.services.abnormality import ThresholdEvaluator, invalidate_threshold_index
 
 
 def _seed_patient(db):
@@ -99,3 +102,214 @@ def test_coded_abnormal_critical(db_session):
     evaluator = ThresholdEvaluator(db_session)
     evaluation = evaluator.evaluate_event(event, patient)
     assert evaluation.flag == AbnormalFlag.OUTSIDE_CRITICAL
+
+
+def test_threshold_index_evaluates_without_queries(db_session):
+    patient = _seed_patient(db_session)
+    db_session.add(
+        ReferenceThreshold(
+            monitoring_type="Prolactin",
+            unit="mIU/L",
+            comparator_type=ComparatorType.NUMERIC,
+            high_warning=500.0,
+        )
+    )
+    db_session.commit()
+    event = MonitoringEvent(
+        id=uuid4(),
+        patient_id=patient.id,
+        test_type="Prolactin",
+        performed_date=date.today(),
+        value="650 mIU/L",
+        source_system="CSV_UPLOAD",
+    )
+
+    evaluator = ThresholdEvaluator(db_session)
+    assert evaluator.evaluate_event(event, patient).flag == AbnormalFlag.OUTSIDE_WARNING
+
+    statements: list[str] = []
+    engine = db_session.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    sa_event.listen(engine, "before_cursor_execute", listener)
+    try:
+        for _ in range(5):
+            evaluator.evaluate_event(event, patient)
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []
+
+    db_session.add(
+        ReferenceThreshold(
+            monitoring_type="Prolactin",
+            unit="mIU/L",
+            comparator_type=ComparatorType.NUMERIC,
+            sex="F",
+            high_critical=600.0,
+        )
+    )
+    db_session.commit()
+    invalidate_threshold_index()
+    assert evaluator.evaluate_event(event, patient).flag == AbnormalFlag.OUTSIDE_CRITICAL
+
+
+def test_bulk_evaluation_matches_scalar(db_session):
+    db_session.add_all(
+        [
+            ReferenceThreshold(
+                monitoring_type="HbA1c",
+                unit="%",
+                comparator_type=ComparatorType.NUMERIC,
+                low_warning=4.0,
+                high_warning=6.0,
+                high_critical=7.0,
+            ),
+            ReferenceThreshold(
+                monitoring_type="HbA1c",
+                unit="%",
+                comparator_type=ComparatorType.NUMERIC,
+                sex="F",
+                high_critical=6.5,
+            ),
+            ReferenceThreshold(
+                monitoring_type="Lipids",
+                unit="mmol/L",
+                comparator_type=ComparatorType.NUMERIC,
+            ),
+            ReferenceThreshold(
+                monitoring_type="ECG",
+                unit="ms",
+                comparator_type=ComparatorType.CODED,
+                coded_abnormal_values=["abnormal"],
+            ),
+        ]
+    )
+    db_session.commit()
+
+    female = Patient(id=uuid4(), pseudonym="PT-ABN-2", sex="F", age_band="35-44")
+    male = Patient(id=uuid4(), pseudonym="PT-ABN-3", sex="M", age_band="45-54")
+    samples = [
+        ("HbA1c", "7.5", "%", None),
+        ("HbA1c", "6.8 %", None, None),
+        ("HbA1c", "3.2", "%", None),
+        ("HbA1c", "5.0", " % ", None),
+        ("HbA1c", "5.0", "mmol/mol", None),
+        ("HbA1c", "pending", "%", None),
+        ("HbA1c", None, None, "ABNORMAL"),
+        ("HbA1c", "", "%", None),
+        ("Lipids", "4.2", "mmol/L", None),
+        ("ECG", "", None, " Abnormal "),
+        ("ECG", "430", "ms", "NORMAL"),
+        ("CK", "200", "U/L", None),
+    ]
+    pairs = []
+    for patient in (female, male):
+        for test_type, value, unit, interpretation in samples:
+            event = MonitoringEvent(
+                patient_id=patient.id,
+                test_type=test_type,
+                performed_date=date.today(),
+                value=value,
+                unit=unit,
+                interpretation=interpretation,
+                source_system="CSV_UPLOAD",
+            )
+            pairs.append((event, patient))
+
+    evaluator = ThresholdEvaluator(db_session)
+    bulk = evaluator.evaluate_event_batch(pairs)
+    scalar = [evaluator.evaluate_event(event, patient) for event, patient in pairs]
+    assert bulk == scalar
+
+    # Frames without the stored columns fall back to parsing the raw value.
+    raw = pd.DataFrame(
+        {
+            "test_type": [event.test_type for event, _ in pairs],
+            "value": [event.value for event, _ in pairs],
+            "unit": [event.unit for event, _ in pairs],
+            "interpretation": [event.interpretation for event, _ in pairs],
+            "sex": [patient.sex for _, patient in pairs],
+            "age_band": [patient.age_band for _, patient in pairs],
+            "source_system": [event.source_system for event, _ in pairs],
+        },
+        dtype=object,
+    )
+    assert evaluator.evaluate_events_bulk(raw) == scalar
+
+
+def test_bulk_evaluation_matches_scalar_for_unitless_thresholds(db_session):
+    db_session.add(
+        ReferenceThreshold(
+            monitoring_type="QTc",
+            unit="",
+            comparator_type=ComparatorType.NUMERIC,
+            low_critical=300,
+            high_warning=450,
+        )
+    )
+    db_session.commit()
+    invalidate_threshold_index()
+
+    patient = _seed_patient(db_session)
+    pairs = [
+        (
+            MonitoringEvent(
+                patient_id=patient.id,
+                test_type="QTc",
+                performed_date=date.today(),
+                value=value,
+                unit=unit,
+                source_system="CSV_UPLOAD",
+            ),
+            patient,
+        )
+        for value, unit in [("420", None), ("250", ""), ("470", None), ("430", "ms"), ("430 ms", "")]
+    ]
+
+    evaluator = ThresholdEvaluator(db_session)
+    scalar = [evaluator.evaluate_event(event, patient) for event, patient in pairs]
+    assert [evaluation.flag for evaluation in scalar[:3]] == [
+        AbnormalFlag.NORMAL,
+        AbnormalFlag.OUTSIDE_CRITICAL,
+        AbnormalFlag.OUTSIDE_WARNING,
+    ]
+    assert evaluator.evaluate_event_batch(pairs) == scalar
+    raw = pd.DataFrame(
+        {
+            "test_type": [event.test_type for event, _ in pairs],
+            "value": [event.value for event, _ in pairs],
+            "unit": [event.unit for event, _ in pairs],
+            "interpretation": [None] * len(pairs),
+            "sex": [patient.sex] * len(pairs),
+            "age_band": [patient.age_band] * len(pairs),
+            "source_system": [event.source_system for event, _ in pairs],
+        },
+        dtype=object,
+    )
+    assert evaluator.evaluate_events_bulk(raw) == scalar
+
+
+def test_parsed_measurement_stored_on_event(db_session):
+    patient = _seed_patient(db_session)
+    event = MonitoringEvent(
+        patient_id=patient.id,
+        test_type="HbA1c",
+        performed_date=date.today(),
+        value="7.5 %",
+        source_system="CSV_UPLOAD",
+    )
+    assert (event.numeric_value, event.unit_normalized) == (7.5, "%")
+
+    event.unit = " mmol / mol"
+    assert event.unit_normalized == "mmol/mol"
+    event.value = "pending"
+    assert event.numeric_value is None
+
+    event.value = "58"
+    db_session.add(event)
+    db_session.commit()
+    matches = (
+        db_session.query(MonitoringEvent.id)
+        .filter(MonitoringEvent.test_type == "HbA1c", MonitoringEvent.numeric_value > 50)
+        .all()
+    )
+    assert [row.id for row in matches] == [event.id]
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from backend.config import get_settings
+from backend.services.circuit_breaker import CircuitBreaker, CircuitOpen
+from backend.services.epr_client import EPRClient, EPRUnavailable, get_circuit_breaker
+from backend.services.integration_service import IntegrationService
+
+
+def test_breaker_opens_on_failures_and_slow_calls_then_probes():
+    breaker = CircuitBreaker(window=4, min_calls=4, failure_rate=0.5, slow_seconds=1.0, open_seconds=0.2)
+    for success, elapsed in [(True, 0.1), (True, 0.1), (False, 0.1)]:
+        breaker.before_call()
+        breaker.record(success, elapsed)
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record(True, 2.0)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.before_call()
+    assert 0 < excinfo.value.retry_after <= 0.2
+
+    time.sleep(0.25)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["opened"] == 1
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_open_breaker_fails_fast_without_calling_the_epr(stub_epr, monkeypatch):
+    monkeypatch.setenv("EPR_BREAKER_MIN_CALLS", "2")
+    monkeypatch.setenv("EPR_BREAKER_SLOW_SECONDS", "0.05")
+    get_settings.cache_clear()
+    stub_epr.config.latency_ms = 100
+
+    client = EPRClient()
+    for _ in range(2):
+        assert list(client.fetch_observations("epr-1")) == []
+    assert get_circuit_breaker().state == "open"
+
+    requests_before = len(stub_epr.page_requests)
+    with pytest.raises(EPRUnavailable) as excinfo:
+        client.fetch_patient("9999999999")
+    assert excinfo.value.retry_after > 1
+    assert len(stub_epr.page_requests) == requests_before
+
+
+def test_fetch_deadline_bounds_slow_epr(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REQUEST_DEADLINE_SECONDS", "0.3")
+    monkeypatch.setenv("EPR_RETRY_TOTAL", "0")
+    get_settings.cache_clear()
+    stub_epr.config.latency_ms = 1000
+
+    started = time.monotonic()
+    with pytest.raises(EPRUnavailable, match="deadline"):
+        IntegrationService(db_session).fetch_and_import("9999999999", requested_by="test")
+    assert time.monotonic() - started < 0.9
+    assert get_circuit_breaker().stats()["failures"] >= 1
+
+
+def test_probe_that_raises_unexpectedly_releases_the_probe_slot(stub_epr, monkeypatch):
+    monkeypatch.setenv("EPR_BREAKER_OPEN_SECONDS", "0.1")
+    get_settings.cache_clear()
+    client = EPRClient()
+    breaker = get_circuit_breaker()
+    breaker._open()
+    time.sleep(0.15)
+
+    def _broken(*args, **kwargs):
+        raise KeyError("proxy config")
+
+    monkeypatch.setattr(client.session, "get", _broken)
+    with pytest.raises(KeyError):
+        client.fetch_patient("9999999999")
+    assert breaker.state == "open"
+
+    time.sleep(0.15)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_batch_fetches_each_get_the_request_deadline(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REQUEST_DEADLINE_SECONDS", "0.3")
+    monkeypatch.setenv("EPR_RETRY_TOTAL", "0")
+    get_settings.cache_clear()
+    stub_epr.patients["1111111111"] = {"id": "epr-2", "pseudonym": "PT-EPR-2"}
+    stub_epr.config.latency_ms = 1000
+
+    started = time.monotonic()
+    summaries = list(IntegrationService(db_session).fetch_batch(["9999999999", "1111111111"]))
+    assert time.monotonic() - started < 0.9
+    assert [summary["status"] for summary in summaries] == ["error", "error"]
+    assert all("deadline" in summary["error"] for summary in summaries)
@@ -0,0 +1,131 @@
+import io
+import os
+import time
+import zipfile
+from datetime import date, timedelta
+
+from backend.models.medication import MedicationOrder
+from backend.models.monitoring import MonitoringEvent, MonitoringTask
+from backend.models.patient import Patient
+from backend.models.thresholds import ComparatorType, ReferenceThreshold
+from backend.services.export_cache import ExportCache
+from backend.services.export_service import ExportService
+from backend.services.fingerprints import DatasetFingerprints, etag_matches, strong_etag
+from backend.services.retention import RetentionEngine
+
+from .test_export import _seed
+
+
+def test_etag_matching():
+    etag = strong_etag("a")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("*", None)
+
+
+def test_export_fingerprint_tracks_updates_and_purges(db_session):
+    _seed(db_session)
+    # Just-written data has not settled yet.
+    assert DatasetFingerprints(db_session).export(True, "csv") is None
+
+    fingerprints = DatasetFingerprints(db_session, lag_seconds=0)
+    first = fingerprints.export(True, "csv")
+    assert first == fingerprints.export(True, "csv")
+    assert first != fingerprints.export(False, "csv")
+    assert first != fingerprints.export(True, "parquet")
+
+    # SQLite stamps updated_at to the second.
+    time.sleep(1.1)
+    event = db_session.query(MonitoringEvent).first()
+    event.value = "99"
+    db_session.commit()
+    second = fingerprints.export(True, "csv")
+    assert second != first
+
+    db_session.add(
+        MonitoringEvent(
+            patient_id=event.patient_id,
+            test_type="HbA1c",
+            performed_date=date.today() - timedelta(days=4000),
+            value="50",
+            source_system="CSV_UPLOAD",
+        )
+    )
+    db_session.commit()
+    time.sleep(1.1)
+    third = fingerprints.export(True, "csv")
+    RetentionEngine(db_session, event_retention_days=3650, sleep_seconds=0).purge()
+    assert fingerprints.export(True, "csv") not in {first, second, third}
+
+
+def test_full_export_is_byte_identical_between_runs(db_session):
+    _seed(db_session)
+    first = ExportService(db_session).build_export_zip(tracked_only=False)
+    time.sleep(2.1)
+    assert ExportService(db_session).build_export_zip(tracked_only=False) == first
+    with zipfile.ZipFile(io.BytesIO(first)) as zf:
+        assert {info.date_time for info in zf.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+
+
+def test_timeline_and_threshold_fingerprints(db_session):
+    _seed(db_session)
+    patient = db_session.query(Patient).filter_by(pseudonym="PT-EXPORT-1").one()
+    other = db_session.query(Patient).filter_by(pseudonym="PT-EXPORT-2").one()
+    fingerprints = DatasetFingerprints(db_session, lag_seconds=0)
+    timeline = fingerprints.patient_timeline(patient.id)
+    other_timeline = fingerprints.patient_timeline(other.id)
+    assert timeline != other_timeline
+
+    order = db_session.query(MedicationOrder).filter_by(patient_id=patient.id).one()
+    db_session.add(
+        MonitoringTask(
+            patient_id=patient.id, medication_order_id=order.id, test_type="HbA1c", due_date=date(2025, 6, 1)
+        )
+    )
+    db_session.commit()
+    assert fingerprints.patient_timeline(patient.id) != timeline
+    assert fingerprints.patient_timeline(other.id) == other_timeline
+
+    threshold = ReferenceThreshold(
+        monitoring_type="HbA1c", unit="mmol/mol", comparator_type=ComparatorType.NUMERIC, high_warning=48
+    )
+    db_session.add(threshold)
+    db_session.commit()
+    with_threshold = fingerprints.thresholds("csv")
+    assert with_threshold != fingerprints.thresholds("json")
+    db_session.delete(threshold)
+    db_session.commit()
+    assert fingerprints.thresholds("csv") != with_threshold
+
+
+def test_export_cache_serves_hits_and_evicts_least_recently_used(tmp_path):
+    cache = ExportCache(tmp_path, max_bytes=25)
+    first, second, third = strong_etag(1), strong_etag(2), strong_etag(3)
+    assert cache.open(first) is None
+
+    assert b"".join(cache.store(first, [b"a" * 5, b"b" * 5])) == b"a" * 5 + b"b" * 5
+    assert b"".join(cache.read(cache.open(first))) == b"a" * 5 + b"b" * 5
+
+    # An abandoned stream leaves nothing behind.
+    partial = cache.store(second, iter([b"x" * 10, b"y" * 10]))
+    next(partial)
+    partial.close()
+    assert cache.open(second) is None
+    assert not list(tmp_path.glob("*.part"))
+
+    list(cache.store(second, [b"c" * 10]))
+    # Reading `first` makes `second` the least recently used.
+    past = time.time() - 60
+    os.utime(tmp_path / f"{second.strip(chr(34))}.zip", (past, past))
+    cache.open(first).close()
+    list(cache.store(third, [b"d" * 10]))
+
+    assert cache.open(second) is None
+    for etag in (first, third):
+        handle = cache.open(etag)
+        assert handle is not None
+        handle.close()
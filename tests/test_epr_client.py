@@ -0,0 +1,306 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from backend.config import get_settings
+from backend.models.audit import AuditEvent
+from backend.models.integration import TrackedPatient
+from backend.models.medication import DrugCategory, MedicationOrder
+from backend.models.monitoring import MonitoringEvent, MonitoringTask, TaskStatus
+from backend.models.patient import Patient
+from backend.services.epr_client import EPRClient, RequestBudget, connection_stats
+from backend.services.integration_service import IntegrationService
+
+
+def test_clients_share_one_keep_alive_connection(stub_epr):
+    for _ in range(3):
+        client = EPRClient()
+        assert client.fetch_patient("9999999999")["pseudonym"] == "PT-EPR-1"
+        assert list(client.fetch_medications("epr-1")) == []
+        assert list(client.fetch_observations("epr-1")) == []
+
+    assert stub_epr.connections == 1
+    (host_stats,) = connection_stats()["hosts"].values()
+    assert host_stats["connections_opened"] == 1
+    assert host_stats["requests"] == 9
+    assert host_stats["reused"] == 8
+
+
+def test_fetch_and_import_requests_resources_concurrently(stub_epr, db_session):
+    stub_epr.config.latency_ms = 200
+    result = IntegrationService(db_session).fetch_and_import("9999999999", requested_by="test")
+
+    assert result["pseudonym"] == "PT-EPR-1"
+    assert stub_epr.max_in_flight == 2
+
+
+def test_observations_follow_next_links_lazily(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_PAGE_SIZE", "2")
+    get_settings.cache_clear()
+    stub_epr.observations["epr-1"] = [
+        {"test_type": "HbA1c", "performed_date": f"2025-01-0{day}", "value": str(40 + day)}
+        for day in range(1, 6)
+    ]
+
+    observations = EPRClient().fetch_observations("epr-1")
+    assert next(observations)["performed_date"] == "2025-01-01"
+    assert len(stub_epr.page_requests) == 1
+    assert [item["performed_date"][-1] for item in observations] == ["2", "3", "4", "5"]
+    assert [request.get("_offset", "0") for request in stub_epr.page_requests] == ["0", "2", "4"]
+    assert {request["_count"] for request in stub_epr.page_requests} == {"2"}
+
+    result = IntegrationService(db_session).fetch_and_import("9999999999", requested_by="test")
+    assert result["events"]["inserted"] == 5
+    assert db_session.query(MonitoringEvent).count() == 5
+
+
+def test_repeat_fetch_only_requests_resources_updated_since_last_sync(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_SYNC_OVERLAP_SECONDS", "0")
+    monkeypatch.setenv("EPR_REFRESH_FRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    old = {"lastUpdated": "2025-01-02T00:00:00+00:00"}
+    stub_epr.observations["epr-1"] = [
+        {"test_type": "HbA1c", "performed_date": "2025-01-01", "value": "41", "meta": old},
+        {"test_type": "Lipids", "performed_date": "2025-01-01", "value": "5.0", "meta": old},
+    ]
+    service = IntegrationService(db_session)
+
+    first = service.fetch_and_import("9999999999")
+    assert first["incremental"] is False
+    assert first["events"]["inserted"] == 2
+    tracked = db_session.query(TrackedPatient).one()
+    assert tracked.observations_synced_at is not None
+
+    stub_epr.page_requests.clear()
+    repeat = service.fetch_and_import("9999999999")
+    assert repeat["incremental"] is True
+    assert all("_lastUpdated" in request for request in stub_epr.page_requests)
+    assert repeat["events"] == {
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "skipped": 0,
+        "errors": [],
+        "abnormal_summary": {"NORMAL": 0, "OUTSIDE_WARNING": 0, "OUTSIDE_CRITICAL": 0, "UNKNOWN": 0},
+    }
+
+    fresh = {"lastUpdated": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()}
+    stub_epr.observations["epr-1"].append(
+        {"test_type": "HbA1c", "performed_date": "2025-02-01", "value": "44", "meta": fresh}
+    )
+    assert service.fetch_and_import("9999999999")["events"]["inserted"] == 1
+
+    full = service.fetch_and_import("9999999999", full_refresh=True)
+    assert full["incremental"] is False
+    assert full["events"]["unchanged"] == 3
+    assert full["events"]["updated"] == 0
+    assert db_session.query(MonitoringEvent).count() == 3
+
+
+def test_redelivered_numeric_quantity_is_unchanged(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REFRESH_FRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    stub_epr.observations["epr-1"] = [
+        {"test_type": "HbA1c", "performed_date": "2025-01-01", "valueQuantity": {"value": 7.5, "unit": "%"}}
+    ]
+    service = IntegrationService(db_session)
+
+    assert service.fetch_and_import("9999999999")["events"]["inserted"] == 1
+    event = db_session.query(MonitoringEvent).one()
+    assert (event.value, event.unit) == ("7.5", "%")
+    stamped = event.updated_at
+
+    again = service.fetch_and_import("9999999999", full_refresh=True)["events"]
+    assert (again["unchanged"], again["updated"]) == (1, 0)
+    db_session.refresh(event)
+    assert event.updated_at == stamped
+
+
+def test_next_link_to_another_host_is_rejected(stub_epr):
+    client = EPRClient()
+    data = {"link": [{"relation": "next", "url": "https://elsewhere.example/Observation?page=2"}]}
+    with pytest.raises(ValueError):
+        client._next_link(data)
+    assert client._next_link({"link": [{"relation": "self", "url": "/Observation"}]}) is None
+
+
+def test_fetch_batch_reports_partial_failures_in_order(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_BATCH_GROUP_SIZE", "2")
+    get_settings.cache_clear()
+    stub_epr.patients.update(
+        {
+            "1111111111": {"id": "epr-2", "pseudonym": "PT-EPR-2", "sex": "F"},
+            # Identifier-like demographics are rejected by the Patient model.
+            "2222222222": {"id": "epr-3", "pseudonym": "PT-EPR-3", "age_band": "9434765919"},
+        }
+    )
+    stub_epr.observations["epr-2"] = [
+        {"test_type": "HbA1c", "performed_date": "2025-01-10", "value": "48", "unit": "mmol/mol"}
+    ]
+
+    summaries = list(
+        IntegrationService(db_session).fetch_batch(
+            ["9999999999", "0000000000", "1111111111", "2222222222"], audit_actor="test"
+        )
+    )
+
+    assert [summary["index"] for summary in summaries] == [0, 1, 2, 3]
+    assert [summary["status"] for summary in summaries] == ["ok", "error", "ok", "error"]
+    assert summaries[1]["error"] == "Patient not found in EPR"
+    assert summaries[2]["events"]["inserted"] == 1
+
+    db_session.expire_all()
+    assert {patient.pseudonym for patient in db_session.query(Patient)} == {"PT-EPR-1", "PT-EPR-2"}
+    assert db_session.query(MonitoringEvent).one().numeric_value == 48.0
+    assert db_session.query(AuditEvent).filter_by(entity_type="EPRFetch").count() == 2
+
+
+def test_on_demand_fetch_is_served_from_a_recent_sync(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REFRESH_FRESH_SECONDS", "900")
+    get_settings.cache_clear()
+    service = IntegrationService(db_session)
+    assert service.fetch_and_import("9999999999")["cached"] is False
+    stub_epr.page_requests.clear()
+
+    cached = service.fetch_and_import("9999999999", requested_by="clinic")
+    assert cached["cached"] is True
+    assert stub_epr.page_requests == []
+    assert cached["incremental"] is True
+    assert cached["medications"]["inserted"] == cached["events"]["inserted"] == 0
+    tracked = db_session.query(TrackedPatient).one()
+    assert (tracked.request_count, tracked.requested_by, tracked.epr_patient_ref) == (2, "clinic", "epr-1")
+
+
+def test_refresh_prioritises_overdue_then_stalest(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REFRESH_STALE_SECONDS", "60")
+    monkeypatch.setenv("EPR_SYNC_OVERLAP_SECONDS", "0")
+    get_settings.cache_clear()
+    stub_epr.patients["1111111111"] = {"id": "epr-2", "pseudonym": "PT-EPR-2"}
+    service = IntegrationService(db_session)
+    list(service.fetch_batch(["9999999999", "1111111111"]))
+
+    now = datetime.now(timezone.utc)
+    tracked = {row.epr_patient_ref: row for row in db_session.query(TrackedPatient)}
+    for ref, age in (("epr-1", timedelta(hours=3)), ("epr-2", timedelta(hours=2))):
+        tracked[ref].last_sync_attempt_at = now - age
+        tracked[ref].observations_synced_at = now - age
+        tracked[ref].medications_synced_at = now - age
+    medication = MedicationOrder(
+        patient_id=tracked["epr-2"].patient_id,
+        drug_name="Clozapine",
+        drug_category=DrugCategory.SPECIAL_GROUP,
+        start_date=date(2025, 1, 1),
+    )
+    db_session.add(medication)
+    db_session.flush()
+    db_session.add(
+        MonitoringTask(
+            patient_id=medication.patient_id,
+            medication_order_id=medication.id,
+            test_type="FBC",
+            due_date=date(2025, 1, 8),
+            status=TaskStatus.OVERDUE,
+        )
+    )
+    db_session.commit()
+    stub_epr.observations["epr-1"] = [
+        {
+            "test_type": "HbA1c",
+            "performed_date": "2025-03-01",
+            "value": "45",
+            "meta": {"lastUpdated": now.isoformat()},
+        }
+    ]
+
+    assert [target.patient_ref for target in service.due_for_refresh()] == ["epr-2", "epr-1"]
+    monkeypatch.setenv("EPR_REFRESH_MAX_SECONDS", "0")
+    get_settings.cache_clear()
+    assert IntegrationService(db_session).refresh_due() == {"due": 2, "refreshed": 0, "failed": 0, "deferred": 2}
+    assert service.refresh_due(limit=1) == {"due": 1, "refreshed": 1, "failed": 0, "deferred": 0}
+    assert [target.patient_ref for target in service.due_for_refresh()] == ["epr-1"]
+    assert service.refresh_due()["refreshed"] == 1
+    assert service.due_for_refresh() == []
+
+    db_session.expire_all()
+    assert db_session.query(MonitoringEvent).one().value == "45"
+    assert {row.last_sync_status for row in db_session.query(TrackedPatient)} == {"OK"}
+
+
+def test_request_budget_caps_requests_per_minute():
+    budget = RequestBudget(per_minute=2)
+    assert budget.acquire(timeout=0) and budget.acquire(timeout=0)
+    assert budget.acquire(timeout=0) is False
+
+
+def test_skipped_observations_are_fetched_again(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_SYNC_OVERLAP_SECONDS", "0")
+    get_settings.cache_clear()
+    stamp = datetime.now(timezone.utc).isoformat()
+    broken = {"test_type": "HbA1c", "value": "45", "meta": {"lastUpdated": stamp}}
+    stub_epr.observations["epr-1"] = [
+        {"test_type": "Lipids", "performed_date": "2025-03-01", "value": "4.2", "meta": {"lastUpdated": stamp}},
+        broken,
+    ]
+    service = IntegrationService(db_session)
+
+    first = service.fetch_and_import("9999999999")
+    assert (first["events"]["inserted"], first["events"]["skipped"]) == (1, 1)
+    tracked = db_session.query(TrackedPatient).one()
+    assert tracked.observations_synced_at is None
+    assert tracked.medications_synced_at is not None
+    assert tracked.last_sync_status == "PARTIAL"
+
+    # Corrected at source without a new lastUpdated: only a kept watermark sees it.
+    broken["performed_date"] = "2025-03-02"
+    second = service.fetch_and_import("9999999999")
+    assert second["events"]["inserted"] == 1
+    db_session.expire_all()
+    tracked = db_session.query(TrackedPatient).one()
+    assert tracked.observations_synced_at is not None
+    assert tracked.last_sync_status == "OK"
+    assert db_session.query(MonitoringEvent).count() == 2
+
+
+def test_batch_sends_notifications_only_for_committed_patients(stub_epr, db_session, monkeypatch):
+    import backend.services.integration_service as integration_service
+    import backend.services.notification_engine as notification_engine
+    from backend.database import get_sessionmaker
+    from backend.models.notifications import InAppNotification
+    from backend.models.thresholds import ComparatorType, ReferenceThreshold
+    from backend.services.abnormality import invalidate_threshold_index
+
+    db_session.add(
+        ReferenceThreshold(
+            monitoring_type="HbA1c", unit="%", comparator_type=ComparatorType.NUMERIC, high_critical=7.0
+        )
+    )
+    db_session.commit()
+    invalidate_threshold_index()
+    stub_epr.patients["1111111111"] = {"id": "epr-2", "pseudonym": "PT-EPR-2"}
+    for ref in ("epr-1", "epr-2"):
+        stub_epr.observations[ref] = [
+            {"test_type": "HbA1c", "performed_date": "2025-01-10", "value": "9.5", "unit": "%"}
+        ]
+
+    sent = []
+
+    def send(**kwargs):
+        with get_sessionmaker()() as other:
+            committed = other.query(InAppNotification).count()
+        sent.append((kwargs["metadata"]["pseudonym"], committed))
+
+    record_sync = integration_service._record_sync
+
+    def fail_second(tracked, started, patient_ref, *summaries):
+        if patient_ref == "epr-2":
+            raise RuntimeError("sync bookkeeping failed")
+        record_sync(tracked, started, patient_ref, *summaries)
+
+    monkeypatch.setattr(notification_engine, "send_notification", send)
+    monkeypatch.setattr(integration_service, "_record_sync", fail_second)
+    summaries = list(IntegrationService(db_session).fetch_batch(["9999999999", "1111111111"]))
+
+    assert [summary["status"] for summary in summaries] == ["ok", "error"]
+    assert sent == [("PT-EPR-1", 1)]
+    db_session.expire_all()
+    assert db_session.query(InAppNotification).count() == 1
@@ -0,0 +1,61 @@
+import requests
+
+from backend.config import get_settings
+from backend.jobs.benchmark_integration import run_benchmark, synthetic_nhs_numbers
+from backend.models.monitoring import MonitoringEvent
+from backend.services.epr_client import EPRClient, reset_http_session
+from backend.services.epr_stub import StubConfig, StubEPRServer, stop_stub_server
+from backend.services.integration_service import IntegrationService
+
+
+def test_stub_mode_serves_deterministic_paged_patients(db_session, monkeypatch):
+    monkeypatch.setenv("EPR_MODE", "STUB")
+    monkeypatch.setenv("EPR_BASE_URL", "")
+    monkeypatch.setenv("EPR_STUB_LATENCY_MS", "0")
+    monkeypatch.setenv("EPR_STUB_OBSERVATIONS", "7")
+    monkeypatch.setenv("EPR_PAGE_SIZE", "3")
+    get_settings.cache_clear()
+    reset_http_session()
+    try:
+        first = EPRClient().fetch_patient("9434765919")
+        assert first == EPRClient().fetch_patient("9434765919")
+        assert first["pseudonym"].startswith("PT-")
+        assert EPRClient().fetch_patient("9434765920")["id"] != first["id"]
+
+        result = IntegrationService(db_session).fetch_and_import("9434765919", requested_by="test")
+        assert result["pseudonym"] == first["pseudonym"]
+        assert result["events"]["inserted"] == 7
+        assert result["medications"]["inserted"] == 3
+        assert db_session.query(MonitoringEvent).count() == 7
+    finally:
+        stop_stub_server()
+        reset_http_session()
+        get_settings.cache_clear()
+
+
+def test_stub_error_rate_answers_503():
+    with StubEPRServer(StubConfig(latency_ms=0, error_rate=1.0)) as stub:
+        response = requests.get(f"{stub.url}/Patient", params={"identifier": "9434765919"}, timeout=5)
+        assert response.status_code == 503
+        assert stub.stats() == {"requests": 1, "errors": 1}
+
+
+def test_benchmark_reports_percentiles_and_statuses():
+    patients = synthetic_nhs_numbers(4)
+    assert len(set(patients)) == 4 and all(len(number) == 10 for number in patients)
+
+    seen = []
+
+    def send(nhs_number):
+        seen.append(nhs_number)
+        if nhs_number == patients[0]:
+            raise ConnectionError("dropped")
+        return 200
+
+    report = run_benchmark(send, patients, total=20, concurrency=4)
+    assert report["requests"] == 20
+    assert report["status"] == {"200": 15, "ConnectionError": 5}
+    assert sorted(seen) == sorted(patients * 5)
+    latency = report["latency_ms"]
+    assert 0 <= latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert report["throughput_rps"] > 0
@@ -0,0 +1,220 @@
+import csv
+import io
+import time
+import zipfile
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+
+from backend.config import get_settings
+from backend.models.integration import TrackedPatient
+from backend.models.medication import DrugCategory, MedicationOrder
+from backend.models.monitoring import MonitoringEvent
+from backend.models.patient import Patient
+from backend.services.export_service import ExportService, ExportWindow, parse_cursor
+from backend.services.retention import RetentionEngine
+
+
+def _seed(db):
+    tracked = Patient(id=uuid4(), pseudonym="PT-EXPORT-1", sex="F", age_band="35-44")
+    other = Patient(id=uuid4(), pseudonym="PT-EXPORT-2", sex="M", age_band="45-54")
+    db.add_all([tracked, other])
+    db.flush()
+    db.add(TrackedPatient(patient_id=tracked.id, patient_hash="hash-1"))
+    for patient in (tracked, other):
+        db.add(
+            MedicationOrder(
+                patient_id=patient.id,
+                drug_name="Clozapine",
+                drug_category=DrugCategory.SPECIAL_GROUP,
+                start_date=date(2025, 1, 1),
+                flags={"is_hdat": True},
+            )
+        )
+        for day in range(1, 6):
+            db.add(
+                MonitoringEvent(
+                    patient_id=patient.id,
+                    test_type="HbA1c",
+                    performed_date=date(2025, 2, day),
+                    value=str(40 + day),
+                    unit="mmol/mol",
+                    source_system="CSV_UPLOAD",
+                )
+            )
+    db.commit()
+
+
+def _read(archive: bytes, name: str) -> list[dict]:
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        return list(csv.DictReader(io.StringIO(zf.read(name).decode("utf-8"))))
+
+
+def test_export_streams_compressed_chunks(db_session, monkeypatch):
+    monkeypatch.setenv("EXPORT_CHUNK_ROWS", "2")
+    get_settings.cache_clear()
+    _seed(db_session)
+
+    chunks = list(ExportService(db_session).iter_export_zip(tracked_only=True))
+    archive = b"".join(chunks)
+    assert len(chunks) > 3
+    assert all(chunks)
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.namelist() == ["patients.csv", "medications.csv", "events.csv"]
+        assert {info.compress_type for info in zf.infolist()} == {zipfile.ZIP_DEFLATED}
+        assert zf.testzip() is None
+
+    assert [row["pseudonymous_number"] for row in _read(archive, "patients.csv")] == ["PT-EXPORT-1"]
+    (medication,) = _read(archive, "medications.csv")
+    assert medication["drug_name"] == "Clozapine"
+    assert medication["is_hdat"] == "True"
+    assert medication["stop_date"] == ""
+    events = _read(archive, "events.csv")
+    assert [row["value"] for row in events] == ["41", "42", "43", "44", "45"]
+    assert {row["pseudonymous_number"] for row in events} == {"PT-EXPORT-1"}
+
+
+def test_export_all_patients(db_session):
+    _seed(db_session)
+    archive = ExportService(db_session).build_export_zip(tracked_only=False)
+    assert len(_read(archive, "patients.csv")) == 2
+    assert len(_read(archive, "events.csv")) == 10
+
+
+def test_export_issues_three_queries_regardless_of_rows(db_session, monkeypatch):
+    monkeypatch.setenv("EXPORT_CHUNK_ROWS", "2")
+    get_settings.cache_clear()
+    _seed(db_session)
+    db_session.expire_all()
+
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        ExportService(db_session).build_export_zip(tracked_only=True)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 3
+    assert all("tracked_patients" in statement for statement in statements)
+
+
+def test_incremental_export_returns_changes_and_tombstones(db_session):
+    _seed(db_session)
+    first = ExportWindow.after(None)
+    archive = ExportService(db_session).build_export_zip(tracked_only=True, window=first)
+    events = _read(archive, "events.csv")
+    assert len(events) == 5
+    assert list(events[0])[0] == "id" and list(events[0])[-1] == "updated_at"
+    assert _read(archive, "deleted.csv") == []
+
+    # SQLite stamps updated_at to the second.
+    time.sleep(1.1)
+    tracked_id = db_session.query(TrackedPatient.patient_id).scalar()
+    changed = (
+        db_session.query(MonitoringEvent)
+        .filter_by(patient_id=tracked_id)
+        .order_by(MonitoringEvent.performed_date)
+        .first()
+    )
+    changed.value = "99"
+    expired = MonitoringEvent(
+        patient_id=tracked_id,
+        test_type="HbA1c",
+        performed_date=date.today() - timedelta(days=4000),
+        value="50",
+        source_system="CSV_UPLOAD",
+    )
+    db_session.add(expired)
+    db_session.commit()
+    expired_id = str(expired.id)
+    RetentionEngine(db_session, event_retention_days=3650, sleep_seconds=0).purge()
+
+    second = ExportWindow.after(first.cursor)
+    assert second.since == parse_cursor(first.cursor)
+    archive = ExportService(db_session).build_export_zip(tracked_only=True, window=second)
+    assert _read(archive, "patients.csv") == []
+    assert _read(archive, "medications.csv") == []
+    (event,) = _read(archive, "events.csv")
+    assert (event["id"], event["value"]) == (str(changed.id), "99")
+    (tombstone,) = _read(archive, "deleted.csv")
+    assert (tombstone["entity"], tombstone["id"]) == ("event", expired_id)
+
+    third = ExportWindow.after(second.cursor)
+    archive = ExportService(db_session).build_export_zip(tracked_only=True, window=third)
+    assert _read(archive, "events.csv") == [] and _read(archive, "deleted.csv") == []
+
+
+def test_incremental_export_sends_history_of_newly_tracked_patients(db_session):
+    _seed(db_session)
+    first = ExportWindow.after(None)
+    ExportService(db_session).build_export_zip(tracked_only=True, window=first)
+
+    time.sleep(1.1)
+    other = db_session.query(Patient).filter_by(pseudonym="PT-EXPORT-2").one()
+    db_session.add(TrackedPatient(patient_id=other.id, patient_hash="hash-2"))
+    db_session.commit()
+
+    archive = ExportService(db_session).build_export_zip(tracked_only=True, window=ExportWindow.after(first.cursor))
+    assert [row["pseudonymous_number"] for row in _read(archive, "patients.csv")] == ["PT-EXPORT-2"]
+    (medication,) = _read(archive, "medications.csv")
+    assert medication["pseudonymous_number"] == "PT-EXPORT-2"
+    events = _read(archive, "events.csv")
+    assert len(events) == 5 and {row["pseudonymous_number"] for row in events} == {"PT-EXPORT-2"}
+
+
+def test_parquet_export_is_typed_and_row_grouped(db_session, monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setenv("EXPORT_PARQUET_ROW_GROUP_ROWS", "2")
+    get_settings.cache_clear()
+    _seed(db_session)
+
+    archive = b"".join(ExportService(db_session).iter_parquet_zip(tracked_only=True))
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.namelist() == ["patients.parquet", "medications.parquet", "events.parquet"]
+        events_file = pq.ParquetFile(io.BytesIO(zf.read("events.parquet")))
+        medications = pq.read_table(io.BytesIO(zf.read("medications.parquet")))
+
+    assert events_file.metadata.num_rows == 5
+    assert events_file.metadata.num_row_groups == 3
+    test_type = events_file.schema_arrow.get_field_index("test_type")
+    encodings = events_file.metadata.row_group(0).column(test_type).encodings
+    assert any("DICTIONARY" in encoding for encoding in encodings)
+    events = events_file.read()
+    assert events.schema.field("performed_date").type == pa.date32()
+    assert events.column("performed_date").to_pylist()[0] == date(2025, 2, 1)
+    assert set(events.column("abnormal_flag").to_pylist()) == {"UNKNOWN"}
+
+    assert medications.schema.field("is_hdat").type == pa.bool_()
+    assert medications.to_pylist() == [
+        {
+            "pseudonymous_number": "PT-EXPORT-1",
+            "drug_name": "Clozapine",
+            "start_date": date(2025, 1, 1),
+            "stop_date": None,
+            "dose": None,
+            "route": None,
+            "frequency": None,
+            "is_hdat": True,
+        }
+    ]
+
+
+def test_incremental_parquet_export_types_change_times(db_session):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    _seed(db_session)
+
+    archive = b"".join(ExportService(db_session).iter_parquet_zip(window=ExportWindow.after(None)))
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert "deleted.parquet" in zf.namelist()
+        patients = pq.read_table(io.BytesIO(zf.read("patients.parquet")))
+        deleted = pq.read_table(io.BytesIO(zf.read("deleted.parquet")))
+    assert patients.column_names[0] == "id"
+    assert patients.schema.field("updated_at").type == pa.timestamp("us", tz="UTC")
+    assert deleted.num_rows == 0
@@ -0,0 +1,165 @@
+import gzip
+import json
+from datetime import date
+
+from backend.adapters.fhir_adapter import FHIRAdapter
+from backend.models.medication import MedicationOrder
+from backend.models.monitoring import AbnormalFlag, MonitoringEvent
+from backend.models.patient import Patient
+from backend.services.fhir_bulk_import import FHIRBulkImporter
+
+
+def _write_ndjson(path, resources, compress=False):
+    lines = "".join(
+        (item if isinstance(item, str) else json.dumps(item)) + "\n" for item in resources
+    ).encode("utf-8")
+    if compress:
+        path.write_bytes(gzip.compress(lines))
+    else:
+        path.write_bytes(lines)
+
+
+def _observation(patient_ref, day, value):
+    return {
+        "resourceType": "Observation",
+        "subject": {"reference": f"Patient/{patient_ref}"},
+        "code": {"coding": [{"system": "http://loinc.org", "code": "4548-4", "display": "HbA1c"}]},
+        "effectiveDateTime": f"2025-01-{day:02d}T09:30:00+00:00",
+        "valueQuantity": {"value": value, "unit": "mmol/mol"},
+    }
+
+
+def test_adapter_maps_resources_without_identifiers():
+    adapter = FHIRAdapter(pseudonym_system="https://trust.example/pseudonym", today=date(2026, 1, 1))
+    patient = adapter.from_patient(
+        {
+            "resourceType": "Patient",
+            "id": "abc",
+            "identifier": [
+                {"system": "https://fhir.nhs.uk/Id/nhs-number", "value": "9434765919"},
+                {"system": "https://trust.example/pseudonym", "value": "PT-FHIR01"},
+            ],
+            "gender": "female",
+            "birthDate": "1990-06-15",
+        }
+    )
+    assert patient == {"patient_ref": "abc", "pseudonym": "PT-FHIR01", "age_band": "35-44", "sex": "F"}
+
+    medication = adapter.from_medication_request(
+        {
+            "resourceType": "MedicationRequest",
+            "subject": {"reference": "https://fhir.example/Patient/abc"},
+            "medicationCodeableConcept": {"text": "Clozapine"},
+            "authoredOn": "2025-01-02",
+            "dosageInstruction": [
+                {"text": "100mg", "route": {"text": "oral"}, "timing": {"repeat": {"frequency": 2, "period": 1, "periodUnit": "d"}}}
+            ],
+        }
+    )
+    assert medication["patient_ref"] == "abc"
+    assert medication["start_date"] == date(2025, 1, 2)
+    assert (medication["dose"], medication["route"], medication["frequency"]) == ("100mg", "oral", "2/1d")
+
+
+def test_bulk_import_streams_files_in_batches(db_session, tmp_path):
+    patients = [
+        {"resourceType": "Patient", "id": f"PT-FHIR0{n}", "gender": "male", "birthDate": "1980-01-01"}
+        for n in range(1, 4)
+    ]
+    _write_ndjson(tmp_path / "Patient.ndjson", patients)
+    _write_ndjson(
+        tmp_path / "Observation.ndjson.gz",
+        [
+            _observation("PT-FHIR01", 1, 40),
+            _observation("PT-FHIR01", 2, 44),
+            "{not json",
+            _observation("PT-FHIR02", 1, 41),
+            _observation("missing", 1, 39),
+            {"resourceType": "Encounter", "id": "enc-1"},
+            _observation("PT-FHIR03", 3, 50),
+        ],
+        compress=True,
+    )
+    _write_ndjson(
+        tmp_path / "MedicationRequest.ndjson",
+        [
+            {
+                "resourceType": "MedicationRequest",
+                "subject": {"reference": "Patient/PT-FHIR01"},
+                "medicationCodeableConcept": {"text": "Olanzapine"},
+                "authoredOn": "2024-12-01",
+            }
+        ],
+    )
+
+    summary = FHIRBulkImporter(db_session, batch_size=2).import_paths([tmp_path])
+
+    assert summary["files"] == 3
+    assert summary["lines"] == 11
+    assert summary["unsupported"] == 1
+    assert summary["patients"]["inserted"] == 3
+    assert summary["medications"]["inserted"] == 1
+    assert summary["observations"]["inserted"] == 4
+    assert summary["observations"]["skipped"] == 1
+    assert summary["rows_per_second"] > 0
+    assert any("unreadable resource" in error for error in summary["errors"])
+    assert db_session.query(Patient).filter(Patient.pseudonym.like("PT-FHIR%")).count() == 3
+    assert db_session.query(MedicationOrder).one().source_system == "FHIR_BULK"
+    events = db_session.query(MonitoringEvent).all()
+    assert len(events) == 4
+    assert all(event.abnormal_flag is not None for event in events)
+    assert {event.numeric_value for event in events} == {40.0, 44.0, 41.0, 50.0}
+
+    again = FHIRBulkImporter(db_session, batch_size=2).import_paths([tmp_path / "Observation.ndjson.gz"])
+    assert again["observations"]["unchanged"] == 4
+    assert again["observations"]["abnormal_summary"] == {flag.value: 0 for flag in AbnormalFlag}
+
+
+def test_pseudonym_system_resolves_references_across_runs(db_session, tmp_path):
+    system = "https://trust.example/pseudonym"
+    (tmp_path / "first").mkdir()
+    (tmp_path / "second").mkdir()
+    _write_ndjson(
+        tmp_path / "first" / "Patient.ndjson",
+        [
+            {"resourceType": "Patient", "id": "abc", "identifier": [{"system": system, "value": "PT-FHIR-A"}]},
+            # Its pseudonym equals the other patient's logical id.
+            {"resourceType": "Patient", "id": "xyz", "identifier": [{"system": system, "value": "abc"}]},
+        ],
+    )
+    _write_ndjson(tmp_path / "second" / "Observation.ndjson", [_observation("abc", 1, 40)])
+
+    adapter = FHIRAdapter(pseudonym_system=system)
+    first = FHIRBulkImporter(db_session, adapter=adapter).import_paths([tmp_path / "first"])
+    assert first["patients"]["inserted"] == 2
+
+    second = FHIRBulkImporter(db_session, adapter=adapter).import_paths([tmp_path / "second"])
+    assert second["observations"]["inserted"] == 1
+    event = db_session.query(MonitoringEvent).one()
+    assert db_session.get(Patient, event.patient_id).pseudonym == "PT-FHIR-A"
+
+
+def test_failing_row_is_skipped_without_losing_its_batch(db_session, tmp_path):
+    _write_ndjson(tmp_path / "Patient.ndjson", [{"resourceType": "Patient", "id": "PT-FHIR09"}])
+    _write_ndjson(
+        tmp_path / "Observation.ndjson",
+        [_observation("PT-FHIR09", 1, 40), _observation("PT-FHIR09", 2, 666), _observation("PT-FHIR09", 3, 44)],
+    )
+    importer = FHIRBulkImporter(db_session)
+    auto_complete = importer.task_gen.auto_complete_tasks_for_event
+
+    def _fails_on_666(event, **kwargs):
+        if event.value == "666":
+            raise RuntimeError("boom")
+        return auto_complete(event, **kwargs)
+
+    importer.task_gen.auto_complete_tasks_for_event = _fails_on_666
+    summary = importer.import_paths([tmp_path])
+
+    assert summary["observations"]["inserted"] == 2
+    assert summary["observations"]["skipped"] == 1
+    assert sum(summary["observations"]["abnormal_summary"].values()) == 2
+    assert [error for error in summary["errors"] if "boom" in error] == [
+        "Observation.ndjson:2: observation row failed (boom)"
+    ]
+    assert sorted(event.value for event in db_session.query(MonitoringEvent)) == ["40", "44"]
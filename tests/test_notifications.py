@@ -3,9 +3,16 @@ from uuid import uuid4
 
 from backend.models.medication import MedicationOrder, DrugCategory
 from backend.models.monitoring import MonitoringTask, TaskStatus
-from backend.models.notifications import InAppNotification
+from backend.config import get_settings
+from backend.database import get_sessionmaker
+from backend.models.notifications import (
+    InAppNotification,
+    NotificationDigestItem,
+    NotificationType,
+    RecipientType,
+)
 from backend.models.patient import Patient
-from backend.services.notification_engine import NotificationEngine
+from backend.services.notification_engine import NotificationEngine, invalidate_recipient_cache
 
 
 def test_overdue_notification_dedup(db_session):
@@ -37,3 +44,127 @@ def test_overdue_notification_dedup(db_session):
     assert created_first >= 1
     assert created_second == 0
     assert count == 1
+
+
+def test_recipient_prefetch_and_invalidation(db_session):
+    patient = Patient(id=uuid4(), pseudonym="PT-NOTIF-2")
+    med = MedicationOrder(
+        id=uuid4(),
+        patient_id=patient.id,
+        drug_name="risperidone",
+        drug_category=DrugCategory.STANDARD,
+        start_date=date(2025, 1, 1),
+        flags={},
+    )
+    task = MonitoringTask(
+        id=uuid4(),
+        patient_id=patient.id,
+        medication_order_id=med.id,
+        test_type="HbA1c",
+        due_date=date.today() + timedelta(days=3),
+        status=TaskStatus.DUE,
+        assigned_to="clinician-1",
+    )
+    unassigned = Patient(id=uuid4(), pseudonym="PT-NOTIF-3")
+    db_session.add_all([patient, med, task, unassigned])
+    db_session.commit()
+
+    engine = NotificationEngine(db_session)
+    engine.prefetch_recipients([patient.id, unassigned.id])
+    assert engine._recipient_for_event(patient) == (RecipientType.USER, "clinician-1")
+    assert engine._recipient_for_event(unassigned) == (RecipientType.TEAM, "TEAM_INBOX")
+
+    task.assigned_to = "clinician-2"
+    db_session.commit()
+    assert engine._recipient_for_event(patient) == (RecipientType.USER, "clinician-1")
+
+    invalidate_recipient_cache()
+    assert engine._recipient_for_event(patient) == (RecipientType.USER, "clinician-2")
+
+
+def test_overdue_digest_groups_per_recipient(db_session, monkeypatch):
+    monkeypatch.setenv("NOTIFICATION_DIGEST_ENABLED", "true")
+    get_settings.cache_clear()
+
+    patient = Patient(id=uuid4(), pseudonym="PT-NOTIF-4")
+    med = MedicationOrder(
+        id=uuid4(),
+        patient_id=patient.id,
+        drug_name="risperidone",
+        drug_category=DrugCategory.STANDARD,
+        start_date=date(2025, 1, 1),
+        flags={},
+    )
+    tasks = [
+        MonitoringTask(
+            id=uuid4(),
+            patient_id=patient.id,
+            medication_order_id=med.id,
+            test_type=test_type,
+            due_date=date.today() - timedelta(days=days),
+            status=TaskStatus.OVERDUE,
+        )
+        for test_type, days in [("Weight/BMI", 5), ("HbA1c", 10), ("Prolactin", 45)]
+    ]
+    db_session.add_all([patient, med, *tasks])
+    db_session.commit()
+
+    engine = NotificationEngine(db_session)
+    created_first = engine.process_overdue_tasks()
+    created_second = engine.process_overdue_tasks()
+
+    assert created_first == 4
+    assert created_second == 0
+    digests = db_session.query(InAppNotification).all()
+    assert len(digests) == 2
+    assert {d.notification_type for d in digests} == {NotificationType.TASK_DIGEST}
+    team_digest = next(d for d in digests if d.recipient_id == "TEAM_INBOX")
+    assert team_digest.payload["overdue_count"] == 3
+    assert db_session.query(NotificationDigestItem).count() == 4
+
+
+def test_overdue_digest_counts_add_up_across_sessions(db_session, monkeypatch):
+    monkeypatch.setenv("NOTIFICATION_DIGEST_ENABLED", "true")
+    get_settings.cache_clear()
+
+    patient = Patient(id=uuid4(), pseudonym="PT-NOTIF-5")
+    med = MedicationOrder(
+        id=uuid4(),
+        patient_id=patient.id,
+        drug_name="risperidone",
+        drug_category=DrugCategory.STANDARD,
+        start_date=date(2025, 1, 1),
+        flags={},
+    )
+    tasks = [
+        MonitoringTask(
+            id=uuid4(),
+            patient_id=patient.id,
+            medication_order_id=med.id,
+            test_type=test_type,
+            due_date=date.today() - timedelta(days=5),
+            status=TaskStatus.OVERDUE,
+        )
+        for test_type in ("Weight/BMI", "HbA1c", "Prolactin")
+    ]
+    db_session.add_all([patient, med, *tasks])
+    db_session.commit()
+    task_ids = [task.id for task in tasks]
+
+    engine = NotificationEngine(db_session)
+    assert engine.process_overdue_digests(task_ids=task_ids[:1]) == 1
+    digest = db_session.query(InAppNotification).one()
+    assert digest.payload["overdue_count"] == 1
+
+    # Another shard adds to the same digest while this session still holds it.
+    other = get_sessionmaker()()
+    try:
+        assert NotificationEngine(other).process_overdue_digests(task_ids=task_ids[1:2]) == 1
+    finally:
+        other.close()
+
+    assert engine.process_overdue_digests(task_ids=task_ids[2:]) == 1
+    db_session.expire_all()
+    digest = db_session.query(InAppNotification).one()
+    assert digest.payload["overdue_count"] == 3
+    assert db_session.query(NotificationDigestItem).count() == 3
@@ -0,0 +1,175 @@
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.config import get_settings
+from backend.database import get_sessionmaker
+from backend.models.jobs import ReevaluationRun, ReevaluationShard
+from backend.models.monitoring import AbnormalFlag, MonitoringEvent, ReviewStatus
+from backend.models.patient import Patient
+from backend.models.thresholds import ComparatorType, ReferenceThreshold
+from backend.services.abnormality import ThresholdEvaluator, invalidate_threshold_index
+from backend.services.reevaluation import ReevaluationService
+
+
+def _seed(db):
+    patient = Patient(id=uuid4(), pseudonym="PT-REEVAL-1", sex="F", age_band="35-44")
+    threshold = ReferenceThreshold(
+        monitoring_type="HbA1c",
+        unit="%",
+        comparator_type=ComparatorType.NUMERIC,
+        high_warning=6.0,
+        high_critical=7.0,
+    )
+    db.add_all([patient, threshold])
+    db.commit()
+    invalidate_threshold_index()
+
+    evaluator = ThresholdEvaluator(db)
+    events = []
+    for value in ["5.0", "6.5", "7.5"]:
+        event = MonitoringEvent(
+            id=uuid4(),
+            patient_id=patient.id,
+            test_type="HbA1c",
+            performed_date=date.today(),
+            value=value,
+            unit="%",
+            source_system="CSV_UPLOAD",
+        )
+        evaluator.apply_evaluation(event, evaluator.evaluate_event(event, patient))
+        events.append(event)
+    other = MonitoringEvent(
+        id=uuid4(),
+        patient_id=patient.id,
+        test_type="Lipids",
+        performed_date=date.today(),
+        value="9.0",
+        source_system="CSV_UPLOAD",
+        abnormal_flag=AbnormalFlag.UNKNOWN,
+    )
+    db.add_all(events + [other])
+    db.commit()
+
+    threshold.high_critical = 6.0
+    db.commit()
+    invalidate_threshold_index()
+    return events, other
+
+
+def test_reevaluation_updates_only_changed_flags(db_session):
+    events, other = _seed(db_session)
+    normal, warning, critical = (event.id for event in events)
+
+    service = ReevaluationService(db_session, node_id="worker-a", batch_size=1)
+    run = service.enqueue(["HbA1c"], requested_by="admin")
+    assert service.enqueue(["HbA1c"]).id == run.id
+    assert run.total_events == 3
+
+    peer = ReevaluationService(db_session, node_id="worker-b", batch_size=1)
+    totals = {"scanned": 0, "changed": 0}
+    while True:
+        first = service.run_pending(max_shards=1)
+        second = peer.run_pending(max_shards=1)
+        for result in (first, second):
+            totals["scanned"] += result["scanned"]
+            totals["changed"] += result["changed"]
+        if not first["shards"] and not second["shards"]:
+            break
+    assert totals == {"scanned": 3, "changed": 1}
+
+    db_session.expire_all()
+    flags = {event.id: event for event in db_session.query(MonitoringEvent).all()}
+    assert flags[normal].abnormal_flag == AbnormalFlag.NORMAL
+    assert flags[warning].abnormal_flag == AbnormalFlag.OUTSIDE_CRITICAL
+    assert flags[warning].reviewed_status == ReviewStatus.PENDING_REVIEW
+    assert flags[critical].abnormal_flag == AbnormalFlag.OUTSIDE_CRITICAL
+    assert flags[other.id].abnormal_flag == AbnormalFlag.UNKNOWN
+
+    run = db_session.get(ReevaluationRun, run.id)
+    assert run.status == "DONE"
+    assert run.finished_at is not None
+
+
+def test_reevaluation_resumes_expired_shard(db_session):
+    _seed(db_session)
+    crashed = ReevaluationService(db_session, node_id="crashed", batch_size=1)
+    run = crashed.enqueue(["HbA1c"])
+    shard = crashed.claim()
+    assert shard is not None and shard.holder == "crashed"
+
+    survivor = ReevaluationService(db_session, node_id="survivor", batch_size=1)
+    claimed = []
+    while (other := survivor.claim()) is not None:
+        claimed.append(other.shard_index)
+        survivor.process(other)
+    assert shard.shard_index not in claimed
+
+    shard.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+    survivor.run_pending()
+
+    shards = db_session.query(ReevaluationShard).filter_by(run_id=run.id).all()
+    assert {row.status for row in shards} == {"DONE"}
+    assert sum(row.scanned for row in shards) == 3
+    assert db_session.get(ReevaluationRun, run.id).status == "DONE"
+
+
+def test_reevaluation_ignores_stale_cached_thresholds(db_session, monkeypatch):
+    monkeypatch.setenv("THRESHOLD_INDEX_TTL_SECONDS", "3600")
+    get_settings.cache_clear()
+    events, _ = _seed(db_session)
+    critical = events[2].id
+    # Warm this process's index, then change the threshold elsewhere without invalidating it.
+    ThresholdEvaluator(db_session).evaluate_event(events[0], db_session.get(Patient, events[0].patient_id))
+    other = get_sessionmaker()()
+    try:
+        other.query(ReferenceThreshold).update({"high_critical": 8.0})
+        other.commit()
+    finally:
+        other.close()
+
+    service = ReevaluationService(db_session, node_id="worker-a")
+    service.enqueue(["HbA1c"])
+    service.run_pending()
+
+    db_session.expire_all()
+    assert db_session.get(MonitoringEvent, critical).abnormal_flag == AbnormalFlag.OUTSIDE_WARNING
+
+
+def test_threshold_change_reevaluates_and_notifies_by_default(db_session):
+    from fastapi.testclient import TestClient
+
+    from backend.auth import get_current_user
+    from backend.main import create_app
+    from backend.models.notifications import InAppNotification, NotificationType
+    from backend.models.user import User
+
+    patient = Patient(id=uuid4(), pseudonym="PT-REEVAL-4", sex="F", age_band="35-44")
+    event = MonitoringEvent(
+        id=uuid4(),
+        patient_id=patient.id,
+        test_type="HbA1c",
+        performed_date=date.today(),
+        value="7.5",
+        unit="%",
+        source_system="CSV_UPLOAD",
+        abnormal_flag=AbnormalFlag.UNKNOWN,
+    )
+    db_session.add_all([patient, event])
+    db_session.commit()
+
+    app = create_app()
+    app.dependency_overrides[get_current_user] = lambda: User(username="admin", role="admin")
+    response = TestClient(app).post(
+        "/api/v1/admin/thresholds",
+        json={"monitoring_type": "HbA1c", "unit": "%", "comparator_type": "numeric", "high_critical": 7.0},
+    )
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    assert db_session.query(ReevaluationRun).one().status == "DONE"
+    stored = db_session.get(MonitoringEvent, event.id)
+    assert stored.abnormal_flag == AbnormalFlag.OUTSIDE_CRITICAL
+    assert stored.reviewed_status == ReviewStatus.PENDING_REVIEW
+    notification = db_session.query(InAppNotification).one()
+    assert (notification.notification_type, notification.event_id) == (NotificationType.EVENT_CRITICAL, event.id)
@@ -0,0 +1,205 @@
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.models.audit import AuditAction, AuditEvent
+from backend.models.medication import DrugCategory, MedicationOrder
+from backend.models.monitoring import MonitoringEvent, MonitoringTask, ResolvedTaskSlot, TaskStatus
+from backend.models.notifications import (
+    InAppNotification,
+    NotificationPriority,
+    NotificationType,
+    RecipientType,
+)
+from backend.models.patient import Patient
+from backend.services.retention import RetentionEngine
+from backend.services.scheduling import SchedulingEngine
+from backend.services.task_generator import TaskGenerator
+
+
+def _seed(db):
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    patient = Patient(id=uuid4(), pseudonym="PT-RET-1")
+    med = MedicationOrder(
+        id=uuid4(),
+        patient_id=patient.id,
+        drug_name="risperidone",
+        drug_category=DrugCategory.STANDARD,
+        start_date=date(2024, 1, 1),
+        flags={},
+    )
+    done = MonitoringTask(
+        id=uuid4(),
+        patient_id=patient.id,
+        medication_order_id=med.id,
+        test_type="HbA1c",
+        due_date=date(2024, 2, 1),
+        status=TaskStatus.DONE,
+        updated_at=old,
+    )
+    open_task = MonitoringTask(
+        id=uuid4(),
+        patient_id=patient.id,
+        medication_order_id=med.id,
+        test_type="Lipids",
+        due_date=date(2024, 2, 1),
+        status=TaskStatus.OVERDUE,
+        updated_at=old,
+    )
+    old_event = MonitoringEvent(
+        id=uuid4(),
+        patient_id=patient.id,
+        test_type="HbA1c",
+        performed_date=date.today() - timedelta(days=200),
+        source_system="TEST",
+    )
+    recent_event = MonitoringEvent(
+        id=uuid4(),
+        patient_id=patient.id,
+        test_type="HbA1c",
+        performed_date=date.today(),
+        source_system="TEST",
+    )
+    notification = InAppNotification(
+        recipient_type=RecipientType.TEAM,
+        recipient_id="TEAM_INBOX",
+        notification_type=NotificationType.EVENT_WARNING,
+        priority=NotificationPriority.WARNING,
+        title="Review required",
+        event_id=old_event.id,
+        task_id=done.id,
+        dedupe_key=f"EVENT_WARNING:{old_event.id}",
+    )
+    audits = [
+        AuditEvent(
+            actor="SYSTEM",
+            action=AuditAction.VIEW,
+            entity_type="Patient",
+            entity_id=str(patient.id),
+            request_id="",
+            ip_address="",
+            timestamp=ts,
+        )
+        for ts in [old, old, datetime.now(timezone.utc)]
+    ]
+    db.add_all([patient, med, done, open_task, old_event, recent_event, notification, *audits])
+    db.commit()
+    return done, open_task, old_event, recent_event
+
+
+def test_retention_dry_run_and_purge(db_session, tmp_path):
+    done, open_task, old_event, recent_event = _seed(db_session)
+    done_id, open_id, old_id, recent_id = done.id, open_task.id, old_event.id, recent_event.id
+
+    assert "monitoring_events" not in RetentionEngine(db_session).report()
+    engine = RetentionEngine(
+        db_session, batch_size=1, sleep_seconds=0, archive_path=str(tmp_path), event_retention_days=90
+    )
+    report = engine.report()
+    assert report["audit_events"] == 2
+    assert report["monitoring_tasks"] == 1
+    assert report["monitoring_events"] == 1
+    assert db_session.query(AuditEvent).count() == 3
+
+    purged = engine.purge()
+    assert purged["audit_events"] == 2
+    assert purged["monitoring_tasks"] == 1
+    assert purged["monitoring_events"] == 1
+
+    db_session.expire_all()
+    assert db_session.query(AuditEvent).count() == 1
+    assert db_session.query(InAppNotification).count() == 0
+    assert db_session.get(MonitoringTask, done_id) is None
+    assert db_session.get(MonitoringTask, open_id) is not None
+    assert db_session.get(MonitoringEvent, old_id) is None
+    assert db_session.get(MonitoringEvent, recent_id) is not None
+    assert len((tmp_path / "audit_events.jsonl").read_text().splitlines()) == 2
+
+
+def test_purged_done_tasks_are_not_regenerated(db_session):
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    patient = Patient(id=uuid4(), pseudonym="PT-RET-2")
+    med = MedicationOrder(
+        id=uuid4(),
+        patient_id=patient.id,
+        drug_name="risperidone",
+        drug_category=DrugCategory.STANDARD,
+        start_date=date.today() - timedelta(days=800),
+        flags={},
+    )
+    db_session.add_all([patient, med])
+    db_session.commit()
+
+    generator = TaskGenerator(db_session)
+
+    def regenerate():
+        db_session.expire_all()
+        return generator.create_or_update_tasks(SchedulingEngine().calculate_schedule(med, patient))
+
+    # Complete every past-due task until a re-import has nothing left to add.
+    for _ in range(5):
+        if not regenerate():
+            break
+        db_session.query(MonitoringTask).filter(
+            MonitoringTask.due_date < date.today(), MonitoringTask.status != TaskStatus.WAIVED
+        ).update({"status": TaskStatus.DONE}, synchronize_session=False)
+        db_session.commit()
+    waived = db_session.query(MonitoringTask).filter(MonitoringTask.status == TaskStatus.DONE).first()
+    waived.status = TaskStatus.WAIVED
+    db_session.commit()
+    done = db_session.query(MonitoringTask).filter(MonitoringTask.status == TaskStatus.DONE).count()
+    assert done
+    db_session.query(MonitoringTask).update({"updated_at": old})
+    db_session.commit()
+
+    purged = RetentionEngine(db_session, sleep_seconds=0).purge()
+    assert purged["monitoring_tasks"] == done
+    assert db_session.query(ResolvedTaskSlot).count() == done
+    assert db_session.get(MonitoringTask, waived.id).status == TaskStatus.WAIVED
+
+    assert [task for task in regenerate() if task.status == TaskStatus.OVERDUE] == []
+
+
+def test_long_overdue_task_is_not_renotified_after_purge(db_session, monkeypatch):
+    from backend.config import get_settings
+    from backend.services.notification_engine import NotificationEngine
+
+    patient = Patient(id=uuid4(), pseudonym="PT-RET-3")
+    med = MedicationOrder(
+        id=uuid4(),
+        patient_id=patient.id,
+        drug_name="risperidone",
+        drug_category=DrugCategory.STANDARD,
+        start_date=date(2024, 1, 1),
+        flags={},
+    )
+    tasks = [
+        MonitoringTask(
+            id=uuid4(),
+            patient_id=patient.id,
+            medication_order_id=med.id,
+            test_type=test_type,
+            due_date=date.today() - timedelta(days=400),
+            status=TaskStatus.OVERDUE,
+        )
+        for test_type in ("HbA1c", "Lipids")
+    ]
+    db_session.add_all([patient, med, *tasks])
+    db_session.commit()
+
+    # One task is noticed per task, the other through a digest.
+    assert NotificationEngine(db_session).process_overdue_tasks(task_ids=[tasks[0].id]) == 2
+    monkeypatch.setenv("NOTIFICATION_DIGEST_ENABLED", "true")
+    get_settings.cache_clear()
+    assert NotificationEngine(db_session).process_overdue_tasks(task_ids=[tasks[1].id]) == 2
+    db_session.query(InAppNotification).update({"created_at": datetime.now(timezone.utc) - timedelta(days=400)})
+    db_session.commit()
+
+    assert RetentionEngine(db_session, sleep_seconds=0).purge()["in_app_notifications"] == 0
+    for digest in (False, True):
+        monkeypatch.setenv("NOTIFICATION_DIGEST_ENABLED", str(digest).lower())
+        get_settings.cache_clear()
+        assert NotificationEngine(db_session).process_overdue_tasks() == 0
+
+    db_session.query(MonitoringTask).update({"status": TaskStatus.DONE})
+    db_session.commit()
+    assert RetentionEngine(db_session, sleep_seconds=0).purge()["in_app_notifications"] == 4
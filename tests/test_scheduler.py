@@ -0,0 +1,61 @@
+import time
+
+from backend.config import get_settings
+from backend.jobs.scheduler import PeriodicJob, PeriodicScheduler
+from backend.models.jobs import ScheduledJobRun
+
+
+def test_single_leader_runs_due_jobs(db_session):
+    calls: list[str] = []
+
+    def _job(db):
+        calls.append("ran")
+        return {"ok": True}
+
+    jobs = [PeriodicJob("probe", 3600, _job)]
+    leader = PeriodicScheduler(jobs=jobs, node_id="node-a")
+    follower = PeriodicScheduler(jobs=jobs, node_id="node-b")
+
+    assert leader.tick() == 1
+    assert follower.tick() == 0
+    assert leader.tick() == 0
+    assert calls == ["ran"]
+
+    run = db_session.query(ScheduledJobRun).filter_by(job_name="probe").one()
+    assert run.last_status == "OK"
+    assert run.run_count == 1
+    assert run.last_holder == "node-a"
+    assert run.last_duration_seconds is not None
+
+    leader.release()
+    assert follower.acquire()
+    assert not leader.acquire()
+
+
+def test_failed_job_recorded(db_session):
+    def _boom(db):
+        raise RuntimeError("boom")
+
+    scheduler = PeriodicScheduler(jobs=[PeriodicJob("boom", 60, _boom)], node_id="node-a")
+    assert scheduler.tick() == 1
+
+    run = db_session.query(ScheduledJobRun).filter_by(job_name="boom").one()
+    assert run.last_status == "FAILED"
+    assert run.last_error == "boom"
+
+
+def test_lease_is_renewed_while_a_long_job_runs(db_session, monkeypatch):
+    monkeypatch.setenv("SCHEDULER_LEASE_SECONDS", "1")
+    get_settings.cache_clear()
+    follower = PeriodicScheduler(jobs=[], node_id="node-b")
+    takeovers: list[bool] = []
+
+    def _long(db):
+        time.sleep(1.6)
+        takeovers.append(follower.acquire())
+        return {}
+
+    leader = PeriodicScheduler(jobs=[PeriodicJob("long", 3600, _long)], node_id="node-a")
+    assert leader.tick() == 1
+    assert takeovers == [False]
+    assert leader.acquire()
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+from uuid import uuid4
+
+import numpy as np
+
+from backend.models.monitoring import AbnormalFlag, MonitoringEvent
+from backend.models.patient import Patient
+from backend.services.series import SeriesService, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(100, dtype=float)
+    y = np.zeros(100)
+    y[37] = 50.0
+    keep = lttb_indices(x, y, 10)
+    assert len(keep) == 10
+    assert keep[0] == 0 and keep[-1] == 99
+    assert 37 in keep
+    assert list(keep) == sorted(keep)
+    assert len(lttb_indices(x, y, 200)) == 100
+
+
+def test_patient_series_and_population_bands(db_session):
+    female = Patient(id=uuid4(), pseudonym="PT-SER-1", sex="F", age_band="35-44")
+    male = Patient(id=uuid4(), pseudonym="PT-SER-2", sex="M", age_band="35-44")
+    db_session.add_all([female, male])
+    start = date(2025, 1, 1)
+    for day in range(60):
+        db_session.add(
+            MonitoringEvent(
+                patient_id=female.id,
+                test_type="Weight",
+                performed_date=start + timedelta(days=day),
+                value=f"{70 + day % 7} kg",
+                source_system="CSV_UPLOAD",
+                abnormal_flag=AbnormalFlag.NORMAL,
+            )
+        )
+    db_session.add(
+        MonitoringEvent(
+            patient_id=male.id,
+            test_type="Weight",
+            performed_date=start,
+            value="90",
+            unit="kg",
+            source_system="CSV_UPLOAD",
+        )
+    )
+    db_session.add(
+        MonitoringEvent(
+            patient_id=female.id,
+            test_type="Weight",
+            performed_date=start,
+            value="not recorded",
+            source_system="CSV_UPLOAD",
+        )
+    )
+    db_session.commit()
+
+    service = SeriesService(db_session)
+    series = service.patient_series(female.id, "Weight", max_points=20)
+    assert series["count"] == 60
+    assert series["downsampled"] is True
+    assert len(series["dates"]) == len(series["values"]) == len(series["flags"]) == 20
+    assert series["dates"][0] == "2025-01-01"
+    assert series["dates"][-1] == (start + timedelta(days=59)).isoformat()
+    assert series["units"] == ["kg"]
+    assert set(series["flags"]) == {"NORMAL"}
+
+    window = service.patient_series(female.id, "Weight", date_from=start, date_to=start + timedelta(days=9))
+    assert window["count"] == 10 and window["downsampled"] is False
+
+    bands = service.population_percentiles("Weight")
+    assert bands["sex"] == ["F", "M"]
+    assert bands["patients"] == [1, 1]
+    # The female patient's latest value is day 59: 70 + 59 % 7.
+    assert bands["p50"] == [73.0, 90.0]
+
+
+def test_series_never_mix_units(db_session):
+    patients = [Patient(id=uuid4(), pseudonym=f"PT-UNIT-{i}", sex="F", age_band="35-44") for i in range(3)]
+    db_session.add_all(patients)
+    readings = [
+        (patients[0], 1, "7.5", "%"),
+        (patients[0], 2, "58", "mmol/mol"),
+        (patients[0], 3, "60", "mmol/mol"),
+        (patients[1], 1, "48", "mmol/mol"),
+        (patients[2], 1, "6.1", "%"),
+    ]
+    for patient, day, value, unit in readings:
+        db_session.add(
+            MonitoringEvent(
+                patient_id=patient.id,
+                test_type="HbA1c",
+                performed_date=date(2025, 1, day),
+                value=value,
+                unit=unit,
+                source_system="CSV_UPLOAD",
+            )
+        )
+    db_session.commit()
+
+    service = SeriesService(db_session)
+    series = service.patient_series(patients[0].id, "HbA1c")
+    assert (series["unit"], series["units"]) == ("mmol/mol", ["%", "mmol/mol"])
+    assert series["values"] == [58.0, 60.0]
+    assert service.patient_series(patients[0].id, "HbA1c", unit="%")["values"] == [7.5]
+
+    bands = service.population_percentiles("HbA1c")
+    assert bands["unit"] == "mmol/mol"
+    assert bands["patients"] == [2]
+    assert bands["p50"] == [54.0]
+    percent = service.population_percentiles("HbA1c", unit="%")
+    assert (percent["patients"], percent["p50"]) == ([2], [6.8])
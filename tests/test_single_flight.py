@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.config import get_settings
+from backend.database import get_sessionmaker
+from backend.services.integration_service import IntegrationService, patient_fetches
+from backend.services.leases import LeaseLock
+from backend.services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(4)
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 42}
+
+    def caller(_):
+        barrier.wait()
+        return flights.do("key", work)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(caller, range(4)))
+
+    assert len(calls) == 1
+    assert all(result == {"value": 42} for result, _shared in results)
+    assert sorted(shared for _result, shared in results) == [False, True, True, True]
+    assert flights.stats()["coalesced"] == 3 and flights.stats()["in_flight"] == 0
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: 1) == (1, False)
+
+
+def test_concurrent_fetches_for_one_patient_hit_the_epr_once(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REFRESH_FRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    stub_epr.config.latency_ms = 300
+    SessionLocal = get_sessionmaker()
+    barrier = threading.Barrier(4)
+    before = patient_fetches.stats()
+
+    def request(_):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            return IntegrationService(db).fetch_coalesced("9999999999")
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(request, range(4)))
+
+    assert len({result["patient_id"] for result in results}) == 1
+    assert sum(result["coalesced"] for result in results) == 3
+    assert len(stub_epr.page_requests) == 2
+    assert patient_fetches.stats()["coalesced"] - before["coalesced"] == 3
+
+
+def test_fetch_waits_for_another_workers_lock(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REFRESH_FRESH_SECONDS", "900")
+    get_settings.cache_clear()
+    service = IntegrationService(db_session)
+    service.fetch_and_import("9999999999")
+    other_worker = LeaseLock(f"epr-fetch:{service._hash_patient('9999999999')[:48]}", 60, holder="worker-b")
+    assert other_worker.acquire()
+    threading.Timer(0.3, other_worker.release, kwargs={"delete": True}).start()
+    before = patient_fetches.stats()["lock_waits"]
+
+    result = service.fetch_coalesced("9999999999")
+
+    assert result["cached"] is True
+    assert patient_fetches.stats()["lock_waits"] == before + 1
+
+
+def test_batch_and_refresh_defer_patients_another_worker_is_fetching(stub_epr, db_session, monkeypatch):
+    monkeypatch.setenv("EPR_REFRESH_STALE_SECONDS", "0")
+    get_settings.cache_clear()
+    service = IntegrationService(db_session)
+    other_worker = LeaseLock(f"epr-fetch:{service._hash_patient('9999999999')[:48]}", 60, holder="worker-b")
+    assert other_worker.acquire()
+
+    (summary,) = service.fetch_batch(["9999999999"])
+    assert summary["status"] == "deferred"
+    other_worker.release(delete=True)
+    (summary,) = service.fetch_batch(["9999999999"])
+    assert summary["status"] == "ok"
+
+    assert other_worker.acquire()
+    assert service.refresh_due() == {"due": 1, "refreshed": 0, "failed": 0, "deferred": 1}
+    other_worker.release(delete=True)
+    assert service.refresh_due() == {"due": 1, "refreshed": 1, "failed": 0, "deferred": 0}
@@ -4,6 +4,8 @@ from uuid import uuid4
 from backend.models.patient import Patient
 from backend.models.medication import MedicationOrder, DrugCategory
 from backend.models.monitoring import MonitoringTask, MonitoringEvent, TaskStatus
+from backend.jobs.task_updater import daily_task_status_update
+from backend.services.sharding import Shard
 from backend.services.task_generator import TaskGenerator
 
 
@@ -113,3 +115,48 @@ def test_no_duplicate_tasks(db_session):
 
     count = db_session.query(MonitoringTask).filter_by(medication_order_id=med.id).count()
     assert count == 1
+
+
+def test_daily_pipeline_feeds_notifications(db_session):
+    patient, med = seed_patient_and_med(db_session)
+    due = MonitoringTask(
+        id=uuid4(),
+        patient_id=patient.id,
+        medication_order_id=med.id,
+        test_type="Weight/BMI",
+        due_date=date.today() - timedelta(days=2),
+        status=TaskStatus.DUE,
+    )
+    waived = MonitoringTask(
+        id=uuid4(),
+        patient_id=patient.id,
+        medication_order_id=med.id,
+        test_type="Prolactin",
+        due_date=date.today() - timedelta(days=40),
+        status=TaskStatus.WAIVED,
+        waived_reason="Declined",
+        waived_until=date.today() - timedelta(days=1),
+    )
+    db_session.add_all([due, waived])
+    db_session.commit()
+
+    report = daily_task_status_update()
+    assert report["overdue"] == 1
+    assert report["reactivated"] == 1
+    assert report["notifications"] == 3
+    assert set(report["timings"]) == {"mark_overdue", "reactivate_waivers", "notify"}
+
+    db_session.expire_all()
+    assert db_session.get(MonitoringTask, waived.id).waived_until is None
+    assert daily_task_status_update()["notifications"] == 0
+
+
+def test_shards_partition_patients():
+    shards = [Shard.parse(f"{k}/3") for k in range(3)]
+    ids = [uuid4() for _ in range(200)]
+    for patient_id in ids:
+        owners = [
+            s for s in shards
+            if s.lower <= patient_id and (s.upper is None or patient_id < s.upper)
+        ]
+        assert len(owners) == 1